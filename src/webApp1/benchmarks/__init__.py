@@ -0,0 +1,23 @@
+"""
+Benchmarks, one module per subsystem, each runnable on its own:
+
+    python -m src.webApp1.benchmarks.http_client     # per-call vs pooled outbound client (TLS)
+    python -m src.webApp1.benchmarks.jwt_verify      # verify_token with / without the decoded-token cache
+    python -m src.webApp1.benchmarks.download        # full bodies vs 304 revalidation vs Range resumes
+    python -m src.webApp1.benchmarks.ratelimit_hybrid  # redis call per request vs local bucket + leases
+    python -m src.webApp1.benchmarks.ratelimit_algorithms  # redis bytes per key and decisions/s per algorithm
+    python -m src.webApp1.benchmarks.json_render     # orjson route vs jsonable_encoder + json, small to 1 MB bodies
+    python -m src.webApp1.benchmarks.compression     # server CPU + wire bytes, per request vs etag cache vs stream
+    python -m src.webApp1.benchmarks.web2_endpoints  # every loadgen scenario against web2:app on a local uvicorn
+    python -m src.webApp1.benchmarks.cache_batch     # batch lookup endpoint / fetch_many vs N single lookups
+    python -m src.webApp1.benchmarks.near_cache      # hot-key reads: redis GET vs NearCache, with and without writers
+    python -m src.webApp1.benchmarks.workers_scaling  # req/s of the pre-fork server from 1 to N workers
+    python -m src.webApp1.benchmarks.db_pool         # DatabaseManager queries/s at pool sizes 5 .. 50
+    python -m src.webApp1.benchmarks.transaction_history  # keyset vs OFFSET, page 1 to 10,000 of a 10M-row table
+    python -m src.webApp1.benchmarks.ledger  # group commit vs a transaction per transfer, transfers/s and p99
+    python -m src.webApp1.benchmarks.audit  # audit event cost on the request path, events/s into the sink
+    python -m src.webApp1.benchmarks.stampede  # recomputes per expiry of one hot key, 500 clients over 8 workers
+
+Every module takes --out results.json; redis-backed ones take --redis-url and default to a local
+fakeredis TCP server (see common.py).
+"""
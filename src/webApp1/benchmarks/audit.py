@@ -0,0 +1,122 @@
+"""
+Audit events: what each one costs on the request path, and how many per second reach the sink.
+
+    python -m src.webApp1.benchmarks.audit --events 100000
+
+- request path: AuditLog.log_nowait (append to the in-process buffer) vs the designs it replaces,
+  buffer_audit_log of cache.md (LPUSH + EXPIRE + LLEN on redis, the local stand-in) and a synchronous
+  write per event (log_audit_event of database.md, here one SqliteSink commit per event)
+- throughput: producers `await log()` as fast as they can with the flusher running, until every event
+  is in the sink; "slow" adds 50 ms to each sink write, so the buffer fills and backpressure
+  (waits, overflow spill) shows up
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import redis.asyncio as redis
+
+from src.webApp1.benchmarks.common import local_redis, measure, measure_sync, parser, report
+from src.webApp1.service.audit import AuditLog, FileSink, SqliteSink
+
+
+def event(i: int) -> dict:
+    return {"service": "wallet", "event_type": "transfer", "user_id": str(uuid.UUID(int=i % 1000)),
+            "data": {"amount": "12.50", "currency": "USD", "to": str(uuid.UUID(int=i))}}
+
+
+class SlowSink:
+    def __init__(self, sink, delay: float):
+        self.sink = sink
+        self.delay = delay
+
+    async def write(self, events):
+        await asyncio.sleep(self.delay)
+        await self.sink.write(events)
+
+    async def close(self):
+        await self.sink.close()
+
+
+async def request_path(tmp: str, redis_url: str, count: int) -> list[dict]:
+    rows = []
+    audit = AuditLog(FileSink(os.path.join(tmp, "unused.jsonl")), capacity=count + 1,
+                     spill_dir=os.path.join(tmp, "spill"))
+    i = iter(range(count))
+    timing = measure_sync(lambda: audit.log_nowait(event(next(i))), count)  # flusher not running: pure append
+    rows.append({"request path": "AuditLog.log_nowait (buffer)", "events": count, "us_per_event": timing["us_per_op"]})
+
+    client = redis.from_url(redis_url)
+    n = min(count, 2000)
+
+    async def buffer_audit_log():
+        key = "audit_buffer:wallet"
+        await client.lpush(key, str(event(0)))
+        await client.expire(key, 3600)
+        await client.llen(key)
+
+    timing = await measure(buffer_audit_log, n)
+    rows.append({"request path": "redis LPUSH + EXPIRE + LLEN", "events": n,
+                 "us_per_event": round(1e6 / timing["ops_per_s"], 1)})
+    await client.aclose()
+
+    sink = SqliteSink(os.path.join(tmp, "sync.db"))
+    j = iter(range(n))
+    timing = measure_sync(lambda: sink._write([audit._stamp(event(next(j)))]), n)
+    rows.append({"request path": "sqlite commit per event", "events": n, "us_per_event": timing["us_per_op"]})
+    await sink.close()
+    return rows
+
+
+async def throughput(name: str, sink, tmp: str, count: int, producers: int) -> dict:
+    audit = AuditLog(sink, capacity=10_000, batch_size=500, flush_interval=0.2,
+                     spill_dir=os.path.join(tmp, f"spill-{name}"))
+    audit.start()
+    per_producer = count // producers
+    started = time.perf_counter()
+
+    async def producer(p):
+        for i in range(per_producer):
+            await audit.log(event(p * per_producer + i))
+
+    await asyncio.gather(*(producer(p) for p in range(producers)))
+    accepted = time.perf_counter() - started
+    total = per_producer * producers
+    while audit.counters["flushed"] + audit.counters["overflow_spilled"] < total:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    stats = audit.stats()
+    await audit.close()
+    return {"sink": name, "events": total, "events_per_s": round(total / elapsed, 1),
+            "accept_per_s": round(total / accepted, 1), "batches": stats["batches"],
+            "waited": stats["waited"], "overflow_spilled": stats["overflow_spilled"]}
+
+
+async def run(tmp: str, redis_url: str, count: int, producers: int) -> tuple[list, list]:
+    path_rows = await request_path(tmp, redis_url, count)
+    sinks = [("sqlite", SqliteSink(os.path.join(tmp, "audit.db"))),
+             ("file (fsync per batch)", FileSink(os.path.join(tmp, "audit.jsonl"))),
+             ("sqlite, slow (+50 ms/batch)", SlowSink(SqliteSink(os.path.join(tmp, "slow.db")), 0.05))]
+    throughput_rows = [await throughput(name, sink, tmp, count, producers) for name, sink in sinks]
+    return path_rows, throughput_rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.audit", __doc__)
+    p.add_argument("--events", type=int, default=100_000)
+    p.add_argument("--producers", type=int, default=16, help="concurrent request handlers logging")
+    p.add_argument("--redis-url")
+    args = p.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp, local_redis(args.redis_url) as url:
+        path_rows, throughput_rows = asyncio.run(run(tmp, url, args.events, args.producers))
+    report("request path cost per audit event", path_rows, args.out)
+    report(f"events/s into the sink, {args.producers} producers, batches of 500", throughput_rows,
+           args.out and args.out.replace(".json", ".throughput.json"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Batch cache lookups: POST /data-from-redis-cache/batch (one MGET, one pipelined write-back) vs N calls to
+GET /data-from-redis-cache/{item_id}, against a local redis stand-in.
+
+    python -m src.webApp1.benchmarks.cache_batch --items 10 100 --rounds 20
+
+Two parts:
+- http: web2:app on a local uvicorn (see web2_endpoints), each round asks for N ids nobody asked for
+  before (cold: every item a miss + write-back) then the same N again (warm)
+- redis: MultiLevelCache.fetch_many vs N fetch() in this process with L1 emptied before every round,
+  so each lookup goes to redis (warm L2), N fetches sequential and concurrent
+"""
+import asyncio
+import itertools
+import sys
+import tempfile
+import time
+
+import httpx
+import redis.asyncio as redis
+
+from src.webApp1.benchmarks.common import local_redis, parser, report, serve_app
+from src.webApp1.benchmarks.web2_endpoints import preload_scripts, scratch_dir
+from src.webApp1.cache.multilevel import MultiLevelCache
+
+_ids = itertools.count(1)
+
+
+def fresh_ids(n: int) -> list[int]:
+    return [next(_ids) for _ in range(n)]
+
+
+async def timed(op) -> float:
+    started = time.perf_counter()
+    await op()
+    return (time.perf_counter() - started) * 1000
+
+
+def summary(samples: list[float]) -> dict:
+    samples = sorted(samples)
+    return {"mean_ms": round(sum(samples) / len(samples), 2), "p50_ms": round(samples[len(samples) // 2], 2),
+            "max_ms": round(samples[-1], 2)}
+
+
+async def http_rows(base: str, sizes: list[int], rounds: int) -> list[dict]:
+    rows = []
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        async def batch(ids):
+            response = await client.post("/data-from-redis-cache/batch", json={"item_ids": ids})
+            assert len(response.json()["items"]) == len(ids)
+
+        async def sequential(ids):  # what a client loop over the single endpoint does
+            for i in ids:
+                (await client.get(f"/data-from-redis-cache/{i}")).raise_for_status()
+
+        async def concurrent(ids):
+            await asyncio.gather(*(client.get(f"/data-from-redis-cache/{i}") for i in ids))
+
+        for n in sizes:
+            for name, call, http_calls in (("batch endpoint", batch, 1), ("N single calls, sequential", sequential, n),
+                                           ("N single calls, concurrent", concurrent, n)):
+                cold, warm = [], []
+                for _ in range(rounds):
+                    ids = fresh_ids(n)
+                    cold.append(await timed(lambda: call(ids)))
+                    warm.append(await timed(lambda: call(ids)))
+                rows.append({"items": n, "client": name, "http_calls": http_calls,
+                             **{f"cold_{k}": v for k, v in summary(cold).items() if k != "max_ms"},
+                             **{f"warm_{k}": v for k, v in summary(warm).items() if k != "max_ms"}})
+    return rows
+
+
+async def redis_rows(url: str, sizes: list[int], rounds: int) -> list[dict]:
+    client = redis.from_url(url)
+    cache = MultiLevelCache(client, prefix="bench:", ttl=300, stale_ttl=300, l1_maxsize=100_000)
+
+    async def load(key):
+        return f"value-for-{key}"
+
+    rows = []
+    for n in sizes:
+        keys = [f"item:{i}" for i in fresh_ids(n)]
+        await cache.fetch_many(keys, load)  # warm L2
+
+        async def fetch_many():
+            await cache.fetch_many(keys, load)
+
+        async def sequential():
+            for key in keys:
+                await cache.fetch(key, load)
+
+        async def concurrent():
+            await asyncio.gather(*(cache.fetch(key, load) for key in keys))
+
+        for name, op, calls in (("fetch_many (MGET)", fetch_many, 1), ("N fetch, sequential", sequential, n),
+                                ("N fetch, concurrent", concurrent, n)):
+            samples = []
+            for _ in range(rounds):
+                cache.l1.clear()  # every lookup to redis
+                samples.append(await timed(op))
+            rows.append({"items": n, "lookup": name, "redis_reads": calls, **summary(samples)})
+    await client.aclose()
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.cache_batch", __doc__)
+    p.add_argument("--items", type=int, nargs="+", default=[10, 100])
+    p.add_argument("--rounds", type=int, default=20)
+    p.add_argument("--redis-url")
+    args = p.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp, local_redis(args.redis_url) as url:
+        asyncio.run(preload_scripts(url))
+        redis_only = asyncio.run(redis_rows(url, args.items, args.rounds))
+        env = {**scratch_dir(tmp, "http://127.0.0.1:9"), "REDIS_CLOUD_URL": url.removeprefix("redis://")}
+        with serve_app("src.webApp1.controller.web2:app", env=env, cwd=tmp) as base:
+            http = asyncio.run(http_rows(base, args.items, args.rounds))
+    report(f"http: web2 on a local uvicorn, {args.rounds} rounds, ms per N items", http, args.out)
+    report(f"redis: MultiLevelCache with L1 emptied, {args.rounds} rounds, ms per N items", redis_only,
+           args.out and args.out.replace(".json", ".redis.json"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
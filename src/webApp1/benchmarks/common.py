@@ -0,0 +1,160 @@
+"""
+Shared plumbing for the benchmarks: timing loops, a local redis stand-in, a local uvicorn, reporting.
+
+- the redis stand-in is fakeredis' TCP server in its own process on 127.0.0.1 (real sockets, RESP over
+  the loopback), so round trips are paid; pass --redis-url to run against a real server instead
+- latency percentiles use loadgen.LatencyHistogram (~3% relative error)
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from src.webApp1.loadgen import LatencyHistogram
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def measure(op, count: int, concurrency: int = 1) -> dict:
+    """
+    await op() `count` times from `concurrency` tasks
+    -> {"ops", "ops_per_s", "p50_ms", "p99_ms", ...} (latency of each op, throughput over the run)
+    """
+    histogram = LatencyHistogram()
+    remaining = count
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            await op()
+            histogram.record(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"ops": count, "seconds": round(elapsed, 3), "ops_per_s": round(count / elapsed, 1),
+            **{k: v for k, v in histogram.summary().items() if k != "count"}}
+
+
+async def open_loop(op, rate: float, duration: float, max_in_flight: int = 1024) -> dict:
+    """
+    start op() at a constant `rate` per second for `duration` seconds, whatever it costs; latency counts
+    from the scheduled start (like loadgen --rate), so falling behind shows up instead of being hidden
+    """
+    histogram = LatencyHistogram()
+    semaphore = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+
+    async def fire(scheduled):
+        async with semaphore:
+            await op()
+        histogram.record(time.perf_counter() - scheduled)
+
+    total = int(rate * duration)
+    started = time.perf_counter()
+    sent = 0
+    while sent < total:
+        due = min(total, int((time.perf_counter() - started) * rate) + 1)
+        for i in range(sent, due):  # everything due since the last tick, the loop may be late
+            task = asyncio.create_task(fire(started + i / rate))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        sent = due
+        await asyncio.sleep(max(0.0, started + sent / rate - time.perf_counter()))
+    if tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return {"target_per_s": rate, "achieved_per_s": round(total / elapsed, 1),
+            **{k: v for k, v in histogram.summary().items() if k != "count"}}
+
+
+def measure_sync(op, count: int) -> dict:
+    """op() `count` times in a loop -> {"ops", "ops_per_s", "us_per_op"}"""
+    started = time.perf_counter()
+    for _ in range(count):
+        op()
+    elapsed = time.perf_counter() - started
+    return {"ops": count, "seconds": round(elapsed, 3), "ops_per_s": round(count / elapsed, 1),
+            "us_per_op": round(elapsed / count * 1e6, 3)}
+
+
+@contextlib.contextmanager
+def local_redis(url: str | None = None):
+    """-> redis url; `url` as given, else a fakeredis TCP server in its own process for the block"""
+    if url:
+        yield url
+        return
+    try:
+        import fakeredis  # noqa: F401  dev dependency, only the stand-in needs it
+    except ImportError:
+        raise SystemExit("no --redis-url given and fakeredis is not installed (uv sync --group dev)")
+    port = free_port()
+    code = f"from fakeredis import TcpFakeServer; TcpFakeServer(('127.0.0.1', {port})).serve_forever()"
+    with _process([sys.executable, "-c", code], port, "redis stand-in"):
+        yield f"redis://127.0.0.1:{port}"
+
+
+@contextlib.contextmanager
+def _process(command: list, port: int, name: str, env: dict | None = None, cwd: str | None = None):
+    """run command until the block exits, once it accepts connections on port"""
+    proc = subprocess.Popen(command, env={**os.environ, **(env or {})}, cwd=cwd)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if proc.poll() is not None:
+                raise SystemExit(f"{name} exited with {proc.returncode}")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"{name} did not start")
+                time.sleep(0.05)
+        yield proc
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+@contextlib.contextmanager
+def serve_app(app: str, *uvicorn_args: str, env: dict | None = None, cwd: str | None = None):
+    """
+    `python -m uvicorn <app>` in its own process for the block (lifespan runs like in production,
+    and the server does not share the benchmark's GIL) -> base url
+    """
+    port = free_port()
+    scheme = "https" if "--ssl-certfile" in uvicorn_args else "http"
+    command = [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning", *uvicorn_args]
+    with _process(command, port, f"benchmark server {app}", env, cwd):
+        yield f"{scheme}://127.0.0.1:{port}"
+
+
+def parser(prog: str, description: str) -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog=f"python -m {prog}", description=description,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--out", help="write the results as JSON here")
+    return p
+
+
+def report(title: str, rows: list[dict], out: str | None = None):
+    """rows of flat dicts -> aligned table on stdout, and JSON in `out`"""
+    print(f"\n{title}")
+    columns = list(dict.fromkeys(k for row in rows for k in row))
+    widths = {c: max(len(c), *(len(str(row.get(c, ""))) for row in rows)) for c in columns}
+    print("  ".join(c.rjust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).rjust(widths[c]) for c in columns))
+    if out:
+        with open(out, "w") as f:
+            json.dump({"benchmark": title, "results": rows}, f, indent=2)
@@ -0,0 +1,103 @@
+"""
+Response compression: server CPU per request and bytes on the wire, identity vs CompressionMiddleware
+compressing per request vs replaying its ETag-keyed cache vs streaming.
+
+    python -m src.webApp1.benchmarks.compression --requests 300
+
+The app serves one ~`--size-kb` JSON document three ways (plain, with an ETag, as a StreamingResponse)
+from a local uvicorn process. CPU is the server's process time over the run (read from the server
+itself), divided by the requests; bytes are what the client read off the socket before decoding.
+Every codec the server has installed is measured (zstd / br are optional packages).
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+
+from src.webApp1.benchmarks.common import measure, parser, report, serve_app
+from src.webApp1.service.compression import CompressionMiddleware, available_codecs
+
+SIZE = int(float(os.getenv("BENCH_COMPRESSION_KB", "64")) * 1024)
+RECORDS = [{"id": i, "user_id": f"user-{i % 97}", "amount": i * 1.25, "currency": "USD", "settled": i % 3 == 0}
+           for i in range(SIZE // 80)]
+BODY = json.dumps({"items": RECORDS}).encode()
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@app.get("/cpu")
+async def cpu():
+    return {"process_time": time.process_time()}
+
+
+@app.get("/json")
+async def plain():
+    return Response(BODY, media_type="application/json")
+
+
+@app.get("/json-etag")
+async def with_etag():
+    return Response(BODY, media_type="application/json", headers={"ETag": '"bench-v1"'})
+
+
+@app.get("/json-stream")
+async def streamed():
+    async def chunks():
+        for i in range(0, len(BODY), 16 * 1024):
+            yield BODY[i:i + 16 * 1024]
+
+    return StreamingResponse(chunks(), media_type="application/json")
+
+
+async def scenario(client, name: str, path: str, encoding: str, count: int) -> dict:
+    received = 0
+
+    async def op():
+        nonlocal received
+        async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+            assert response.headers.get("content-encoding", "identity") == encoding, (name, response.headers)
+            head = len(f"HTTP/1.1 {response.status_code} {response.reason_phrase}\r\n")
+            head += sum(len(k) + len(v) + 4 for k, v in response.headers.raw) + 2
+            received += head + sum([len(chunk) async for chunk in response.aiter_raw()])
+
+    await op()  # first request fills the etag cache
+    received = 0
+    cpu_before = (await client.get("/cpu")).json()["process_time"]
+    timing = await measure(op, count)
+    cpu_after = (await client.get("/cpu")).json()["process_time"]
+    return {"scenario": name, "encoding": encoding, "bytes_per_req": received // count,
+            "server_cpu_us": round((cpu_after - cpu_before) / count * 1e6),
+            "p50_ms": timing["p50_ms"], "req_per_s": timing["ops_per_s"]}
+
+
+async def run(base: str, count: int) -> list[dict]:
+    rows = []
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        rows.append(await scenario(client, "uncompressed", "/json", "identity", count))
+        for encoding in available_codecs():
+            rows.append(await scenario(client, "compressed per request", "/json", encoding, count))
+            rows.append(await scenario(client, "etag, cached body", "/json-etag", encoding, count))
+            rows.append(await scenario(client, "streamed, sync flush", "/json-stream", encoding, count))
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.compression", __doc__)
+    p.add_argument("--size-kb", type=float, default=64)
+    p.add_argument("--requests", type=int, default=300)
+    args = p.parse_args(argv)
+    with serve_app("src.webApp1.benchmarks.compression:app", env={"BENCH_COMPRESSION_KB": str(args.size_kb)}) as base:
+        rows = asyncio.run(run(base, args.requests))
+    report(f"~{args.size_kb:g} KiB JSON body, {args.requests} requests per scenario, codecs: "
+           f"{', '.join(available_codecs())}", rows, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Repeated downloads of one file: plain FileResponse (the old /download) vs service/download.file_response
+revalidating with If-None-Match (304) and resuming with Range (206).
+
+    python -m src.webApp1.benchmarks.download --size-mb 8 --requests 200
+
+Both endpoints serve the same generated file from a local uvicorn process; bytes are what the
+client received (status line + headers + body).
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+
+from src.webApp1.benchmarks.common import measure, parser, report, serve_app
+from src.webApp1.service.download import file_response
+
+BENCH_FILE = os.getenv("BENCH_DOWNLOAD_FILE", "")
+app = FastAPI()
+
+
+@app.get("/plain")
+async def plain():
+    return FileResponse(BENCH_FILE, filename="bench.bin", media_type="application/octet-stream")
+
+
+@app.get("/download")
+async def download(request: Request):
+    return await file_response(request, BENCH_FILE, filename="bench.bin", media_type="application/octet-stream")
+
+
+def wire_bytes(response: httpx.Response) -> int:
+    head = len(f"HTTP/1.1 {response.status_code} {response.reason_phrase}\r\n")
+    head += sum(len(k) + len(v) + 4 for k, v in response.headers.raw) + 2
+    return head + len(response.content)
+
+
+async def scenario(client, name: str, path: str, headers: dict, expect: int, count: int) -> dict:
+    received = 0
+
+    async def op():
+        nonlocal received
+        response = await client.get(path, headers=headers)
+        assert response.status_code == expect, (name, response.status_code)
+        received += wire_bytes(response)
+
+    timing = await measure(op, count)
+    return {"scenario": name, "status": expect, "bytes_per_req": received // count,
+            "p50_ms": timing["p50_ms"], "p99_ms": timing["p99_ms"], "req_per_s": timing["ops_per_s"]}
+
+
+async def run(base: str, size: int, count: int) -> list[dict]:
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        etag = (await client.get("/download")).headers["etag"]  # first request hashes the file once
+        half = size // 2
+        return [
+            await scenario(client, "plain FileResponse, full body", "/plain", {}, 200, count),
+            await scenario(client, "file_response, full body", "/download", {}, 200, count),
+            await scenario(client, "revalidate (If-None-Match)", "/download", {"If-None-Match": etag}, 304, count),
+            await scenario(client, "resume second half (Range)", "/download",
+                           {"Range": f"bytes={half}-", "If-Range": etag}, 206, count),
+            await scenario(client, "two 64 KiB ranges (multipart)", "/download",
+                           {"Range": f"bytes=0-65535,{half}-{half + 65535}"}, 206, count),
+        ]
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.download", __doc__)
+    p.add_argument("--size-mb", type=float, default=8)
+    p.add_argument("--requests", type=int, default=200)
+    args = p.parse_args(argv)
+    size = int(args.size_mb * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.bin")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        with serve_app("src.webApp1.benchmarks.download:app", env={"BENCH_DOWNLOAD_FILE": path}) as base:
+            rows = asyncio.run(run(base, size, args.requests))
+    report(f"GET of a {args.size_mb} MiB file, {args.requests} requests per scenario", rows, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
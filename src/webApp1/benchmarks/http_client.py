@@ -0,0 +1,97 @@
+"""
+Outbound OAuth calls: a new httpx.AsyncClient per call (the old okta_oauth / github_oauth_cc code)
+vs the shared pooled client from service/http_client.py.
+
+    python -m src.webApp1.benchmarks.http_client --calls 500 --concurrency 8
+
+The token endpoint is a local uvicorn over TLS (self-signed cert, trusted through SSL_CERT_FILE),
+so the per-call variant pays TCP + TLS handshakes like it does against Okta, minus the WAN latency.
+"""
+import asyncio
+import datetime
+import ipaddress
+import os
+import sys
+import tempfile
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.webApp1.benchmarks.common import measure, parser, report, serve_app
+from src.webApp1.service.http_client import create_http_client
+
+
+async def token_endpoint(request):
+    await request.form()
+    return JSONResponse({"access_token": "x" * 800, "token_type": "Bearer", "expires_in": 3600})
+
+
+token_app = Starlette(routes=[Route("/oauth2/default/v1/token", token_endpoint, methods=["POST"])])
+
+
+def self_signed_cert(directory: str) -> tuple[str, str]:
+    """-> (cert path, key path) for 127.0.0.1"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(minutes=1)).not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+                           critical=False)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+    cert_path, key_path = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+async def compare(url: str, calls: int, concurrency: int) -> list[dict]:
+    data = {"grant_type": "client_credentials", "scope": "fastapiweb2"}
+
+    async def per_call():
+        async with httpx.AsyncClient() as client:  # what every OAuth helper used to do
+            (await client.post(url, data=data)).raise_for_status()
+
+    shared = create_http_client()
+
+    async def pooled():
+        (await shared.post(url, data=data)).raise_for_status()
+
+    await asyncio.gather(*(pooled() for _ in range(concurrency)))  # warm keep-alive connections, like a running app
+    rows = []
+    for c in sorted({1, concurrency}):
+        rows.append({"client": "new AsyncClient per call", "concurrency": c, **await measure(per_call, calls, c)})
+        rows.append({"client": "shared pooled client", "concurrency": c, **await measure(pooled, calls, c)})
+    await shared.aclose()
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.http_client", __doc__)
+    p.add_argument("--calls", type=int, default=500)
+    p.add_argument("--concurrency", type=int, default=8)
+    args = p.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = self_signed_cert(tmp)
+        os.environ["SSL_CERT_FILE"] = cert  # both clients verify against it (httpx trust_env)
+        with serve_app("src.webApp1.benchmarks.http_client:token_app", "--ssl-certfile", cert,
+                       "--ssl-keyfile", key) as base:
+            rows = asyncio.run(compare(f"{base}/oauth2/default/v1/token", args.calls, args.concurrency))
+    report(f"POST token endpoint over TLS, {args.calls} calls", rows, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
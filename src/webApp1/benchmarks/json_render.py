@@ -0,0 +1,123 @@
+"""
+JSON responses: FastJSONRoute + FastJSONResponse (orjson, no jsonable_encoder) vs FastAPI's default
+route (jsonable_encoder + stdlib json), for small, medium and ~1 MB bodies.
+
+    python -m src.webApp1.benchmarks.json_render --requests 500
+
+Two parts:
+- render: building the response object in this process, us per response and tracemalloc peak
+  (the memory the encoder allocates on top of the payload, per response)
+- http: requests/s against both routes on a local uvicorn process
+"""
+import asyncio
+import gc
+import sys
+import tracemalloc
+
+import httpx
+from fastapi import APIRouter, FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.webApp1.benchmarks.common import measure, measure_sync, parser, report, serve_app
+from src.webApp1.service.fast_json import FastJSONResponse, FastJSONRoute
+
+
+def payload(size: str):
+    """what the API returns: a status dict, a page of records, a ~1 MB export"""
+    record = lambda i: {"id": i, "user_id": f"user-{i % 97}", "amount": i * 1.25, "currency": "USD",  # noqa: E731
+                        "tags": ["card", "online"], "settled": i % 3 == 0, "note": None}
+    if size == "small":
+        return {"status": "ok", "item_id": 42, "data": "value-for-item-42"}
+    if size == "medium":
+        return {"page": 1, "items": [record(i) for i in range(100)]}
+    return {"page": 1, "items": [record(i) for i in range(8500)]}
+
+
+SIZES = ("small", "medium", "1mb")
+PAYLOADS = {size: payload(size) for size in SIZES}
+
+fast = APIRouter(route_class=FastJSONRoute, default_response_class=FastJSONResponse)
+standard = APIRouter()
+
+
+@fast.get("/fast/{size}")
+async def fast_json(size: str):
+    return PAYLOADS[size]
+
+
+@standard.get("/std/{size}")
+async def std_json(size: str):
+    return PAYLOADS[size]
+
+
+app = FastAPI()
+app.include_router(fast)
+app.include_router(standard)
+
+
+def render_fast(content):
+    return FastJSONResponse(content)  # what FastJSONRoute's wrapper returns
+
+
+def render_standard(content):
+    return JSONResponse(jsonable_encoder(content))  # FastAPI's serialize_response + JSONResponse
+
+
+def peak_bytes(render, content) -> int:
+    gc.collect()
+    tracemalloc.start()
+    render(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def render_rows(count: int) -> list[dict]:
+    rows = []
+    for size in SIZES:
+        content = PAYLOADS[size]
+        body = len(render_fast(content).body)
+        n = max(20, count * 1000 // max(body, 1000))  # fewer rounds for the big body
+        std, orj = measure_sync(lambda: render_standard(content), n), measure_sync(lambda: render_fast(content), n)
+        rows.append({"body": size, "bytes": body, "std_us": std["us_per_op"], "orjson_us": orj["us_per_op"],
+                     "speedup": round(std["us_per_op"] / orj["us_per_op"], 1),
+                     "std_peak_kib": round(peak_bytes(render_standard, content) / 1024, 1),
+                     "orjson_peak_kib": round(peak_bytes(render_fast, content) / 1024, 1)})
+    return rows
+
+
+async def http_rows(base: str, count: int) -> list[dict]:
+    rows = []
+    async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+        for size in SIZES:
+            n = count if size != "1mb" else max(20, count // 10)
+            row = {"body": size, "requests": n}
+            for name, path in (("std", f"/std/{size}"), ("orjson", f"/fast/{size}")):
+                assert (await client.get(path)).json() == PAYLOADS[size]  # same document either way
+
+                async def op():
+                    (await client.get(path)).raise_for_status()
+
+                timing = await measure(op, n, concurrency=4)
+                row[f"{name}_req_per_s"] = timing["ops_per_s"]
+                row[f"{name}_p99_ms"] = timing["p99_ms"]
+            row["speedup"] = round(row["orjson_req_per_s"] / row["std_req_per_s"], 2)
+            rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.json_render", __doc__)
+    p.add_argument("--requests", type=int, default=500, help="per body size and route (1 MB: a tenth)")
+    args = p.parse_args(argv)
+    report("render: us per response and tracemalloc peak", render_rows(args.requests * 10), args.out)
+    with serve_app("src.webApp1.benchmarks.json_render:app") as base:
+        rows = asyncio.run(http_rows(base, args.requests))
+    report(f"http: local uvicorn, concurrency 4, {args.requests} requests per size", rows,
+           args.out and args.out.replace(".json", ".http.json"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
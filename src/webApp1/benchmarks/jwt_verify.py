@@ -0,0 +1,75 @@
+"""
+verify_token with and without the decoded-token cache, at several token reuse ratios.
+
+    python -m src.webApp1.benchmarks.jwt_verify --requests 50000
+
+reuse = share of requests carrying a token seen before (a signed-in user calling the API again with
+the same 30 minute token); the rest carry a token issued just now. ~0.99 is typical for a SPA
+polling the API, 0 is the cache's worst case (every lookup misses, then pays the decode anyway).
+"""
+import asyncio
+import random
+import sys
+from datetime import timedelta
+
+from jose import jwt
+
+from src.webApp1.benchmarks.common import measure, parser, report
+from src.webApp1.controller import jwt_token_generator as tokens
+from src.webApp1.service.token_cache import DecodedTokenCache
+
+
+def request_stream(count: int, reuse: float, seed: int = 7) -> list[str]:
+    """bearer tokens in arrival order, pre-encoded so signing is not timed"""
+    rng = random.Random(seed)
+    issued, stream = [], []
+    for i in range(count):
+        if issued and rng.random() < reuse:
+            stream.append(rng.choice(issued))
+        else:
+            issued.append(tokens.create_access_token({"sub": f"user-{i}"}, timedelta(minutes=30)))
+            stream.append(issued[-1])
+    return stream
+
+
+async def verifications(stream: list[str], cached: bool) -> dict:
+    feed = iter(stream)
+    if cached:
+        tokens.decoded_token_cache = DecodedTokenCache(deny_ttl=tokens.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+        async def op():
+            await tokens.verify_token(next(feed))
+    else:
+        async def op():  # what verify_token did before: decode + HMAC on every request
+            jwt.decode(next(feed), tokens.SECRET_KEY, algorithms=[tokens.ALGORITHM])
+
+    return await measure(op, len(stream))
+
+
+async def run(count: int, ratios: list[float]) -> list[dict]:
+    rows = []
+    for reuse in ratios:
+        stream = request_stream(count, reuse)
+        plain = await verifications(stream, cached=False)
+        cached = await verifications(stream, cached=True)
+        stats = tokens.decoded_token_cache.stats()
+        rows.append({"reuse": reuse, "no_cache_per_s": plain["ops_per_s"], "cached_per_s": cached["ops_per_s"],
+                     "speedup": round(cached["ops_per_s"] / plain["ops_per_s"], 2),
+                     "no_cache_p99_us": round(plain["p99_ms"] * 1000, 1),
+                     "cached_p99_us": round(cached["p99_ms"] * 1000, 1),
+                     "hits": stats["hit"], "decodes": stats["decode"]})
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.jwt_verify", __doc__)
+    p.add_argument("--requests", type=int, default=50_000)
+    p.add_argument("--reuse", type=float, nargs="+", default=[0.0, 0.5, 0.9, 0.99])
+    args = p.parse_args(argv)
+    rows = asyncio.run(run(args.requests, args.reuse))
+    report(f"verify_token, {args.requests} requests per ratio", rows, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
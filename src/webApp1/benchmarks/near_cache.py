@@ -0,0 +1,87 @@
+"""
+Hot-key reads: a redis GET per read vs NearCache (process memory until redis invalidates the key).
+
+    python -m src.webApp1.benchmarks.near_cache --keys 100 --reads 20000 --writes-per-s 0 500
+
+Reads pick one of `--keys` hot keys at random. With --writes-per-s > 0 a writer in the same process
+SETs a random hot key and calls written() at that rate, so hit ratio and latency include
+invalidations. Every read yields to the loop once, like a request would.
+The stand-in has no CLIENT TRACKING, the near cache runs in pubsub mode there; a real redis
+(--redis-url) gets tracking mode.
+"""
+import asyncio
+import random
+import sys
+
+import redis.asyncio as redis
+
+from src.webApp1.benchmarks.common import local_redis, measure, parser, report
+from src.webApp1.cache.near_cache import NearCache
+
+
+async def writer(client, near: NearCache, keys: list[str], rate: float):
+    while True:
+        key = random.choice(keys)
+        await client.set(key, f"value-{random.random()}")
+        await near.written([key])
+        await asyncio.sleep(1 / rate)
+
+
+async def started(url: str, mode: str) -> tuple[NearCache, asyncio.Task]:
+    near = NearCache(redis.from_url(url, decode_responses=True), mode=mode, prefixes=("item:",))
+    task = asyncio.create_task(near.run())
+    for _ in range(500):
+        if near.connected:
+            return near, task
+        await asyncio.sleep(0.01)
+    raise SystemExit("near cache listener never connected")
+
+
+async def run(url: str, keys: int, reads: int, write_rates: list[float], mode: str) -> list[dict]:
+    client = redis.from_url(url, decode_responses=True)
+    hot = [f"item:{i}" for i in range(keys)]
+    await client.mset({key: f"value-for-{key}" for key in hot})
+    near, listener = await started(url, mode)
+    rows = []
+    for rate in write_rates:
+        for name, get in (("redis GET", client.get), (f"near cache ({near.mode})", near.get)):
+            near.flush()
+            near.counters.update(dict.fromkeys(near.counters, 0))
+            background = asyncio.create_task(writer(client, near, hot, rate)) if rate else None
+
+            async def op():
+                assert await get(random.choice(hot)) is not None
+                await asyncio.sleep(0)  # a hit never yields, a request handler does: lets writer + listener run
+
+            timing = await measure(op, reads)
+            if background is not None:
+                background.cancel()
+                await asyncio.gather(background, return_exceptions=True)
+            rows.append({"writes_per_s": rate, "reads": name, "reads_per_s": timing["ops_per_s"],
+                         "mean_us": round(1e6 / timing["ops_per_s"], 1),  # p50 of a hit is below the 10us bucket
+                         "p50_us": round(timing["p50_ms"] * 1000, 1), "p99_us": round(timing["p99_ms"] * 1000, 1),
+                         "hit_ratio": near.stats()["hit_ratio"] if get == near.get else 0.0})
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+    await near.close()
+    await near.redis.aclose()
+    await client.aclose()
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.near_cache", __doc__)
+    p.add_argument("--keys", type=int, default=100, help="hot keys")
+    p.add_argument("--reads", type=int, default=20_000)
+    p.add_argument("--writes-per-s", type=float, nargs="+", default=[0, 500])
+    p.add_argument("--mode", default="tracking", choices=["tracking", "pubsub"])
+    p.add_argument("--redis-url")
+    args = p.parse_args(argv)
+    with local_redis(args.redis_url) as url:
+        rows = asyncio.run(run(url, args.keys, args.reads, args.writes_per_s, args.mode))
+    report(f"hot-key reads, {args.keys} keys, {args.reads} reads per row", rows, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Rate-limit algorithms side by side: redis memory per key and decisions per second.
+
+    python -m src.webApp1.benchmarks.ratelimit_algorithms --limit 1000 --hits 5000
+
+GCRA, sliding window counter and token bucket (ratelimit/algorithms.py) against the two they
+replace: fastapi_limiter's fixed window and the ZSET sliding log of the design docs.
+Memory is MEMORY USAGE on a real redis; the fakeredis stand-in has no MEMORY command, there it is
+the DUMP payload size (same trend, smaller numbers).
+"""
+import asyncio
+import random
+import sys
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from src.webApp1.benchmarks.common import local_redis, measure, parser, report
+from src.webApp1.ratelimit.algorithms import _NOW_MS, ALGORITHMS, Algorithm
+
+
+class FixedWindow(Algorithm):
+    """fastapi_limiter: one counter per window, 2x bursts across the boundary"""
+    name = "fixed_window"
+    script = _NOW_MS + """
+local c = redis.call('incr', KEYS[1])
+if c == 1 then redis.call('pexpire', KEYS[1], ARGV[1]) end
+if c > tonumber(ARGV[2]) then return {0, redis.call('pttl', KEYS[1])} end
+return {1, 0}
+"""
+
+    def args(self) -> list:
+        return [self.seconds * 1000, self.times]
+
+
+class SlidingLog(Algorithm):
+    """design docs' cache.md: one ZSET member per request in the window"""
+    name = "sliding_log"
+    script = _NOW_MS + """
+local window = tonumber(ARGV[1])
+redis.call('zremrangebyscore', KEYS[1], 0, now - window)
+if redis.call('zcard', KEYS[1]) >= tonumber(ARGV[2]) then return {0, window} end
+redis.call('zadd', KEYS[1], now, now .. '-' .. math.random(1000000000))
+redis.call('pexpire', KEYS[1], window)
+return {1, 0}
+"""
+
+    def args(self) -> list:
+        return [self.seconds * 1000, self.times]
+
+
+async def key_bytes(url: str, key: str) -> tuple[int, str]:
+    """the stand-in closes a connection after an unknown command, so each probe gets its own client"""
+    async with redis.from_url(url) as probe:
+        try:
+            return int(await probe.memory_usage(key)), "memory_usage"
+        except RedisError:
+            pass
+    async with redis.from_url(url) as probe:
+        return len(await probe.dump(key) or b""), "dump"
+
+
+async def run(url: str, limit: int, hits: int, keys: int) -> list[dict]:
+    client = redis.from_url(url)
+    await client.flushall()
+    rows = []
+    for cls in (FixedWindow, SlidingLog, *ALGORITHMS.values()):
+        algorithm = cls(limit, 60)
+        await client.script_load(algorithm.script)  # the stand-in drops the connection on NOSCRIPT
+        prefix = f"bench:{algorithm.name}:"
+
+        async def one_key():
+            await algorithm.hit(client, f"{prefix}hot")
+
+        for _ in range(limit):  # the hot key at its full quota: the sliding log's worst case
+            await one_key()
+        nbytes, method = await key_bytes(url, f"{prefix}hot")
+
+        async def many_keys():
+            await algorithm.hit(client, f"{prefix}{random.randrange(keys)}")
+
+        timing = await measure(many_keys, hits, concurrency=16)
+        rows.append({"algorithm": algorithm.name, f"bytes_per_key_at_{limit}": nbytes, "measured_by": method,
+                     "decisions_per_s": timing["ops_per_s"], "p50_ms": timing["p50_ms"], "p99_ms": timing["p99_ms"]})
+    await client.aclose()
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.ratelimit_algorithms", __doc__)
+    p.add_argument("--limit", type=int, default=1000, help="requests per minute per key")
+    p.add_argument("--hits", type=int, default=5000, help="timed decisions per algorithm")
+    p.add_argument("--keys", type=int, default=1000)
+    p.add_argument("--redis-url")
+    args = p.parse_args(argv)
+    with local_redis(args.redis_url) as url:
+        rows = asyncio.run(run(url, args.limit, args.hits, args.keys))
+    report(f"rate-limit algorithms, {args.limit}/min per key, {args.hits} decisions over {args.keys} keys", rows,
+           args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
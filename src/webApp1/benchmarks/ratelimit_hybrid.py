@@ -0,0 +1,97 @@
+"""
+Rate limit decisions: one Redis Lua call per request (fastapi_limiter 0.1's fixed window, what
+/rate-limited-api used before) vs HybridRateLimiter (local bucket, Redis only for leases).
+
+    python -m src.webApp1.benchmarks.ratelimit_hybrid --rate 10000 --duration 3
+
+Clients are `--keys` IPs sharing a `--limit` per minute quota each, so nearly every request is
+allowed and the Redis traffic is what differs. Redis is the local stand-in unless --redis-url is set.
+"""
+import asyncio
+import random
+import sys
+
+import redis.asyncio as redis
+
+from src.webApp1.benchmarks.common import local_redis, measure, open_loop, parser, report
+from src.webApp1.ratelimit.hybrid import HybridRateLimiter
+
+# fastapi_limiter 0.1.x: FastAPILimiter.lua_script, evaluated (EVALSHA) on every request
+FIXED_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local expire_time = ARGV[2]
+local current = tonumber(redis.call('get', key) or "0")
+if current > 0 then
+    if current + 1 > limit then
+        return redis.call("PTTL", key)
+    else
+        redis.call("INCR", key)
+        return 0
+    end
+else
+    redis.call("SET", key, 1, "px", expire_time)
+    return 0
+end
+"""
+
+
+class PerRequestLimiter:
+    """the old path, reduced to its Redis call"""
+
+    def __init__(self, client, times: int, seconds: int):
+        self.script = client.register_script(FIXED_WINDOW_SCRIPT)
+        self.times = times
+        self.ms = seconds * 1000
+        self.calls = 0
+
+    async def acquire(self, key: str) -> bool:
+        self.calls += 1
+        return await self.script(keys=[f"rl:fixed:{key}"], args=[self.times, self.ms]) == 0
+
+
+async def run(url: str, rate: float, duration: float, keys: int, limit: int) -> list[dict]:
+    client = redis.from_url(url)
+    await client.flushall()
+    await client.script_load(FIXED_WINDOW_SCRIPT)  # the fakeredis stand-in drops the connection on NOSCRIPT
+    ips = [f"10.0.{i // 256}.{i % 256}" for i in range(keys)]
+    old = PerRequestLimiter(client, limit, 60)
+    hybrid = HybridRateLimiter(times=limit, seconds=60)
+    hybrid.redis = client
+    rows = []
+    for name, limiter, calls in [("no limiter (driver only)", None, lambda: 0),
+                                 ("redis call per request", old, lambda: old.calls),
+                                 ("hybrid local bucket + leases", hybrid, lambda: hybrid.counters["lease"])]:
+        async def op():
+            if limiter is not None:
+                await limiter.acquire(random.choice(ips))
+
+        before = calls()
+        peak = await measure(op, int(rate), concurrency=64)
+        steady = await open_loop(op, rate, duration, max_in_flight=64)  # one redis pool, like a worker
+        requests = int(rate) + int(rate * duration)
+        rows.append({"limiter": name, "max_per_s": peak["ops_per_s"], "target_per_s": steady["target_per_s"],
+                     "achieved_per_s": steady["achieved_per_s"], "p50_ms": steady["p50_ms"],
+                     "p99_ms": steady["p99_ms"], "redis_calls_per_1k": round((calls() - before) / requests * 1000, 1)})
+    await hybrid.close()
+    await client.aclose()
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.ratelimit_hybrid", __doc__)
+    p.add_argument("--rate", type=float, default=10_000, help="open-loop requests per second")
+    p.add_argument("--duration", type=float, default=3)
+    p.add_argument("--keys", type=int, default=1000, help="distinct client IPs")
+    p.add_argument("--limit", type=int, default=100_000, help="requests per minute per IP")
+    p.add_argument("--redis-url")
+    args = p.parse_args(argv)
+    with local_redis(args.redis_url) as url:
+        rows = asyncio.run(run(url, args.rate, args.duration, args.keys, args.limit))
+    report(f"rate limit decisions, {args.keys} IPs, open loop at {args.rate:g}/s for {args.duration:g}s", rows,
+           args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
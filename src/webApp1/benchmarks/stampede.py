@@ -0,0 +1,142 @@
+"""
+Hot-key expiry: recomputes per expiry with 500 concurrent clients, plain cache-aside vs MultiLevelCache.
+
+    python -m src.webApp1.benchmarks.stampede --clients 500 --workers 8 --ttl 1 --cycles 10
+
+`--workers` MultiLevelCache instances (one per simulated worker, own L1 and single-flight) share one
+FakeAsyncRedis; every client is bound to a worker and reads the one hot key in a loop with `--think`
+seconds between reads, for `--cycles` x `--ttl` seconds. The loader takes `--load-ms`; recomputes per
+expiry = loader calls after the cold start / (run seconds / ttl), value_min_age_ms is the youngest
+value a load replaced (near 0 = the same expiry recomputed twice).
+Rows: cache-aside (GET, on a miss load + SET PX, no protection), MultiLevelCache without XFetch
+(beta=0) with stale_ttl=0 (an expired key is a cold miss: lock holder loads, the others wait) and
+stale_ttl=ttl (stale served while one refresh runs), both must stay at <= 1 recompute per expiry;
+then with XFetch (beta=1), which refreshes ahead of expiry by about load time x ln(reads per ttl):
+fewer stale reads, more recomputes when ttl is short next to the load time.
+"""
+import asyncio
+import collections
+import random
+import sys
+import time
+
+import fakeredis
+
+from src.webApp1.benchmarks.common import parser, report
+from src.webApp1.cache.multilevel import MultiLevelCache
+from src.webApp1.loadgen import LatencyHistogram
+
+KEY = "hot"
+
+
+class Loader:
+    """the source of truth: `delay` seconds per call, counts calls and the age of the value each one replaces"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self.loaded_at = None  # when the current value was computed
+        self.replaced_ages = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.loaded_at is not None:
+            self.replaced_ages.append(time.perf_counter() - self.loaded_at)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        self.loaded_at = time.perf_counter()
+        return f"value-{self.calls}"
+
+    def stats(self, expiries: float) -> dict:
+        return {"loader_calls": self.calls, "expiries": round(expiries, 1),
+                "recomputes_per_expiry": round((self.calls - 1) / expiries, 2),
+                "max_concurrent_loads": self.max_in_flight,
+                "value_min_age_ms": round(min(self.replaced_ages, default=0) * 1000, 1)}
+
+
+class CacheAside:
+    """the unprotected baseline: every reader that finds the key missing recomputes it"""
+
+    def __init__(self, redis, ttl: float):
+        self.redis = redis
+        self.ttl_ms = int(ttl * 1000)
+        self.counters = {}
+
+    async def get(self, key, loader):
+        value = await self.redis.get(key)
+        if value is None:
+            value = await loader()
+            await self.redis.set(key, value, px=self.ttl_ms)
+        return value
+
+
+async def one_row(name: str, caches: list, loader: Loader, clients: int, ttl: float, duration: float,
+                  think: float) -> dict:
+    histogram = LatencyHistogram()
+    deadline = time.perf_counter() + duration
+
+    async def client(cache):
+        await asyncio.sleep(random.random() * think)  # spread the first reads
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await cache.get(KEY, loader)
+            histogram.record(time.perf_counter() - started)
+            await asyncio.sleep(think)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(caches[i % len(caches)]) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    for cache in caches:
+        await asyncio.gather(*getattr(cache, "_refreshing", {}).values())
+    summary = histogram.summary()
+    counters = collections.Counter()
+    for cache in caches:
+        counters.update(cache.counters)
+    return {"cache": name, "reads": summary["count"], "reads_per_s": round(summary["count"] / elapsed, 1),
+            **loader.stats(elapsed / ttl), "stale_served": counters["stale_hit"], "lock_busy": counters["lock_busy"],
+            "lock_wait_hits": counters["lock_wait_hit"], "p99_ms": summary["p99_ms"]}
+
+
+async def run(clients: int, workers: int, ttl: float, cycles: int, load_ms: float, think: float) -> list[dict]:
+    def multilevel(stale_ttl, beta):
+        return lambda redis: MultiLevelCache(redis, prefix="s:", ttl=ttl, stale_ttl=stale_ttl, beta=beta)
+
+    variants = [
+        ("cache-aside", lambda redis: CacheAside(redis, ttl)),
+        ("multilevel, stale_ttl=0", multilevel(0, 0)),
+        (f"multilevel, stale_ttl={ttl:g}", multilevel(ttl, 0)),
+        (f"multilevel, stale_ttl={ttl:g}, xfetch", multilevel(ttl, 1)),
+    ]
+    rows = []
+    for name, make in variants:
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)  # one shared "redis" for every worker
+        loader = Loader(load_ms / 1000)
+        rows.append(await one_row(name, [make(redis) for _ in range(workers)], loader, clients, ttl, cycles * ttl,
+                                  think))
+        await redis.aclose()
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.stampede", __doc__)
+    p.add_argument("--clients", type=int, default=500)
+    p.add_argument("--workers", type=int, default=8, help="MultiLevelCache instances sharing the redis")
+    p.add_argument("--ttl", type=float, default=1, help="seconds a value stays fresh")
+    p.add_argument("--cycles", type=int, default=10, help="expiry cycles, the run lasts cycles x ttl")
+    p.add_argument("--load-ms", type=float, default=50, help="recompute cost")
+    p.add_argument("--think", type=float, default=0.01, help="seconds between a client's reads")
+    args = p.parse_args(argv)
+    rows = asyncio.run(run(args.clients, args.workers, args.ttl, args.cycles, args.load_ms, args.think))
+    report(f"one hot key, {args.clients} clients over {args.workers} workers, ttl {args.ttl:g}s, "
+           f"{args.cycles} cycles, {args.load_ms:g} ms recompute", rows, args.out)
+    for row in rows[1:3]:
+        assert row["recomputes_per_expiry"] <= 1, f"{row['cache']}: {row['recomputes_per_expiry']} per expiry"
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Transaction history depth: keyset pages (TransactionHistory.page with a cursor) vs the same query with
+OFFSET, from page 1 to page 10,000, on a seeded 10M-row transactions table.
+
+    python -m src.webApp1.benchmarks.transaction_history --rows 10000000 --db-file /tmp/history.db
+
+Seeding goes straight through sqlite3 (indexes built after the load), in the same column formats
+SQLAlchemy writes; --db-file keeps the database for the next run, which then skips seeding.
+One heavy user is a party to `--heavy-share` of the rows so page 10,000 (x 20 rows) exists for them,
+the rest are spread over `--users` users. The cursor for page N is taken from the row that ends
+page N-1 (not timed); every timed call is what GET /api/v1/transactions?cursor=... runs.
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, union_all
+
+from src.webApp1.benchmarks.common import parser, report
+from src.webApp1.dao.database import DatabaseManager
+from src.webApp1.dao.transactions import LISTED, DEFAULT_LIMIT, TransactionHistory, transactions
+
+HEAVY = uuid.UUID(int=1)
+BATCH = 100_000
+
+
+def seed(path: str, rows: int, users: int, heavy_share: float):
+    con = sqlite3.connect(path)
+    if con.execute("SELECT name FROM sqlite_master WHERE name = 'transactions'").fetchone():
+        if con.execute("SELECT count(*) FROM transactions").fetchone()[0] >= rows:
+            con.close()
+            return False
+    con.close()
+
+    db = DatabaseManager(f"sqlite+aiosqlite:///{path}")
+    asyncio.run(TransactionHistory(db, secret=b"bench").create_schema())
+    asyncio.run(db.close())
+
+    con = sqlite3.connect(path)
+    con.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF; PRAGMA cache_size=-1000000;")
+    indexes = con.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall()
+    for name, _ in indexes:
+        con.execute(f"DROP INDEX {name}")
+    rng = random.Random(7)
+    population = [uuid.UUID(int=rng.getrandbits(128)).hex for _ in range(users)]
+    heavy = HEAVY.hex
+    start = datetime(2025, 1, 1)
+    step = timedelta(days=365) / rows
+    insert = ("INSERT INTO transactions (transaction_id, sender_id, receiver_id, amount, currency, transaction_type, "
+              "status, fees, created_at) VALUES (?, ?, ?, ?, 'USD', 'transfer', 'completed', 0, ?)")
+    started = time.perf_counter()
+    for offset in range(0, rows, BATCH):
+        batch = []
+        for i in range(offset, min(rows, offset + BATCH)):
+            sender, receiver = rng.choice(population), rng.choice(population)
+            if rng.random() < heavy_share:
+                if rng.random() < 0.5:
+                    sender = heavy
+                else:
+                    receiver = heavy
+            batch.append((os.urandom(16).hex(), sender, receiver, rng.randrange(1, 100_000) / 100,
+                          (start + step * i).strftime("%Y-%m-%d %H:%M:%S.%f")))
+        con.executemany(insert, batch)
+        con.commit()
+        print(f"seeded {offset + len(batch):,} rows in {time.perf_counter() - started:.0f}s", end="\r", flush=True)
+    print()
+    for _, sql in indexes:
+        con.execute(sql)
+    con.execute("ANALYZE")
+    con.commit()
+    con.close()
+    print(f"seeded {rows:,} rows + indexes in {time.perf_counter() - started:.0f}s")
+    return True
+
+
+def offset_query(user_id, page: int, limit: int = DEFAULT_LIMIT):
+    """the OFFSET version of TransactionHistory._page: each side must return every row up to the page"""
+    t = transactions.c
+    depth = page * limit
+
+    def side(column):
+        return (select(t.transaction_id, *(getattr(t, c) for c in LISTED), t.created_at).where(column == user_id)
+                .order_by(t.created_at.desc(), t.transaction_id.desc()).limit(depth).subquery())
+
+    both = union_all(select(side(t.sender_id)), select(side(t.receiver_id))).subquery()
+    return (select(both).order_by(both.c.created_at.desc(), both.c.transaction_id.desc())
+            .offset(depth - limit).limit(limit))
+
+
+async def timed(call, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {"p50": round(samples[len(samples) // 2], 2), "max": round(samples[-1], 2)}
+
+
+async def run(path: str, pages: list[int], repeat: int) -> list[dict]:
+    db = DatabaseManager(f"sqlite+aiosqlite:///{path}", pool_size=1, max_overflow=0)
+    history = TransactionHistory(db, secret=b"bench")
+    rows = []
+    for page in pages:
+        cursor = None
+        if page > 1:  # the row ending page - 1, encoded like the previous response's next_cursor
+            async with db.reader() as session:
+                last = (await session.execute(offset_query(HEAVY, page - 1))).all()[-1]
+            scope = history._scope(HEAVY, None, None, None)
+            cursor = history.cursors.encode(last.created_at, last.transaction_id, scope)
+
+        async def keyset():
+            result = await history.page(HEAVY, cursor=cursor)
+            assert len(result["transactions"]) == DEFAULT_LIMIT
+
+        async def offset():
+            async with db.reader() as session:
+                assert len((await session.execute(offset_query(HEAVY, page))).all()) == DEFAULT_LIMIT
+
+        keyset_ms = await timed(keyset, repeat)
+        offset_ms = await timed(offset, max(3, repeat // 10) if page >= 1000 else repeat)
+        rows.append({"page": page, "keyset_p50_ms": keyset_ms["p50"], "keyset_max_ms": keyset_ms["max"],
+                     "offset_p50_ms": offset_ms["p50"], "offset_max_ms": offset_ms["max"]})
+    await db.close()
+    return rows
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.transaction_history", __doc__)
+    p.add_argument("--rows", type=int, default=10_000_000)
+    p.add_argument("--users", type=int, default=100_000)
+    p.add_argument("--heavy-share", type=float, default=0.025, help="share of rows involving the heavy user")
+    p.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000, 10_000])
+    p.add_argument("--repeat", type=int, default=50)
+    p.add_argument("--db-file", help="keep the seeded database here (reused when already seeded)")
+    args = p.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db_file or os.path.join(tmp, "history.db")
+        seed(path, args.rows, args.users, args.heavy_share)
+        rows = asyncio.run(run(path, args.pages, args.repeat))
+    report(f"history of one user with ~{int(args.rows * args.heavy_share):,} of {args.rows:,} rows, "
+           f"{DEFAULT_LIMIT} per page, sqlite", rows, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
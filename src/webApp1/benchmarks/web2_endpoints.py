@@ -0,0 +1,96 @@
+"""
+Every loadgen scenario (one per web2.py endpoint) against the real app on a local uvicorn.
+
+    python -m src.webApp1.benchmarks.web2_endpoints --duration 5 --concurrency 16
+
+Runs web2:app with its lifespan from a scratch directory: env/bench.json points Okta at a local
+stub (token + introspection), redis is the local stand-in unless --redis-url is given, the
+database is SQLite, uploads land in the scratch directory. The load is src.webApp1.loadgen itself,
+closed loop (or open loop with --rate), so the numbers match what `python -m src.webApp1.loadgen`
+prints against a deployed server.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import redis.asyncio as redis
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.webApp1 import loadgen
+from src.webApp1.benchmarks.common import local_redis, parser, report, serve_app
+from src.webApp1.ratelimit.algorithms import ALGORITHMS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+async def token_endpoint(request):
+    await request.form()
+    return JSONResponse({"access_token": "bench-token", "token_type": "Bearer", "expires_in": 3600})
+
+
+async def introspect_endpoint(request):
+    await request.form()
+    return JSONResponse({"active": True, "sub": "bench-user", "scope": "fastapiweb2",
+                         "exp": int(time.time()) + 3600})
+
+
+okta_app = Starlette(routes=[Route("/oauth2/default/v1/token", token_endpoint, methods=["POST"]),
+                             Route("/oauth2/default/v1/introspect", introspect_endpoint, methods=["POST"])])
+
+
+def scratch_dir(tmp: str, okta: str) -> dict:
+    """env/bench.json + a link to the sources (web2 reads both relative to its cwd) -> server env"""
+    os.makedirs(os.path.join(tmp, "env"))
+    with open(os.path.join(tmp, "env", "bench.json"), "w") as f:
+        json.dump({"oauth": {"okta": {"OKTA_TOKEN_URL": f"{okta}/oauth2/default/v1/token",
+                                      "OKTA_INTROSPECT_URL": f"{okta}/oauth2/default/v1/introspect",
+                                      "OKTA_CLIENT_ID": "bench", "OKTA_SCOPE": "fastapiweb2"}}}, f)
+    os.symlink(os.path.join(ROOT, "src"), os.path.join(tmp, "src"))
+    return {"ETL_APP_ENV": "bench", "OKTA_CLIENT_SECRET": "bench", "CURSOR_SECRET": "bench-cursor-secret",
+            "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/bench.db", "UPLOAD_DIR": os.path.join(tmp, "uploads"),
+            "METRICS_DIR": os.path.join(tmp, "metrics"), "AUDIT_SINK": "off"}
+
+
+async def preload_scripts(url: str):
+    """the stand-in drops the connection on NOSCRIPT, RateLimit would fail open on every request"""
+    async with redis.from_url(url) as client:
+        for algorithm in ALGORITHMS.values():
+            await client.script_load(algorithm.script)
+
+
+def loadgen_args(base: str, args) -> argparse.Namespace:
+    return argparse.Namespace(base_url=base, scenario=list(loadgen.SCENARIOS), duration=args.duration,
+                              concurrency=args.concurrency, rate=args.rate, timeout=30, keyspace=1000,
+                              payload=os.urandom(args.payload_size), token="bench-token")
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.web2_endpoints", __doc__)
+    p.add_argument("--duration", type=float, default=5, help="seconds per endpoint")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--rate", type=float, help="req/s, open loop instead of closed")
+    p.add_argument("--payload-size", type=int, default=64 * 1024, help="upload body bytes")
+    p.add_argument("--redis-url")
+    args = p.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp, local_redis(args.redis_url) as redis_url, \
+            serve_app("src.webApp1.benchmarks.web2_endpoints:okta_app") as okta:
+        asyncio.run(preload_scripts(redis_url))
+        env = {**scratch_dir(tmp, okta), "REDIS_CLOUD_URL": redis_url.removeprefix("redis://")}
+        with serve_app("src.webApp1.controller.web2:app", env=env, cwd=tmp) as base:
+            results = asyncio.run(loadgen.run(loadgen_args(base, args)))
+    rows = [{"endpoint": r["scenario"], "req_per_s": r["rps"], "p50_ms": r["latency"]["p50_ms"],
+             "p99_ms": r["latency"]["p99_ms"], "statuses": " ".join(f"{k}:{v}" for k, v in r["statuses"].items()),
+             "errors": sum(r["errors"].values())} for r in results]
+    mode = f"open loop {args.rate:g}/s" if args.rate else f"closed loop, {args.concurrency} users"
+    report(f"web2 endpoints on a local uvicorn, {mode}, {args.duration:g}s each", rows, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
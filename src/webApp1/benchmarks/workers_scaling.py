@@ -0,0 +1,80 @@
+"""
+Pre-fork scaling: requests/s of `python -m src.webApp1.serve --workers N` for N = 1, 2, 4, ...
+
+    python -m src.webApp1.benchmarks.workers_scaling --workers 1 2 4 --duration 5
+
+web2:app is served by the supervisor from the same scratch setup as web2_endpoints (stub Okta,
+SQLite, redis stand-in); the load is src.webApp1.loadgen, closed loop. Each run waits until GET /workers
+reports every worker ready. Scaling needs cores: the load generator, the workers and the redis
+stand-in all share os.cpu_count() cores, past that extra workers only add context switches.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from src.webApp1 import loadgen
+from src.webApp1.benchmarks.common import _process, free_port, local_redis, parser, report, serve_app
+from src.webApp1.benchmarks.web2_endpoints import preload_scripts, scratch_dir
+
+SCENARIOS = ["custom-response", "cache-get"]  # CPU only / one redis GET on an L1 miss
+
+
+def wait_ready(base: str, workers: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            rows = httpx.get(f"{base}/workers", timeout=5).json().get("workers", [])
+            if sum(1 for row in rows if row["ready"]) == workers:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{workers} workers not ready after {timeout}s")
+
+
+def run_load(base: str, args) -> list[dict]:
+    namespace = argparse.Namespace(base_url=base, scenario=SCENARIOS, duration=args.duration,
+                                   concurrency=args.concurrency, rate=None, timeout=30, keyspace=1000,
+                                   payload=b"", token="")
+    return asyncio.run(loadgen.run(namespace))
+
+
+def main(argv=None):
+    p = parser("src.webApp1.benchmarks.workers_scaling", __doc__)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--duration", type=float, default=5, help="seconds per scenario")
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--redis-url")
+    args = p.parse_args(argv)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp, local_redis(args.redis_url) as redis_url, \
+            serve_app("src.webApp1.benchmarks.web2_endpoints:okta_app") as okta:
+        asyncio.run(preload_scripts(redis_url))
+        env = {**scratch_dir(tmp, okta), "REDIS_CLOUD_URL": redis_url.removeprefix("redis://")}
+        baseline = {}
+        for workers in args.workers:
+            port = free_port()
+            command = [sys.executable, "-m", "src.webApp1.serve", "--workers", str(workers), "--port", str(port),
+                       "--log-level", "warning"]
+            with _process(command, port, f"serve --workers {workers}", env, tmp):
+                base = f"http://127.0.0.1:{port}"
+                wait_ready(base, workers)
+                for result in run_load(base, args):
+                    rps = result["rps"]
+                    baseline.setdefault(result["scenario"], rps)
+                    rows.append({"workers": workers, "scenario": result["scenario"], "req_per_s": rps,
+                                 "vs_1_worker": round(rps / baseline[result["scenario"]], 2),
+                                 "p50_ms": result["latency"]["p50_ms"], "p99_ms": result["latency"]["p99_ms"],
+                                 "errors": sum(result["errors"].values())})
+    report(f"pre-fork web2, closed loop {args.concurrency} users, {args.duration:g}s per scenario, "
+           f"{os.cpu_count()} CPU(s)", rows, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,347 @@
+import asyncio
+import functools
+import json
+import math
+import time
+
+from redis.exceptions import RedisError
+
+from src.webApp1.cache.lru import TTLCache, MISSING
+from src.webApp1.cache.singleflight import SingleFlight
+from src.webApp1.cache.stampede import xfetch_refresh, acquire_lock, release_lock
+
+
+class MultiLevelCache:
+    """
+    L1 in-process LRU (O(1) evict) -> L2 Redis -> loader (L3, source of truth).
+    - ttl       : how long a value is fresh
+    - stale_ttl : how long after that it may still be served while one background refresh runs
+                  (stale-while-revalidate)
+    - l1_ttl    : kept <= ttl so workers re-check Redis and converge on the shared copy
+    - misses for the same key are coalesced, N concurrent misses -> 1 loader call
+    - L2 values are JSON envelopes {"v": value, "f": fresh_until, "d": load seconds};
+      Redis errors degrade to L1 + loader
+    - stampede protection when a hot key expires:
+      - XFetch: a fresh value may be refreshed early, probability grows near expiry (beta)
+      - recompute runs under a short Redis lock (SET NX PX lock_ms), one process at a time;
+        the others keep serving the stale value, or wait for the lock holder on a cold miss;
+        the next lock holder re-reads L2 first and skips the load when the holder before it refreshed
+
+    redis can be set after construction (eg: in the lifespan hook), None = L1 only.
+    near: optional NearCache over the same client, L2 reads of unchanged keys then stay in process
+    shared: optional SharedState (pre-fork mode), loaded values are visible to the other workers
+            on this host without a Redis round trip, bounded by l1_ttl like L1
+    """
+
+    def __init__(self, redis=None, prefix: str = "cache:", ttl: float = 30, stale_ttl: float = 30,
+                 l1_maxsize: int = 1000, l1_ttl: float | None = None,
+                 beta: float = 1.0, lock_ms: int = 5000):
+        self.redis = redis
+        self.near = None
+        self.shared = None
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.l1_ttl = min(ttl, l1_ttl) if l1_ttl is not None else ttl
+        self.beta = beta
+        self.lock_ms = lock_ms
+        self.l1 = TTLCache(maxsize=l1_maxsize, ttl=ttl + stale_ttl)
+        self.flight = SingleFlight()
+        self._refreshing = {}  # key -> task, holds a strong ref until done
+        self.counters = dict.fromkeys(
+            ("l1_hit", "shared_hit", "l2_hit", "stale_hit", "miss", "load", "load_skipped", "load_error", "refresh",
+             "early_refresh", "lock_busy", "lock_wait_hit", "redis_error"), 0)
+
+    # ---- read path ----
+
+    async def fetch(self, key: str, loader, ttl: float | None = None):
+        """-> (value, source), source in l1 | l2 | stale | fresh"""
+        now = time.time()
+        stale = MISSING
+        entry = self.l1.get(key)
+        if entry is not MISSING:
+            value, fresh_until, delta = entry
+            if now < fresh_until:
+                self.counters["l1_hit"] += 1
+                self._maybe_refresh_early(key, loader, ttl, value, fresh_until, delta, now)
+                return value, "l1"
+            stale = value
+
+        entry, tier = await self._l2_get(key)
+        if entry is not None:
+            value, fresh_until, delta = entry
+            if now < fresh_until:
+                self.counters[f"{tier}_hit"] += 1  # shared_hit | l2_hit, one lookup counts once
+                self._l1_set(key, value, fresh_until, delta)
+                self._maybe_refresh_early(key, loader, ttl, value, fresh_until, delta, now)
+                return value, "l2"
+            if stale is MISSING:
+                stale = value
+
+        if stale is not MISSING:
+            self.counters["stale_hit"] += 1
+            self._refresh_later(key, loader, ttl, stale, now)
+            return stale, "stale"
+
+        self.counters["miss"] += 1
+        value = await self.flight.do(key, lambda: self._load(key, loader, ttl, fresh_after=now))
+        return value, "fresh"
+
+    async def fetch_many(self, keys: list[str], loader, ttl=None) -> dict:
+        """
+        batch read -> {key: (value, source)}, source in l1 | l2 | stale | fresh | error
+        - L1 first, the rest in ONE redis MGET
+        - misses: loader(key) for all of them concurrently (coalesced with single reads)
+        - write back in ONE pipelined MULTI/EXEC, ttl may be a number or fn(key) -> seconds
+        """
+        now = time.time()
+        results = {}
+        remaining = []
+        for key in dict.fromkeys(keys):
+            entry = self.l1.get(key)
+            if entry is not MISSING and now < entry[1]:
+                self.counters["l1_hit"] += 1
+                results[key] = (entry[0], "l1")
+            else:
+                remaining.append(key)
+
+        misses = []
+        for key, entry in zip(remaining, await self._l2_get_many(remaining)):
+            if entry is None:
+                misses.append(key)
+                continue
+            value, fresh_until, delta = entry
+            if now < fresh_until:
+                self.counters["l2_hit"] += 1
+                self._l1_set(key, value, fresh_until, delta)
+                results[key] = (value, "l2")
+            else:
+                self.counters["stale_hit"] += 1
+                self._refresh_later(key, lambda k=key: loader(k), self._ttl_for(ttl, key), value, now)
+                results[key] = (value, "stale")
+
+        if misses:
+            self.counters["miss"] += len(misses)
+            self.counters["load"] += len(misses)
+            loaded = await asyncio.gather(
+                *(self.flight.do(key, lambda k=key: loader(k)) for key in misses), return_exceptions=True)
+            fresh = {}
+            for key, value in zip(misses, loaded):
+                if isinstance(value, Exception):
+                    self.counters["load_error"] += 1
+                    results[key] = (None, "error")
+                else:
+                    fresh[key] = value
+                    results[key] = (value, "fresh")
+            await self._set_many(fresh, ttl)
+        return results
+
+    async def get(self, key: str, loader, ttl: float | None = None):
+        value, _ = await self.fetch(key, loader, ttl)
+        return value
+
+    # ---- write path ----
+
+    async def set(self, key: str, value, ttl: float | None = None, delta: float = 0.0):
+        """delta: seconds the value took to compute, drives XFetch early refresh"""
+        ttl = self.ttl if ttl is None else ttl
+        fresh_until = time.time() + ttl
+        self._l1_set(key, value, fresh_until, delta)
+        self._shared_set(key, value, fresh_until, delta)
+        if self.redis is not None:
+            try:
+                envelope = json.dumps({"v": value, "f": fresh_until, "d": delta})
+                await self.redis.set(self.prefix + key, envelope, ex=math.ceil(ttl + self.stale_ttl))
+            except RedisError:
+                self.counters["redis_error"] += 1
+            await self._near_written([key])
+
+    async def invalidate(self, key: str):
+        self.l1.pop(key)
+        if self.shared is not None:
+            self.shared.delete(self.prefix + key)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(self.prefix + key)
+            except RedisError:
+                self.counters["redis_error"] += 1
+            await self._near_written([key])
+
+    def cached(self, key: str, ttl: float | None = None):
+        """
+        endpoint decorator, key is formatted with the endpoint's keyword arguments
+
+        @data_cache.cached("item:{item_id}")
+        async def get_item(item_id: int): ...
+        """
+        def decorator(func):
+            @functools.wraps(func)  # keeps the signature FastAPI inspects
+            async def wrapper(*args, **kwargs):
+                return await self.get(key.format(**kwargs), lambda: func(*args, **kwargs), ttl)
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        c = self.counters
+        lookups = c["l1_hit"] + c["shared_hit"] + c["l2_hit"] + c["stale_hit"] + c["miss"]
+        l2_lookups = lookups - c["l1_hit"] - c["shared_hit"]
+        return {
+            **c,
+            "coalesced": self.flight.coalesced,
+            "l1_size": len(self.l1),
+            "l1_hit_ratio": round(c["l1_hit"] / lookups, 4) if lookups else 0.0,
+            "l2_hit_ratio": round(c["l2_hit"] / l2_lookups, 4) if l2_lookups else 0.0,
+            "hit_ratio": round((lookups - c["miss"]) / lookups, 4) if lookups else 0.0,
+        }
+
+    # ---- internals ----
+
+    def _l1_set(self, key, value, fresh_until, delta):
+        fresh_until = min(fresh_until, time.time() + self.l1_ttl)
+        self.l1.set(key, (value, fresh_until, delta), ttl=fresh_until - time.time() + self.stale_ttl)
+
+    def _shared_set(self, key, value, fresh_until, delta):
+        if self.shared is None:
+            return
+        fresh_until = min(fresh_until, time.time() + self.l1_ttl)
+        envelope = json.dumps({"v": value, "f": fresh_until, "d": delta}).encode()
+        self.shared.set(self.prefix + key, envelope, ttl=fresh_until - time.time() + self.stale_ttl)
+
+    @staticmethod
+    def _ttl_for(ttl, key):
+        return ttl(key) if callable(ttl) else ttl
+
+    async def _set_many(self, values: dict, ttl):
+        if not values:
+            return
+        now = time.time()
+        envelopes = {}
+        for key, value in values.items():
+            key_ttl = self._ttl_for(ttl, key)
+            key_ttl = self.ttl if key_ttl is None else key_ttl
+            self._l1_set(key, value, now + key_ttl, 0.0)
+            self._shared_set(key, value, now + key_ttl, 0.0)
+            envelopes[key] = (json.dumps({"v": value, "f": now + key_ttl, "d": 0.0}), key_ttl)
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for key, (envelope, key_ttl) in envelopes.items():
+                    pipe.set(self.prefix + key, envelope, ex=math.ceil(key_ttl + self.stale_ttl))
+                await pipe.execute()
+        except RedisError:
+            self.counters["redis_error"] += 1
+        await self._near_written(envelopes)
+
+    async def _near_written(self, keys):
+        if self.near is not None:
+            await self.near.written(self.prefix + key for key in keys)
+
+    async def _l2_get_many(self, keys: list) -> list:
+        if not keys or self.redis is None:
+            return [None] * len(keys)
+        try:
+            raws = await self.redis.mget([self.prefix + key for key in keys])
+        except RedisError:
+            self.counters["redis_error"] += 1
+            return [None] * len(keys)
+        return [self._decode(raw) for raw in raws]
+
+    @staticmethod
+    def _decode(raw):
+        if raw is None:
+            return None
+        try:
+            envelope = json.loads(raw)
+            return envelope["v"], envelope["f"], envelope.get("d", 0.0)
+        except (ValueError, TypeError, KeyError):
+            return None  # written by something else, treat as a miss
+
+    async def _l2_get(self, key):
+        """-> (entry | None, tier), tier "shared" (pre-fork segment) | "l2" (redis / near cache), counted by the caller"""
+        if self.shared is not None:
+            entry = self._decode(self.shared.get(self.prefix + key))
+            if entry is not None:
+                return entry, "shared"
+        if self.redis is None:
+            return None, "l2"
+        try:
+            raw = await (self.near if self.near is not None else self.redis).get(self.prefix + key)
+        except RedisError:
+            self.counters["redis_error"] += 1
+            return None, "l2"
+        return self._decode(raw), "l2"
+
+    async def _load(self, key, loader, ttl, stale=MISSING, fresh_after: float | None = None):
+        """
+        fresh_after: fresh_until of the copy this load replaces (now for a miss / stale copy); once the
+        lock is held, an L2 value fresh beyond it was loaded meanwhile by another worker -> used as is,
+        so one expiry costs one recompute however many workers noticed it
+        """
+        lock_key = f"{self.prefix}lock:{key}"
+        token = None
+        if self.redis is not None:
+            try:
+                token = await acquire_lock(self.redis, lock_key, self.lock_ms)
+                if token is None:
+                    self.counters["lock_busy"] += 1
+                    if stale is not MISSING:
+                        return stale  # another process is recomputing, keep serving stale
+                    value = await self._wait_for_holder(key)
+                    if value is not MISSING:
+                        return value
+            except RedisError:
+                self.counters["redis_error"] += 1
+
+        try:
+            if fresh_after is not None:
+                entry, _ = await self._l2_get(key)
+                if entry is not None and entry[1] > max(fresh_after, time.time()):
+                    self.counters["load_skipped"] += 1
+                    self._l1_set(key, *entry)
+                    return entry[0]
+            self.counters["load"] += 1
+            started = time.monotonic()
+            value = await loader()
+            await self.set(key, value, ttl, delta=time.monotonic() - started)
+            return value
+        except Exception:
+            self.counters["load_error"] += 1
+            raise
+        finally:
+            if token is not None:
+                try:
+                    await release_lock(self.redis, lock_key, token)
+                except RedisError:
+                    self.counters["redis_error"] += 1  # expires on its own after lock_ms
+
+    async def _wait_for_holder(self, key):
+        """cold miss while another process holds the lock: poll L2 until lock_ms, then give up"""
+        deadline = time.monotonic() + self.lock_ms / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            entry, _ = await self._l2_get(key)
+            if entry is not None:
+                self.counters["lock_wait_hit"] += 1
+                self._l1_set(key, entry[0], entry[1], entry[2])
+                return entry[0]
+        return MISSING
+
+    def _maybe_refresh_early(self, key, loader, ttl, value, fresh_until, delta, now):
+        if xfetch_refresh(fresh_until, delta, now, self.beta) and \
+                self._refresh_later(key, loader, ttl, value, fresh_until):
+            self.counters["early_refresh"] += 1
+
+    def _refresh_later(self, key, loader, ttl, stale, fresh_after: float):
+        if key in self.flight.inflight or key in self._refreshing:
+            return False
+        self.counters["refresh"] += 1
+        task = asyncio.create_task(self.flight.do(key, lambda: self._load(key, loader, ttl, stale, fresh_after)))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda t: self._refresh_done(key, t))
+        return True
+
+    def _refresh_done(self, key, task):
+        self._refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"cache refresh failed for {key}: {task.exception()!r}")
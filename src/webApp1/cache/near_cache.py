@@ -0,0 +1,229 @@
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+
+from redis.exceptions import RedisError
+
+TRACKING_CHANNEL = "__redis__:invalidate"
+
+
+class NearCache:
+    """
+    Process-local copy of hot Redis keys, kept until Redis says they changed.
+    - mode "tracking": reads go over one dedicated connection with
+      CLIENT TRACKING ON REDIRECT <listener id>, Redis pushes the keys it served us
+      to __redis__:invalidate as soon as anyone writes them (RESP2 redirect, works on redis >= 6)
+    - mode "pubsub": for servers / proxies without tracking, writers call written(keys)
+      which PUBLISHes them on `channel`, every process drops its copy
+    - tracking falls back to pubsub when the server rejects CLIENT TRACKING
+    - bounded by maxsize entries and max_bytes (approx sys.getsizeof), LRU evicted;
+      ttl is only a safety net for a lost invalidation
+    - no invalidation stream (listener down / reconnecting) -> nothing is served or kept locally,
+      reads go straight to Redis
+    - a read racing a write is not stored: invalidations seen while a GET is in flight
+      bump the key's generation and the reply is returned but not cached
+
+    redis can be set after construction, run() is meant to be a lifespan background task.
+    """
+
+    def __init__(self, redis=None, maxsize: int = 10_000, max_bytes: int = 32 * 1024 * 1024,
+                 ttl: float = 300, mode: str = "tracking", channel: str = "near-cache:invalidate",
+                 prefixes: tuple = ()):
+        if mode not in ("tracking", "pubsub"):
+            raise ValueError(f"unknown near cache mode: {mode}")
+        self.redis = redis
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.mode = mode
+        self.channel = channel
+        self.prefixes = prefixes  # tracking: only keys under these prefixes are cached locally
+        self.connected = False
+        self._data: OrderedDict = OrderedDict()  # key -> (value, nbytes, expires_at)
+        self._bytes = 0
+        self._pending = {}  # key -> [generation, readers in flight]
+        self._epoch = 0  # bumped on every flush, drops replies read before it
+        self._reader = None
+        self._listener_id = None
+        self.counters = dict.fromkeys(
+            ("hit", "miss", "stored", "invalidated", "flush", "evicted", "race_skipped", "reconnect",
+             "redis_error"), 0)
+
+    # ---- read path ----
+
+    async def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is not None:
+            if entry[2] > time.monotonic():
+                self.counters["hit"] += 1
+                self._data.move_to_end(key)
+                return entry[0]
+            self._drop(key)
+        self.counters["miss"] += 1
+        if not self.connected or not self._cacheable(key):
+            return await self.redis.get(key)
+
+        slot = self._pending.setdefault(key, [0, 0])
+        slot[1] += 1
+        generation, epoch = slot[0], self._epoch
+        try:
+            value = await (self._reader or self.redis).get(key)
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                self._pending.pop(key, None)
+        if value is None:
+            return None
+        if slot[0] != generation or epoch != self._epoch or not self.connected:
+            self.counters["race_skipped"] += 1  # changed while the reply was on the wire
+        else:
+            self._store(key, value)
+        return value
+
+    # ---- write path ----
+
+    async def written(self, keys):
+        """call after writing keys through any client; pubsub mode tells the other processes"""
+        keys = list(keys)
+        for key in keys:
+            self.invalidate(key)
+        if self.mode == "pubsub" and keys and self.redis is not None:
+            try:
+                await self.redis.publish(self.channel, json.dumps(keys))
+            except RedisError:
+                self.counters["redis_error"] += 1
+
+    def invalidate(self, key: str):
+        slot = self._pending.get(key)
+        if slot is not None:
+            slot[0] += 1
+        if self._drop(key):
+            self.counters["invalidated"] += 1
+
+    def flush(self):
+        self._epoch += 1
+        self._data.clear()
+        self._bytes = 0
+        self.counters["flush"] += 1
+
+    # ---- invalidation stream ----
+
+    async def run(self, backoff: float = 1.0):
+        """listener loop, reconnects forever; everything local is dropped while disconnected"""
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as e:
+                print(f"near cache listener lost: {e!r}")
+            finally:
+                self.connected = False
+                self.flush()
+            self.counters["reconnect"] += 1
+            await asyncio.sleep(backoff)
+
+    async def _listen(self):
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.connect()
+            channel = self.channel
+            if self.mode == "tracking":
+                await pubsub.connection.send_command("CLIENT", "ID")
+                self._listener_id = await pubsub.connection.read_response()
+                try:
+                    await self._enable_tracking()
+                    channel = TRACKING_CHANNEL
+                except RedisError as e:
+                    print(f"CLIENT TRACKING unavailable ({e}), near cache falls back to pubsub")
+                    self.mode = "pubsub"
+                    await self._close_reader()  # untracked, and its reconnect hook would retry TRACKING
+            await pubsub.subscribe(channel)
+            self.flush()
+            self.connected = True
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                self._on_invalidate(message["data"])
+        finally:
+            await pubsub.aclose()
+
+    async def _enable_tracking(self):
+        if self._reader is None:
+            self._reader = self.redis.client()  # one connection, tracking is per connection
+            await self._reader.initialize()
+            self._reader.connection.register_connect_callback(self._on_reader_reconnect)
+        await self._reader.execute_command("CLIENT", "TRACKING", "ON", *self._tracking_args())
+
+    def _tracking_args(self):
+        return ("REDIRECT", self._listener_id, *(a for p in self.prefixes for a in ("PREFIX", p)),
+                *(("BCAST",) if self.prefixes else ()))
+
+    async def _on_reader_reconnect(self, connection):
+        # redis-py reconnected the reader silently: tracking is gone, re-enable and forget everything
+        self.flush()
+        if self._listener_id is not None:
+            await connection.send_command("CLIENT", "TRACKING", "ON", *self._tracking_args())
+            await connection.read_response()
+
+    def _on_invalidate(self, data):
+        if data is None:
+            self.flush()  # FLUSHALL / tracking table full: redis could not say which keys
+            return
+        if isinstance(data, (str, bytes)) and self.mode == "pubsub":
+            data = json.loads(data)
+        for key in data if isinstance(data, list) else [data]:
+            self.invalidate(key.decode() if isinstance(key, bytes) else key)
+
+    # ---- internals ----
+
+    def _cacheable(self, key):
+        return not self.prefixes or key.startswith(self.prefixes)
+
+    def _store(self, key, value):
+        nbytes = sys.getsizeof(key) + sys.getsizeof(value)
+        if nbytes > self.max_bytes:
+            return
+        self._drop(key)
+        self._data[key] = (value, nbytes, time.monotonic() + self.ttl)
+        self._bytes += nbytes
+        self.counters["stored"] += 1
+        while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+            _, (_, evicted_bytes, _) = self._data.popitem(last=False)
+            self._bytes -= evicted_bytes
+            self.counters["evicted"] += 1
+
+    def _drop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    async def close(self):
+        self.connected = False
+        self.flush()
+        await self._close_reader()
+
+    async def _close_reader(self):
+        """the pool reuses the connection: drop our reconnect hook and the (tracked or server-closed) socket first"""
+        if self._reader is not None:
+            if self._reader.connection is not None:
+                self._reader.connection.deregister_connect_callback(self._on_reader_reconnect)
+                await self._reader.connection.disconnect()
+            await self._reader.aclose()
+            self._reader = None
+
+    def stats(self) -> dict:
+        c = self.counters
+        lookups = c["hit"] + c["miss"]
+        return {
+            **c,
+            "mode": self.mode,
+            "connected": self.connected,
+            "size": len(self._data),
+            "bytes": self._bytes,
+            "hit_ratio": round(c["hit"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,37 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Request coalescing: N concurrent callers for one key -> one call of fn, N results.
+    - first caller runs fn, the others await the same future
+    - waiters are shielded, a cancelled waiter does not cancel the shared call
+    """
+
+    def __init__(self):
+        self.inflight: dict = {}
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # mark the exception as retrieved even when nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.inflight[key]
@@ -0,0 +1,35 @@
+import math
+import random
+import uuid
+
+# compare-and-delete, so a lock that already expired and was re-taken by another process is left alone
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def xfetch_refresh(fresh_until: float, delta: float, now: float, beta: float = 1.0) -> bool:
+    """
+    XFetch (Vattani et al., "Optimal Probabilistic Cache Stampede Prevention").
+    Refresh early with a probability that rises as expiry gets closer, scaled by how long the
+    value took to compute (delta). Concurrent readers spread their refreshes instead of all
+    recomputing at the expiry instant.
+    """
+    if delta <= 0:
+        return False
+    return now - delta * beta * math.log(1.0 - random.random()) >= fresh_until
+
+
+async def acquire_lock(redis, key: str, ttl_ms: int) -> str | None:
+    """SET key token NX PX ttl -> token when acquired, None when another process holds it"""
+    token = uuid.uuid4().hex
+    if await redis.set(key, token, nx=True, px=ttl_ms):
+        return token
+    return None
+
+
+async def release_lock(redis, key: str, token: str):
+    await redis.eval(_RELEASE_SCRIPT, 1, key, token)
@@ -1,23 +1,25 @@
 import httpx
-from fastapi import APIRouter
-from src.commonModule.init_srv import load_env_config
+from fastapi import APIRouter, Depends, Header, HTTPException
+from src.webApp1.service.init_srv import load_env_config
+from src.webApp1.service.http_client import get_http_client
 
 router = APIRouter()
 
-app_config = load_env_config()['oauth']['gh']
-GITHUB_CLIENT_ID=app_config['GITHUB_CLIENT_ID']
-GITHUB_CLIENT_SECRET=app_config['GITHUB_CLIENT_SECRET']
+def github_config():
+    """read through the config service on every call (in-memory), so a hot reload applies right away"""
+    return load_env_config()['oauth']['gh']
 
 @router.post("/github-token")
-async def github_token():
+async def github_token(client: httpx.AsyncClient = Depends(get_http_client)):
     """1 Add a Token Fetching Endpoint"""
+    app_config = github_config()
     data = {
-        "client_id": GITHUB_CLIENT_ID,
-        "client_secret": GITHUB_CLIENT_SECRET,
+        "client_id": app_config['GITHUB_CLIENT_ID'],
+        "client_secret": app_config['GITHUB_CLIENT_SECRET'],
         "grant_type": "client_credentials"
     }
     headers = {"Accept": "application/json"}
-    resp = await httpx.post(
+    resp = await client.post(
         "https://github.com/login/oauth/access_token",
         data=data, headers=headers
     )
@@ -27,12 +29,13 @@ async def github_token():
     return {"access_token": token_data["access_token"]}
 
 
-from fastapi import Depends, Header, HTTPException
-
-async def verify_github_token(authorization: str = Header(...)):
+async def verify_github_token(
+        authorization: str = Header(...),
+        client: httpx.AsyncClient = Depends(get_http_client)
+):
     """2. Create a Dependency to Verify GitHub Token"""
     token = authorization.removeprefix("Bearer ").strip()
-    resp = await httpx.get(
+    resp = await client.get(
         "https://api.github.com/app",
         headers={"Authorization": f"Bearer {token}"}
     )
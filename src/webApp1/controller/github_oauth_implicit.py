@@ -5,10 +5,17 @@ from fastapi.responses import JSONResponse
 from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
 from .web2 import app
+from src.webApp1.service.github_profile import GitHubProfileCache
 from dotenv import load_dotenv
 import os
 load_dotenv()
 
+# GET /user per GitHub user id in redis, revalidated with If-None-Match (304 -> no body)
+profile_cache = GitHubProfileCache(
+    ttl=int(os.getenv("GITHUB_PROFILE_CACHE_TTL", str(24 * 3600))),
+    fresh_for=float(os.getenv("GITHUB_PROFILE_FRESH_FOR", "300")),
+)
+
 #app_config = load_env_config()['oauth']['okta']
 GITHUB_CLIENT_ID=os.getenv("GITHUB_CLIENT_ID")
 GITHUB_CLIENT_SECRET=os.getenv("GITHUB_CLIENT_SECRET")
@@ -38,7 +45,30 @@ async def login_via_github(request: Request):
 
 @app.get('/auth/callback')
 async def auth_callback(request: Request):
+    """
+    the profile is cached per GitHub user id (see profile_cache) and the result is kept in the
+    redis-backed session, GET /auth/me then answers without calling GitHub.
+    the identity always comes from GET /user with the new token (never from whatever user the
+    browser's session held before), and the session gets a new id (no session fixation)
+    """
     token = await github.authorize_access_token(request)
-    user = await github.get('user', token=token)
-    user_info = user.json()
-    return JSONResponse(content={"user": user_info})
\ No newline at end of file
+    redis = request.app.state.redis
+    user_info, source = await profile_cache.fetch(github, token, redis)
+    request.session.regenerate()
+    request.session["github_user_id"] = user_info["id"]
+    request.session["github_token"] = {k: token[k] for k in ("access_token", "token_type") if k in token}
+    return JSONResponse(content={"user": user_info, "source": source})
+
+@app.get('/auth/me')
+async def auth_me(request: Request):
+    user_id = request.session.get("github_user_id")
+    if user_id is None:
+        return JSONResponse(status_code=401, content={"detail": "Not logged in"})
+    redis = request.app.state.redis
+    user_info, source = await profile_cache.fetch(github, request.session["github_token"], redis, user_id)
+    return JSONResponse(content={"user": user_info, "source": source})
+
+@app.post('/auth/logout')
+async def auth_logout(request: Request):
+    request.session.clear()
+    return JSONResponse(content={"logged_out": True})
\ No newline at end of file
@@ -1,8 +1,10 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from src.webApp1.controller.web2 import app
+import uuid
+from src.webApp1.controller.web2 import app, startup_tasks
+from src.webApp1.service.token_cache import DecodedTokenCache
 
 # Secret key and algorithm for JWT (in real apps, load from env)
 SECRET_KEY = "secret123"
@@ -11,18 +13,29 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
+# verified token -> payload, deny-list shared by all workers over redis pub/sub
+decoded_token_cache = DecodedTokenCache(deny_ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+startup_tasks.append(lambda app: decoded_token_cache.listen_revocations(app.state.redis))
+
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire : datetime = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(token: str = Depends(oauth2_scheme)):
+async def verify_token(token: str = Depends(oauth2_scheme)):
+    """async: a cache hit is cheaper than the threadpool hop FastAPI does for sync dependencies"""
+    payload = decoded_token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if decoded_token_cache.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    decoded_token_cache.set(token, payload)
+    return payload
 
 
 @app.post("/app/token")
@@ -33,4 +46,18 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         )
         return {"access_token": access_token, "token_type": "bearer"}
-    raise HTTPException(status_code=400, detail="Incorrect username or password")
\ No newline at end of file
+    raise HTTPException(status_code=400, detail="Incorrect username or password")
+
+
+@app.post("/app/token/revoke")
+async def revoke(request: Request, payload: dict = Depends(verify_token)):
+    jti = payload.get("jti")
+    if jti is None:
+        raise HTTPException(status_code=400, detail="Token has no jti")
+    await decoded_token_cache.publish_revocation(request.app.state.redis, jti)
+    return {"revoked": jti}
+
+
+@app.get("/app/token/cache")
+async def token_cache_stats():
+    return decoded_token_cache.stats()
@@ -1,21 +1,79 @@
 import httpx, base64
-from fastapi import HTTPException
+from fastapi import HTTPException, Header, Request
+from functools import cache
+from types import SimpleNamespace
+from uuid import UUID
 
 import os
 from dotenv import load_dotenv
-from src.webApp1.service.init_srv import load_env_config
+from src.webApp1.service.init_srv import ConfigError, config_service, env_config_path, load_env_config
+from src.webApp1.service.token_cache import TokenIntrospectionCache
 load_dotenv()
-app_config = load_env_config()['oauth']['okta']
 
-OKTA_CLIENT_SECRET = os.getenv("OKTA_CLIENT_SECRET")
-OKTA_CLIENT_ID=app_config['OKTA_CLIENT_ID']
-OKTA_TOKEN_URL=app_config['OKTA_TOKEN_URL']
-OKTA_INTROSPECT_URL=app_config['OKTA_INTROSPECT_URL']
-OKTA_SCOPE=app_config['OKTA_SCOPE']
+# "introspect" (remote, per request) | "local" (JWT signature checked against cached JWKS)
+OKTA_VERIFY_MODE = os.getenv("OKTA_VERIFY_MODE", "introspect")
+# set once any route verifies locally, check_okta_config() then requires OKTA_AUDIENCE
+local_verification = OKTA_VERIFY_MODE == "local"
+
+@cache
+def okta_config() -> SimpleNamespace:
+    """env/{app_env}.json is read on first use, not at import (keeps worker boot fast)"""
+    app_config = load_env_config()['oauth']['okta']
+    token_url = app_config['OKTA_TOKEN_URL']
+    return SimpleNamespace(
+        CLIENT_SECRET=os.getenv("OKTA_CLIENT_SECRET"),
+        CLIENT_ID=app_config['OKTA_CLIENT_ID'],
+        TOKEN_URL=token_url,
+        INTROSPECT_URL=app_config['OKTA_INTROSPECT_URL'],
+        SCOPE=app_config['OKTA_SCOPE'],
+        ISSUER=app_config.get('OKTA_ISSUER', token_url.removesuffix('/v1/token')),
+        AUDIENCE=app_config.get('OKTA_AUDIENCE'),
+    )
+
+def _env_config_reloaded(snapshot):
+    """hot reload of env/{app_env}.json: the next okta_config() call reads the new snapshot"""
+    if snapshot.path == env_config_path():
+        okta_config.cache_clear()
+
+config_service.on_reload.append(_env_config_reloaded)
+
+@cache
+def okta_jwks():
+    # jose (+ cryptography) is only imported once a route verifies locally
+    from src.webApp1.service.jwks import JwksCache
+    return JwksCache(
+        f"{okta_config().ISSUER}/v1/keys",
+        refresh_interval=float(os.getenv("OKTA_JWKS_REFRESH_INTERVAL", "3600")),
+    )
+
+def local_audience(cfg) -> str:
+    """OKTA_AUDIENCE, mandatory for local verification: without it any token of the issuer would pass"""
+    if not cfg.AUDIENCE:
+        raise ConfigError(f"oauth.okta.OKTA_AUDIENCE missing in {env_config_path()}, required to verify tokens locally")
+    return cfg.AUDIENCE
+
+def check_okta_config():
+    """lifespan startup: fail before serving when local verification is in use without an audience"""
+    if local_verification:
+        local_audience(okta_config())
+
+async def close_okta_jwks():
+    """lifespan teardown: stops the JWKS refresher task if local verification ever ran"""
+    if okta_jwks.cache_info().currsize:
+        await okta_jwks().close()
+        okta_jwks.cache_clear()
+
+# introspection results, keyed by sha256(token), ttl bounded by the token's exp
+introspection_cache = TokenIntrospectionCache(
+    maxsize=int(os.getenv("OKTA_INTROSPECT_CACHE_SIZE", "10000")),
+    max_ttl=int(os.getenv("OKTA_INTROSPECT_CACHE_TTL", "300")),
+    negative_ttl=int(os.getenv("OKTA_INTROSPECT_NEGATIVE_TTL", "30")),
+)
 
 # not in use
-async def get_okta_token_async():
-    auth = base64.b64encode(f"{OKTA_CLIENT_ID}:{OKTA_CLIENT_SECRET}".encode()).decode()
+async def get_okta_token_async(client: httpx.AsyncClient):
+    cfg = okta_config()
+    auth = base64.b64encode(f"{cfg.CLIENT_ID}:{cfg.CLIENT_SECRET}".encode()).decode()
     headers = {
         "Authorization": f"Basic {auth}",
         "Content-Type": "application/x-www-form-urlencoded",
@@ -23,16 +81,26 @@ async def get_okta_token_async():
     }
     data = {
         "grant_type": "client_credentials",
-        "scope": OKTA_SCOPE
+        "scope": cfg.SCOPE
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(OKTA_TOKEN_URL, headers=headers, data=data)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=resp.status_code, detail="Failed to fetch token from Okta")
-        return resp.json()
-
-async def verify_okta_token(token: str):
-    auth = base64.b64encode(f"{OKTA_CLIENT_ID}:{OKTA_CLIENT_SECRET}".encode()).decode()
+    resp = await client.post(cfg.TOKEN_URL, headers=headers, data=data)
+    if resp.status_code != 200:
+        raise HTTPException(status_code=resp.status_code, detail="Failed to fetch token from Okta")
+    return resp.json()
+
+async def verify_okta_token(token: str, client: httpx.AsyncClient, redis=None):
+    """
+    client: shared pooled client (app.state.http_client)
+    redis: optional app.state.redis, used as a shared second cache tier
+    """
+    cached = await introspection_cache.get(token, redis)
+    if cached is not None:
+        if not cached.get("active"):
+            raise HTTPException(401, detail="Invalid or expired token")
+        return cached
+
+    cfg = okta_config()
+    auth = base64.b64encode(f"{cfg.CLIENT_ID}:{cfg.CLIENT_SECRET}".encode()).decode()
     headers = {
         "Authorization": f"Basic {auth}",
         "Content-Type": "application/x-www-form-urlencoded"
@@ -41,17 +109,65 @@ async def verify_okta_token(token: str):
         "token": token,
         "token_type_hint": "access_token"
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(OKTA_INTROSPECT_URL, headers=headers, data=data)
-        result = resp.json()
-        if not result.get("active"):
-            raise HTTPException(401, detail="Invalid or expired token")
-        return result
+    resp = await client.post(cfg.INTROSPECT_URL, headers=headers, data=data)
+    result = resp.json()
+    if resp.status_code == 200:
+        await introspection_cache.set(token, result, redis)
+    if not result.get("active"):
+        raise HTTPException(401, detail="Invalid or expired token")
+    return result
+
+async def verify_okta_token_local(token: str, client: httpx.AsyncClient):
+    """
+    No IdP call on the hot path: the access token is validated with the issuer's public keys.
+    - client is only used when the JWKS must be (re)fetched
+    - returns the claims with "active": True, same shape callers get from introspection
+    - a token revoked at Okta stays valid here until its exp -> keep tokens short-lived
+    """
+    from jose import JWTError
+    cfg = okta_config()
+    try:
+        claims = await okta_jwks().decode(token, client, issuer=cfg.ISSUER, audience=local_audience(cfg))
+    except (JWTError, httpx.HTTPError):
+        raise HTTPException(401, detail="Invalid or expired token")
+    return {"active": True, **claims}
+
+def okta_auth(mode: str | None = None):
+    """
+    per-route switch, eg: user_info: dict = Depends(okta_auth("local"))
+    mode defaults to OKTA_VERIFY_MODE
+    """
+    global local_verification
+    mode = mode or OKTA_VERIFY_MODE
+    if mode not in ("introspect", "local"):
+        raise ValueError(f"unknown okta verify mode: {mode}")
+    if mode == "local":
+        local_verification = True
+
+    async def dependency(request: Request, authorization: str = Header(...)):
+        token = authorization.removeprefix("Bearer ").strip()
+        client = request.app.state.http_client
+        if mode == "local":
+            return await verify_okta_token_local(token, client)
+        return await verify_okta_token(token, client, redis=request.app.state.redis)
+
+    return dependency
+
+def subject_user_id(user_info: dict) -> UUID:
+    """
+    the verified token's `sub` as the user id that owns wallets / transactions,
+    403 when the token has no subject or it is not a user id of this service
+    """
+    try:
+        return UUID(str(user_info["sub"]))
+    except (KeyError, ValueError):
+        raise HTTPException(403, detail="Token subject is not a user of this service")
 
-def request_token():
-    client_id = OKTA_CLIENT_ID
-    client_secret = OKTA_CLIENT_SECRET
-    token_url = OKTA_TOKEN_URL
+async def request_token(client: httpx.AsyncClient):
+    cfg = okta_config()
+    client_id = cfg.CLIENT_ID
+    client_secret = cfg.CLIENT_SECRET
+    token_url = cfg.TOKEN_URL
 
     auth = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
 
@@ -65,6 +181,6 @@ def request_token():
         "scope": "fastapiweb2"
     }
 
-    response = httpx.post(token_url, headers=headers, data=data)
+    response = await client.post(token_url, headers=headers, data=data)
     print(response.status_code, response.json())
     return response.json()
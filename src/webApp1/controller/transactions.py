@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from src.webApp1.controller.okta_oauth import okta_auth, subject_user_id
+from src.webApp1.dao.transactions import TransactionHistory, InvalidCursor, DEFAULT_LIMIT, MAX_LIMIT, get_history
+
+router = APIRouter()
+
+
+def history_engine(request: Request) -> TransactionHistory:
+    return get_history(getattr(request.app.state, "redis", None))
+
+
+@router.get("/api/v1/transactions")
+async def transaction_history(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    status: str | None = Query(None),
+    start_date: datetime | None = Query(None),
+    end_date: datetime | None = Query(None),
+    user_info: dict = Depends(okta_auth()),
+    history: TransactionHistory = Depends(history_engine),
+):
+    """
+    keyset pagination: follow `next_cursor` instead of page numbers, every page costs the same
+    (no total_count either, counting a long history is the slow part of OFFSET paging).
+    always the caller's own history: the user id is the verified token's `sub`
+    """
+    user_id = subject_user_id(user_info)
+    try:
+        return await history.page(user_id, limit, cursor, status, start_date, end_date)
+    except InvalidCursor as e:
+        raise HTTPException(400, detail=str(e))
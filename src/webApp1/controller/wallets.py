@@ -0,0 +1,63 @@
+from decimal import Decimal
+from uuid import UUID
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Request
+
+from src.webApp1.controller.okta_oauth import okta_auth, subject_user_id
+from src.webApp1.dao.ledger import WalletLedger, TransferRejected, NotWalletOwner, get_ledger
+from src.webApp1.service.audit import get_audit_log
+
+router = APIRouter()
+
+
+def ledger(request: Request) -> WalletLedger:
+    return get_ledger(getattr(request.app.state, "redis", None))
+
+
+@router.post("/api/v1/wallets/transfer")
+async def transfer(
+    from_wallet_id: UUID = Body(...),
+    to_wallet_id: UUID = Body(...),
+    amount: Decimal = Body(..., gt=0, max_digits=15, decimal_places=2),
+    currency: str = Body("USD", min_length=3, max_length=3),
+    user_info: dict = Depends(okta_auth()),
+    wallet_ledger: WalletLedger = Depends(ledger),
+):
+    """
+    committed together with the other transfers of the same few ms (group commit),
+    the response is sent once the batch holding this transfer is durable.
+    403 unless from_wallet_id belongs to the token's subject (checked inside the batch transaction)
+    """
+    owner = subject_user_id(user_info)
+    event = {"service": "wallet", "event_type": "transfer", "user_id": user_info.get("sub"),
+             "from_wallet_id": str(from_wallet_id), "to_wallet_id": str(to_wallet_id),
+             "amount": str(amount), "currency": currency}
+    audit_log = get_audit_log()
+    try:
+        result = await wallet_ledger.transfer(from_wallet_id, to_wallet_id, amount, currency, owner=owner)
+    except NotWalletOwner as e:
+        if audit_log is not None:
+            audit_log.log_nowait({**event, "status": "forbidden", "reason": str(e)})
+        raise HTTPException(403, detail=str(e))
+    except TransferRejected as e:
+        if audit_log is not None:
+            audit_log.log_nowait({**event, "status": "rejected", "reason": str(e)})
+        raise HTTPException(409, detail=str(e))
+    if audit_log is not None:
+        audit_log.log_nowait({**event, "status": "ok", "transaction_id": result["transfer_id"]})
+    return result
+
+
+@router.get("/api/v1/wallets/{wallet_id}/verify")
+async def verify(wallet_id: UUID, user_info: dict = Depends(okta_auth()),
+                 wallet_ledger: WalletLedger = Depends(ledger)):
+    """balance recomputed from the latest snapshot + ledger entries, compared with the wallet row"""
+    try:
+        return await wallet_ledger.verify(wallet_id, owner=subject_user_id(user_info))
+    except NotWalletOwner as e:
+        raise HTTPException(403, detail=str(e))
+
+
+@router.get("/ledger/stats")
+async def ledger_stats(wallet_ledger: WalletLedger = Depends(ledger)):
+    return wallet_ledger.stats()
@@ -3,29 +3,87 @@
 
 from fastapi import FastAPI, Header, Query, Path, Body, Request, Depends, HTTPException
 from typing import Optional
-from src.commonModule.init_srv import load_env_config
-from src.webApp1.controller.okta_oauth import verify_okta_token, request_token
+from src.webApp1.service.init_srv import config_service
+from src.webApp1.controller.okta_oauth import check_okta_config, close_okta_jwks, okta_auth, request_token, introspection_cache
 from fastapi import FastAPI, Request, Depends
 from fastapi.responses import JSONResponse
-from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
+from src.webApp1.ratelimit.hybrid import HybridRateLimiter
+from src.webApp1.ratelimit.keys import by_ip, by_token
+from src.webApp1.ratelimit.depends import rate_limit
 from contextlib import asynccontextmanager
-import redis.asyncio as redis
+import asyncio
+from src.webApp1.service.http_client import create_http_client, get_http_client
+from src.webApp1.cache.multilevel import MultiLevelCache
+from src.webApp1.cache.near_cache import NearCache
+from src.webApp1.service.shared_state import SharedState
+from src.webApp1.service.session import RedisSessionMiddleware
+from src.webApp1.dao.database import get_database, close_database
+from src.webApp1.dao.ledger import close_ledger
+from src.webApp1.dao.transactions import cursor_secret
+from src.webApp1.service.audit import get_audit_log, close_audit_log
+from src.webApp1.service.fast_json import FastJSONResponse, FastJSONRoute
+from src.webApp1.service.compression import CompressionMiddleware
+from src.webApp1.service.lazy_routes import lazy_include
+from src.webApp1.service.metrics import MetricsMiddleware, instrument_redis, registry
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import os
 load_dotenv()
 
+# coroutine functions fn(app) run as background tasks for the app's lifetime,
+# other controller modules append to it (eg: jwt deny-list listener)
+startup_tasks = []
+
+# L1 in-process + L2 redis, 30s fresh then 30s stale-while-revalidate
+data_cache = MultiLevelCache(prefix="", ttl=30, stale_ttl=30)
+
+# set when served by `python -m src.webApp1.serve` (pre-fork), None under plain uvicorn
+shared_state = SharedState.from_env()
+data_cache.shared = shared_state
+
+# opt-in near cache for item:* reads, "tracking" (CLIENT TRACKING) | "pubsub" | "off"
+REDIS_NEAR_CACHE = os.getenv("REDIS_NEAR_CACHE", "off")
+near_cache = None if REDIS_NEAR_CACHE == "off" else NearCache(
+    mode=REDIS_NEAR_CACHE,
+    prefixes=("item:",),
+    maxsize=int(os.getenv("REDIS_NEAR_CACHE_SIZE", "10000")),
+    max_bytes=int(os.getenv("REDIS_NEAR_CACHE_BYTES", str(32 * 1024 * 1024))),
+)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     #app_config = load_env_config();
     #print("appconfig", app_config)
+    cursor_secret()  # fails fast when CURSOR_SECRET is unset, history cursors must verify on every worker
+    check_okta_config()  # and when tokens are verified locally without OKTA_AUDIENCE
+    config_service.watch()  # env/*.json changes picked up without a restart
+    import redis.asyncio as redis  # deferred, not needed to import / inspect the app
     redis_url = os.getenv('REDIS_CLOUD_URL')
     redis_url = f"redis://{redis_url}"
     print("redis_url", redis_url)
-    redis_client = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
-    await FastAPILimiter.init(redis_client)
+    redis_client = instrument_redis(redis.from_url(redis_url, encoding="utf-8", decode_responses=True))
     app.state.redis = redis_client
+    data_cache.redis = redis_client
+    app.state.http_client = create_http_client()
+    background = [asyncio.create_task(task(app)) for task in startup_tasks]
+    if near_cache is not None:
+        near_cache.redis = redis_client
+        data_cache.near = near_cache
+        background.append(asyncio.create_task(near_cache.run()))
+    if get_audit_log() is not None:
+        get_audit_log().start()  # replays spill files of the previous run first
     yield
+    for task in background:
+        task.cancel()
+    await rate_limiter.close()
+    if near_cache is not None:
+        await near_cache.close()
+    config_service.stop()
+    await close_okta_jwks()
+    await close_ledger()  # before the database: drains the in-flight batch, takes a last snapshot
+    await close_audit_log()  # after the ledger, its last transfers are audited too; leftovers spilled to disk
+    await close_database()
+    await app.state.http_client.aclose()
     await redis_client.close()
 
 app = FastAPI(
@@ -33,8 +91,25 @@ app = FastAPI(
     title="Python API doc",
     description="API for python POC",
     version="1.0.0",
-    contact={"name": "Lekhraj Dinkar", "email": "LekhrajDinkarus@gmail.com"}
+    contact={"name": "Lekhraj Dinkar", "email": "LekhrajDinkarus@gmail.com"},
+    default_response_class=FastJSONResponse
 )
+app.router.route_class = FastJSONRoute  # dict results skip jsonable_encoder, see service/fast_json.py
+# zstd / br / gzip from Accept-Encoding, bodies >= 1 KiB, etag'd bodies compressed once
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")))
+# request.session in redis (authlib's OAuth state, GitHub login result), cookie holds only the id
+app.add_middleware(RedisSessionMiddleware, ttl=int(os.getenv("SESSION_TTL", "86400")),
+                   https_only=os.getenv("SESSION_COOKIE_SECURE", "false") == "true")
+# outermost: latency / in-flight / bytes on the wire per route, scraped on GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+# GitHub OAuth controllers (authlib, starlette.config, config reads) are imported on their first request
+lazy_include(app, "src.webApp1.controller.github_oauth_cc:router", ["/github-token"])
+lazy_include(app, "src.webApp1.controller.transactions:router", ["/api/v1/transactions"])
+lazy_include(app, "src.webApp1.controller.wallets:router",
+             ["/api/v1/wallets/transfer", "/api/v1/wallets/{wallet_id}/verify", "/ledger/stats"])
+lazy_include(app, "src.webApp1.controller.github_oauth_implicit",
+             ["/login/github", "/auth/callback", "/auth/me", "/auth/logout"])
 
 # --- Step 1: Path, Query, Header, and Body Parameters ---
 """
@@ -46,16 +121,63 @@ Body(...) required
 
 
 @app.get("/data-from-redis-cache/{item_id}")
-async def get_data(item_id: int, request: Request):
-    redis = request.app.state.redis
-    key = f"item:{item_id}"
-    cached = await redis.get(key)
-    if cached:
-        return {"source": "cache", "item_id": item_id, "data": cached}
+async def get_data(item_id: int):
+    async def load():
+        return f"value-for-item-{item_id}"
+
+    data, source = await data_cache.fetch(f"item:{item_id}", load)
+    return {"source": "fresh" if source == "fresh" else "cache", "item_id": item_id, "data": data}
+
+
+@app.post("/data-from-redis-cache/batch")
+async def get_data_batch(item_ids: list[int] = Body(..., embed=True, max_length=1000)):
+    """
+    {"item_ids": [1, 2, 3]} -> 1 redis MGET for all ids, misses computed concurrently and
+    written back in 1 pipelined transaction, instead of N calls to /data-from-redis-cache/{id}
+    """
+    async def load(key):
+        return f"value-for-item-{key.removeprefix('item:')}"
+
+    found = await data_cache.fetch_many([f"item:{i}" for i in item_ids], load)
+    items = []
+    for item_id in item_ids:
+        data, source = found[f"item:{item_id}"]
+        items.append({"item_id": item_id, "source": source if source in ("fresh", "error") else "cache", "data": data})
+    return {"items": items}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """prometheus text format, summed over every worker's shared-memory counters"""
+    return PlainTextResponse(registry.collect(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    if near_cache is None:
+        return data_cache.stats()
+    return {**data_cache.stats(), "near": near_cache.stats()}
+
+
+@app.get("/db/stats")
+async def db_stats():
+    """pool usage / saturation per engine, replica lag, read routing counters"""
+    return get_database().stats()
 
-    data = f"value-for-item-{item_id}"
-    await redis.set(key, data, ex=30)
-    return {"source": "fresh", "item_id": item_id, "data": data}
+
+@app.get("/audit/stats")
+async def audit_stats():
+    """write-behind audit buffer: buffered / flushed / spilled, AUDIT_SINK=off -> {}"""
+    audit_log = get_audit_log()
+    return audit_log.stats() if audit_log is not None else {}
+
+
+@app.get("/workers")
+async def workers():
+    """pre-fork mode: per worker pid / readiness / request count, read from shared memory"""
+    if shared_state is None:
+        return {"mode": "single process", "pid": os.getpid()}
+    return {"mode": "pre-fork", "pid": os.getpid(), **shared_state.stats()}
 
 
 @app.post("/items/{item_id}")
@@ -69,14 +191,11 @@ async def full_pack_api(
         payload: dict = Body(None, description="Request body as a dictionary"),
         #token_payload: dict = Depends(verify_token),
         #gh_app: dict = Depends(verify_github_token)
-        authorization: str = Header(...)
+        user_info: dict = Depends(okta_auth())
 ):
     all_header = dict(request.headers)
     all_qp = dict(request.query_params)
 
-    token = authorization.removeprefix("Bearer ").strip()
-    user_info = await verify_okta_token(token)
-
     return {
         "item_id": item_id,
         "query_param_1": q1, "query_param_2": q2,
@@ -103,8 +222,13 @@ async def custom_response():
 
 # --- Step 3:  okta token ---
 @app.post("/okta/request-token")
-async def okta_request_token():
-    return request_token()
+async def okta_request_token(http_client=Depends(get_http_client)):
+    return await request_token(http_client)
+
+
+@app.get("/okta/introspection-cache")
+async def okta_introspection_cache_stats():
+    return introspection_cache.stats()
 
 
 # --- Step 4.1 : rate limiting --- slowapi :: Good for development/testing
@@ -153,27 +277,44 @@ AWS Elasticsearch redis (no boto3), ⬅️
 """
 
 
-@app.get("/rate-limited-api", dependencies=[Depends(RateLimiter(times=3, seconds=60))])
+# decided in-process, redis only sees one lease call per `lease` requests (per worker)
+# key_func: by_ip | by_user | by_token (ratelimit/keys.py)
+rate_limiter = HybridRateLimiter(times=3, seconds=60, key_func=by_ip)
+
+@app.get("/rate-limited-api", dependencies=[Depends(rate_limiter)])
 async def rateLimitedApi():
     return {"message": "You can call this API 3 times per minute"}
 
 
+# no 2x burst at window edges, O(1) redis memory per key: gcra | sliding_window | token_bucket
+@app.get("/rate-limited-api/gcra", dependencies=[Depends(rate_limit("gcra", times=3, seconds=60, key_func=by_token))])
+async def rateLimitedApiGcra():
+    return {"message": "You can call this API 3 times per minute, evenly spaced"}
+
+
+@app.get("/rate-limited-api/stats")
+async def rate_limiter_stats():
+    return rate_limiter.stats()
+
+
 # =========== file upload / downloads
-# FileResponse, UploadFile
-from fastapi.responses import FileResponse
-import os
+# UploadFile, ranged / conditional file responses (service/download.py)
 from fastapi import  File, UploadFile, Form
+from src.webApp1.service.download import file_response
+from src.webApp1.service.upload import iter_upload_file, save_stream, UPLOAD_MAX_BYTES
 
 @app.get("/download")
-def download_file():
+async def download_file(request: Request):
     """
     FileResponse handles setting proper headers like Content-Disposition for downloading.
     media_type="application/octet-stream" tells the browser to download it instead of displaying.
     filename= controls what name the user sees when saving the file.
+    ETag / Last-Modified -> 304 on revalidation, Range -> 206 to resume an interrupted download.
     """
-    file_path = "src/webModule/controller/openapi.json"  # Make sure this file exists
+    file_path = "src/webApp1/controller/openapi.json"  # Make sure this file exists
     if os.path.exists(file_path):
-        return FileResponse(
+        return await file_response(
+            request,
             path=file_path,
             filename="openapi_2.json",
             media_type="application/octet-stream"
@@ -188,11 +329,28 @@ async def upload_file(
     """
     UploadFile = File(...): Tells FastAPI to expect a file part in a multipart request.
     description: str = Form(...): Extracts regular form field from the same request.
+    file is copied to disk chunk by chunk, never read whole into memory.
     """
-    content = await file.read()
+    stored = await save_stream(iter_upload_file(file), file.filename)
     return {
         "filename": file.filename,
         "content_type": file.content_type,
         "description": description,
-        "size": len(content)
+        **stored
+    }
+
+@app.put("/upload/stream/{filename}")
+async def upload_stream(request: Request, filename: str):
+    """
+    raw body upload (no multipart parsing / spooling), for multi-GB files
+    curl -T big.iso http://localhost:8000/upload/stream/big.iso
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES:
+        raise HTTPException(413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+    stored = await save_stream(request.stream(), filename)
+    return {
+        "filename": filename,
+        "content_type": request.headers.get("content-type"),
+        **stored
     }
\ No newline at end of file
@@ -2,14 +2,12 @@ import requests
 
 def client1():
     url = "http://localhost:8000/upload"
-    files = {
-        "file": ("example.txt", open("example.txt", "rb")),
-    }
     data = {
         "description": "Sample file upload via FastAPI"
     }
 
-    response = requests.post(url, files=files, data=data)
+    with open("example.txt", "rb") as f:
+        response = requests.post(url, files={"file": ("example.txt", f)}, data=data)
     print(response.json())
 
 def client2():
@@ -18,12 +16,12 @@ def client2():
     Sends a file and a text field (description) in the same request.
     """
     url = "http://localhost:8000/upload"
-    files = {
-        'file': ('example.txt', open('example.txt', 'rb')),
-        'description': (None, 'Sample file upload')
-    }
-
-    response = requests.post(url, files=files)
+    with open('example.txt', 'rb') as f:
+        files = {
+            'file': ('example.txt', f),
+            'description': (None, 'Sample file upload')
+        }
+        response = requests.post(url, files=files)
     print(response.status_code)
 
 def client3_download():
@@ -43,8 +41,8 @@ import asyncio
 async def fetch1():
     async with aiohttp.ClientSession() as session:
         async with session.get("http://localhost:8000/download") as response:
-            data = await response
-            print(data)
+            data = await response.read()
+            print(len(data))
 
 # --- gather mutlicle call ---
 async def fetch(url, session):
@@ -60,17 +58,31 @@ async def fetch2():
         for result in results:
             print(result)
 
-async def fetch3():
+def upload_form(content: bytes, filename: str = "example.txt", description: str = "load test") -> aiohttp.FormData:
+    """multipart body for POST /upload (file part + description field)"""
+    form = aiohttp.FormData()
+    form.add_field("file", content, filename=filename, content_type="application/octet-stream")
+    form.add_field("description", description)
+    return form
+
+async def fetch3(max_concurrency: int = 10):
     urls = [
         "https://httpbin.org/delay/2",
         "https://httpbin.org/get",
         "https://httpbin.org/uuid"
     ]
+    # semaphore + connector limit: at most max_concurrency requests in flight, however long urls is
+    semaphore = asyncio.Semaphore(max_concurrency)
 
-    async with aiohttp.ClientSession() as session:
+    async def bounded(url, session):
+        async with semaphore:
+            return await fetch(url, session)
+
+    connector = aiohttp.TCPConnector(limit=max_concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
         tasks = []
         for url in urls:
-            task = asyncio.create_task(fetch(url, session))
+            task = asyncio.create_task(bounded(url, session))
             tasks.append(task)
 
         # Wait for all tasks to complete
@@ -84,7 +96,7 @@ async def fetch3():
 
 # ============================
 
-if '__name__' == '__main__':
+if __name__ == '__main__':
     client1()
     client2()
     asyncio.run(fetch1())
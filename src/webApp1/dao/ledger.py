@@ -0,0 +1,435 @@
+"""
+Wallet ledger with group commit (replaces one ACID transaction per transfer_money call,
+systemDesign/paypal/docs/design/database.md, and the per-call write-through of update_wallet_balance, cache.md).
+
+At 10,000 transfers/minute a popular merchant wallet is in most of them; one transaction each means
+one row lock + one commit (fsync) each, queued on that wallet. Here concurrent transfer() calls wait
+a few ms in a queue and commit together:
+
+- one DB transaction per batch: wallets locked with SELECT .. FOR UPDATE in wallet_id order
+  (every batch, in every worker, takes locks in the same order -> no deadlocks), transfers applied in
+  arrival order, each rejected on its own (insufficient funds, unknown wallet, currency mismatch)
+- ledger_entries is append-only, two rows per transfer (debit / credit) with the balance after it;
+  wallets.balance gets one UPDATE per touched wallet per batch, not one per transfer
+- balance_snapshots: every snapshot_interval the balance of the wallets touched since the last one,
+  with the last entry id it covers; verify() = latest snapshot + entries after it == wallets.balance
+- Redis write-through (wallet_balance:<id> + balance_updates:<id> publish) in one pipeline per batch
+- every committed transfer is also a `transactions` row (dao/transactions.py, same DB transaction),
+  the sender's and receiver's cached first history page is dropped once the batch commits
+- tables: `python -m src.webApp1.dao.migrate` (or create_schema())
+"""
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from redis.exceptions import RedisError
+from sqlalchemy import (BigInteger, Column, DateTime, ForeignKey, Index, Integer, MetaData, Numeric, String, Table,
+                        Uuid, bindparam, func, insert, select, update)
+from sqlalchemy.exc import DBAPIError
+
+from src.webApp1.dao import transactions as history_tables
+from src.webApp1.dao.database import get_database
+from src.webApp1.dao.transactions import get_history, transaction_row
+from src.webApp1.service.metrics import registry
+
+metadata = MetaData()
+
+wallets = Table(
+    "wallets", metadata,
+    Column("wallet_id", Uuid, primary_key=True, default=uuid.uuid4),
+    Column("user_id", Uuid, nullable=False),
+    Column("currency", String(3), nullable=False),
+    Column("balance", Numeric(15, 2), nullable=False, default=Decimal("0.00")),
+    Column("updated_at", DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)),
+)
+
+ledger_entries = Table(
+    "ledger_entries", metadata,
+    Column("entry_id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("transfer_id", Uuid, nullable=False),
+    Column("wallet_id", Uuid, ForeignKey("wallets.wallet_id"), nullable=False),
+    Column("amount", Numeric(15, 2), nullable=False),  # negative = debit
+    Column("balance_after", Numeric(15, 2), nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+Index("ix_ledger_entries_wallet", ledger_entries.c.wallet_id, ledger_entries.c.entry_id)
+
+balance_snapshots = Table(
+    "balance_snapshots", metadata,
+    Column("wallet_id", Uuid, ForeignKey("wallets.wallet_id"), primary_key=True),
+    Column("last_entry_id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column("balance", Numeric(15, 2), nullable=False),
+    Column("taken_at", DateTime(timezone=True), nullable=False),
+)
+
+CENT = Decimal("0.01")
+
+
+class TransferRejected(ValueError):
+    pass
+
+
+class NotWalletOwner(TransferRejected):
+    """the wallet exists but belongs to another user (or does not exist, the caller can't tell)"""
+
+
+class _Transfer:
+    __slots__ = ("from_wallet", "to_wallet", "amount", "currency", "owner", "future", "queued_at")
+
+    def __init__(self, from_wallet, to_wallet, amount, currency, owner, future):
+        self.from_wallet = from_wallet
+        self.to_wallet = to_wallet
+        self.amount = amount
+        self.currency = currency
+        self.owner = owner
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class WalletLedger:
+    """
+    db: dao.database.DatabaseManager (everything runs on the writer)
+    max_batch / max_wait: a batch closes at max_batch transfers or max_wait seconds after its first one
+    max_pending: queue bound, transfer() waits when this many are queued (backpressure)
+    history: optional dao.transactions.TransactionHistory, its cached first pages are dropped after each commit
+    """
+
+    def __init__(self, db, redis=None, max_batch: int = 256, max_wait: float = 0.002, max_pending: int = 10000,
+                 snapshot_interval: float = 60.0, cache_ttl: int = 1800, history=None):
+        self.db = db
+        self.redis = redis
+        self.history = history
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.snapshot_interval = snapshot_interval
+        self.cache_ttl = cache_ttl
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.dirty = set()  # wallets changed since the last snapshot
+        self._tasks = []
+        self._inflight = None
+        self.counters = {"transfers": 0, "rejected": 0, "batches": 0, "batch_retry": 0, "batch_failed": 0,
+                         "snapshots": 0, "redis_error": 0}
+
+    async def create_schema(self):
+        """ledger tables + the transactions table every transfer is recorded in"""
+        async with self.db.writer.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+            await conn.run_sync(history_tables.metadata.create_all)
+
+    async def open_wallet(self, user_id: uuid.UUID, currency: str = "USD", balance: Decimal = Decimal("0.00")):
+        wallet_id = uuid.uuid4()
+        async with self.db.writer_session() as session:
+            await session.execute(insert(wallets).values(wallet_id=wallet_id, user_id=user_id, currency=currency,
+                                                         balance=balance, updated_at=datetime.now(timezone.utc)))
+        return wallet_id
+
+    async def balance(self, wallet_id: uuid.UUID) -> Decimal | None:
+        async with self.db.writer_session() as session:
+            return (await session.execute(select(wallets.c.balance).where(wallets.c.wallet_id == wallet_id))).scalar()
+
+    # ---- request path ----
+
+    async def transfer(self, from_wallet: uuid.UUID, to_wallet: uuid.UUID, amount: Decimal,
+                       currency: str = "USD", owner: uuid.UUID | None = None) -> dict:
+        """
+        queued, resolved when its batch commits -> {"transfer_id", "balance"}, raises TransferRejected
+        owner: user the source wallet must belong to, checked under the batch's row lock
+               (NotWalletOwner otherwise); None skips the check, for internal callers only
+        """
+        amount = Decimal(amount).quantize(CENT)
+        if amount <= 0:
+            raise TransferRejected("amount must be positive")
+        if from_wallet == to_wallet:
+            raise TransferRejected("cannot transfer to the same wallet")
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(_Transfer(from_wallet, to_wallet, amount, currency, owner, future))
+        return await future
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self.run()), asyncio.create_task(self.snapshot_loop())]
+            self._tasks[0].add_done_callback(self._run_stopped)
+
+    def _run_stopped(self, task: asyncio.Task):
+        """run() died: queued transfers fail instead of waiting forever, the next transfer() starts a new loop"""
+        if task.cancelled() or self._tasks[:1] != [task]:
+            return  # close()
+        print(f"ledger batch loop stopped: {task.exception()!r}")
+        for other in self._tasks[1:]:
+            other.cancel()
+        self._tasks = []
+        while not self.queue.empty():
+            t = self.queue.get_nowait()
+            if not t.future.done():
+                t.future.set_exception(TransferRejected("ledger unavailable, try again"))
+
+    # ---- group commit ----
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            try:
+                await self._fill(batch)
+            except BaseException as e:
+                reason = "ledger shutting down" if isinstance(e, asyncio.CancelledError) else "ledger unavailable, try again"
+                for t in batch:
+                    if not t.future.done():
+                        t.future.set_exception(TransferRejected(reason))
+                raise
+            # shielded: close() cancelling run() never interrupts a batch between its commit and its replies
+            self._inflight = asyncio.ensure_future(self._commit(batch))
+            try:
+                await asyncio.shield(self._inflight)
+            except Exception as e:  # after the commit (publish / invalidate), whatever was not answered fails
+                self._fail([t for t in batch if not t.future.done()], e)
+
+    async def _fill(self, batch: list[_Transfer]):
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                async with asyncio.timeout(remaining):
+                    batch.append(await self.queue.get())
+            except TimeoutError:
+                return
+
+    async def _commit(self, batch: list[_Transfer]):
+        started = time.perf_counter()
+        for attempt in range(2):
+            try:
+                results, balances, users = await self._apply(batch)
+                break
+            except DBAPIError as e:
+                # deadlock / serialization failure from another writer: the whole batch rolled back, retry once
+                if attempt == 0 and getattr(e.orig, "sqlstate", None) in ("40001", "40P01"):
+                    self.counters["batch_retry"] += 1
+                    continue
+                self._fail(batch, e)
+                return
+            except Exception as e:
+                self._fail(batch, e)
+                return
+
+        self.counters["batches"] += 1
+        registry.inc("ledger_batches_total", ())
+        registry.observe("ledger_commit_seconds", (), time.perf_counter() - started)
+        await self._publish(balances)
+        if self.history is not None:
+            await self.history.invalidate(users)
+        now = time.perf_counter()
+        for transfer, result in zip(batch, results):
+            status = "rejected" if isinstance(result, TransferRejected) else "ok"
+            self.counters["rejected" if status == "rejected" else "transfers"] += 1
+            registry.inc("ledger_transfers_total", (("status", status),))
+            registry.observe("ledger_transfer_seconds", (), now - transfer.queued_at)
+            if transfer.future.done():
+                continue  # caller gave up (cancelled), the transfer itself is committed
+            if status == "rejected":
+                transfer.future.set_exception(result)
+            else:
+                transfer.future.set_result(result)
+
+    async def _apply(self, batch: list[_Transfer]):
+        """
+        one transaction -> ([result | TransferRejected per transfer], {wallet_id: new balance},
+                            {user ids that sent / received})
+        """
+        ids = sorted({t.from_wallet for t in batch} | {t.to_wallet for t in batch})
+        now = datetime.now(timezone.utc)
+        async with self.db.writer_session() as session:
+            rows = (await session.execute(
+                select(wallets.c.wallet_id, wallets.c.user_id, wallets.c.currency, wallets.c.balance)
+                .where(wallets.c.wallet_id.in_(ids)).order_by(wallets.c.wallet_id).with_for_update()
+            )).all()
+            owner = {r.wallet_id: r.user_id for r in rows}
+            currency = {r.wallet_id: r.currency for r in rows}
+            balance = {r.wallet_id: r.balance for r in rows}
+            touched = {}
+            entries = []
+            history = []
+            results = []
+            for t in batch:
+                if t.owner is not None and owner.get(t.from_wallet) != t.owner:
+                    results.append(NotWalletOwner("source wallet does not belong to the caller"))
+                    continue
+                if t.from_wallet not in balance or t.to_wallet not in balance:
+                    results.append(TransferRejected("unknown wallet"))
+                    continue
+                if not currency[t.from_wallet] == currency[t.to_wallet] == t.currency:
+                    results.append(TransferRejected("currency mismatch"))
+                    continue
+                if balance[t.from_wallet] < t.amount:
+                    results.append(TransferRejected("insufficient funds"))
+                    continue
+                transfer_id = uuid.uuid4()
+                balance[t.from_wallet] -= t.amount
+                balance[t.to_wallet] += t.amount
+                touched[t.from_wallet] = touched[t.to_wallet] = True
+                entries.append({"transfer_id": transfer_id, "wallet_id": t.from_wallet, "amount": -t.amount,
+                                "balance_after": balance[t.from_wallet], "created_at": now})
+                entries.append({"transfer_id": transfer_id, "wallet_id": t.to_wallet, "amount": t.amount,
+                                "balance_after": balance[t.to_wallet], "created_at": now})
+                history.append(transaction_row(owner[t.from_wallet], owner[t.to_wallet], t.amount, "transfer",
+                                               transaction_id=transfer_id, created_at=now, currency=t.currency,
+                                               status="completed", completed_at=now))
+                results.append({"transfer_id": str(transfer_id), "balance": str(balance[t.from_wallet])})
+            if entries:
+                await session.execute(insert(ledger_entries), entries)
+                await session.execute(insert(history_tables.transactions), history)
+                await session.execute(
+                    update(wallets).where(wallets.c.wallet_id == bindparam("wid"))
+                    .values(balance=bindparam("new_balance"), updated_at=now),
+                    [{"wid": w, "new_balance": balance[w]} for w in sorted(touched)],
+                )
+        self.dirty.update(touched)
+        users = {row["sender_id"] for row in history} | {row["receiver_id"] for row in history}
+        return results, {w: balance[w] for w in touched}, users
+
+    def _fail(self, batch, error):
+        self.counters["batch_failed"] += 1
+        print(f"ledger batch of {len(batch)} failed: {error!r}")
+        for t in batch:
+            registry.inc("ledger_transfers_total", (("status", "error"),))
+            if not t.future.done():
+                t.future.set_exception(error)
+
+    async def _publish(self, balances: dict):
+        if self.redis is None or not balances:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for wallet_id, value in balances.items():
+                    pipe.set(f"wallet_balance:{wallet_id}", str(value), ex=self.cache_ttl)
+                    pipe.publish(f"balance_updates:{wallet_id}",
+                                 json.dumps({"balance": str(value), "timestamp": time.time()}))
+                await pipe.execute()
+        except RedisError:
+            self.counters["redis_error"] += 1
+
+    # ---- snapshots ----
+
+    async def snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception as e:
+                print(f"balance snapshot failed: {e!r}")
+
+    async def snapshot(self) -> int:
+        """
+        one row per wallet touched since the last snapshot, taken under the same ordered row locks;
+        pre-fork workers each keep their own dirty set, a wallet another worker already snapshotted
+        at the same entry is skipped (it would be a primary key conflict failing the whole insert)
+        """
+        dirty, self.dirty = sorted(self.dirty), set()
+        if not dirty:
+            return 0
+        try:
+            async with self.db.writer_session() as session:
+                rows = (await session.execute(
+                    select(wallets.c.wallet_id, wallets.c.balance)
+                    .where(wallets.c.wallet_id.in_(dirty)).order_by(wallets.c.wallet_id).with_for_update()
+                )).all()
+                last = dict((await session.execute(
+                    select(ledger_entries.c.wallet_id, func.max(ledger_entries.c.entry_id))
+                    .where(ledger_entries.c.wallet_id.in_(dirty)).group_by(ledger_entries.c.wallet_id)
+                )).all())
+                covered = dict((await session.execute(
+                    select(balance_snapshots.c.wallet_id, func.max(balance_snapshots.c.last_entry_id))
+                    .where(balance_snapshots.c.wallet_id.in_(dirty)).group_by(balance_snapshots.c.wallet_id)
+                )).all())
+                now = datetime.now(timezone.utc)
+                snaps = [{"wallet_id": r.wallet_id, "last_entry_id": last[r.wallet_id], "balance": r.balance,
+                          "taken_at": now} for r in rows
+                         if r.wallet_id in last and covered.get(r.wallet_id, -1) < last[r.wallet_id]]
+                if snaps:
+                    await session.execute(insert(balance_snapshots), snaps)
+        except BaseException:
+            self.dirty.update(dirty)  # try these again next time
+            raise
+        self.counters["snapshots"] += len(snaps)
+        return len(snaps)
+
+    async def verify(self, wallet_id: uuid.UUID, owner: uuid.UUID | None = None) -> dict:
+        """
+        reconcile: latest snapshot (or 0) + ledger entries after it vs wallets.balance
+        owner: like transfer(), NotWalletOwner unless the wallet belongs to this user
+        """
+        async with self.db.writer_session() as session:
+            if owner is not None:
+                wallet_owner = (await session.execute(
+                    select(wallets.c.user_id).where(wallets.c.wallet_id == wallet_id))).scalar()
+                if wallet_owner != owner:
+                    raise NotWalletOwner("wallet does not belong to the caller")
+            snap = (await session.execute(
+                select(balance_snapshots.c.last_entry_id, balance_snapshots.c.balance)
+                .where(balance_snapshots.c.wallet_id == wallet_id)
+                .order_by(balance_snapshots.c.last_entry_id.desc()).limit(1)
+            )).first()
+            since, base = (snap.last_entry_id, snap.balance) if snap else (0, None)
+            delta = (await session.execute(
+                select(func.coalesce(func.sum(ledger_entries.c.amount), 0))
+                .where(ledger_entries.c.wallet_id == wallet_id, ledger_entries.c.entry_id > since)
+            )).scalar()
+            first = None
+            if base is None:  # no snapshot yet: opening balance = balance before the first entry
+                first = (await session.execute(
+                    select(ledger_entries.c.balance_after - ledger_entries.c.amount)
+                    .where(ledger_entries.c.wallet_id == wallet_id).order_by(ledger_entries.c.entry_id).limit(1)
+                )).scalar()
+            current = (await session.execute(select(wallets.c.balance).where(wallets.c.wallet_id == wallet_id))).scalar()
+        opening = base if base is not None else (first if first is not None else current)
+        expected = (Decimal(opening) + Decimal(delta)).quantize(CENT)
+        return {"balance": str(current), "from_ledger": str(expected), "consistent": expected == current}
+
+    # ---- lifecycle / stats ----
+
+    async def close(self):
+        """stops taking batches; queued transfers fail, snapshot of what has been committed"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._inflight is not None:
+            await self._inflight
+        while not self.queue.empty():
+            t = self.queue.get_nowait()
+            if not t.future.done():
+                t.future.set_exception(TransferRejected("ledger shutting down"))
+        try:
+            await self.snapshot()
+        except Exception as e:
+            print(f"final balance snapshot failed: {e!r}")
+
+    def stats(self) -> dict:
+        done = self.counters["transfers"] + self.counters["rejected"]
+        return {**self.counters, "avg_batch": round(done / self.counters["batches"], 2) if self.counters["batches"] else 0,
+                "queued": self.queue.qsize(), "dirty_wallets": len(self.dirty)}
+
+
+_ledger: WalletLedger | None = None
+
+
+def get_ledger(redis=None) -> WalletLedger:
+    global _ledger
+    if _ledger is None:
+        _ledger = WalletLedger(get_database(), redis, history=get_history(redis))
+    return _ledger
+
+
+async def close_ledger():
+    global _ledger
+    if _ledger is not None:
+        await _ledger.close()
+        _ledger = None
@@ -0,0 +1,40 @@
+"""
+Schema migration step for the dao tables, run once per database before serving traffic
+(workers never issue DDL themselves).
+
+    python -m src.webApp1.dao.migrate
+        CREATE TABLE / INDEX IF NOT EXISTS for transactions, wallets, ledger_entries, balance_snapshots
+        on DATABASE_URL (the writer; replicas get them through replication)
+"""
+import asyncio
+import sys
+
+from src.webApp1.dao import ledger, transactions
+from src.webApp1.dao.database import close_database, get_database
+
+METADATA = (transactions.metadata, ledger.metadata)
+
+
+async def create_schema(db) -> list[str]:
+    """-> table names, existing tables / indexes are left alone"""
+    async with db.writer.begin() as conn:
+        for metadata in METADATA:
+            await conn.run_sync(metadata.create_all)
+    return [name for metadata in METADATA for name in metadata.tables]
+
+
+async def _main():
+    try:
+        tables = await create_schema(get_database())
+        print(f"schema ready on {get_database().names[get_database().writer]}: {', '.join(tables)}")
+    finally:
+        await close_database()
+
+
+def main():
+    asyncio.run(_main())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
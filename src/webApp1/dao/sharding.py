@@ -0,0 +1,394 @@
+"""
+Shard routing on a consistent-hash ring (replaces hash-mod-N of DatabaseShardManager in
+systemDesign/paypal/docs/design/scalable.md, where adding a 5th shard remaps ~80% of users).
+
+- ring   : every shard owns `vnodes` points (blake2b of "name#i"), a key belongs to the first point
+           clockwise of its hash; adding shard N+1 moves ~1/(N+1) of the keys, all of them to the new shard
+- moves  : moved_ranges(old, new) lists only the arcs that change owner; rebalance() copies the rows
+           whose key falls in those arcs (only from the shards losing arcs, insert-if-absent), flips the
+           ring once the copy is complete, then deletes the moved rows from the old owners.
+           While it copies, execute_for_key() writes to both owners; while a move is in flight,
+           fetch_for_key() merges the rows of both.
+- scatter: the same query on every shard concurrently, each with its own timeout; slow / failed shards
+           are reported, not fatal. scatter_sorted() streams a k-way merge of per-shard ORDER BY results.
+
+    router = ShardRouter({"shard_0": DatabaseManager(url0), "shard_1": DatabaseManager(url1)})
+    async with router.manager_for(user_id).writer_session() as session: ...
+"""
+import asyncio
+import bisect
+import hashlib
+import heapq
+import time
+from contextlib import AsyncExitStack, nullcontext
+
+from sqlalchemy import delete, insert, select, text
+
+RING_SIZE = 2 ** 64
+
+
+def ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes=(), vnodes: int = 128):
+        self.vnodes = vnodes
+        self.nodes = set()
+        self._points = []  # sorted hash points
+        self._owners = []  # node owning the point at the same index
+        for node in nodes:
+            self.add(node)
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(vnodes=self.vnodes)
+        ring.nodes = set(self.nodes)
+        ring._points = list(self._points)
+        ring._owners = list(self._owners)
+        return ring
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            point = ring_hash(f"{node}#{i}")
+            index = bisect.bisect_left(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        self.nodes.discard(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def owner_of_hash(self, h: int) -> str:
+        if not self._points:
+            raise LookupError("hash ring is empty")
+        index = bisect.bisect_left(self._points, h)
+        return self._owners[index % len(self._points)]  # past the last point wraps to the first
+
+    def node_for(self, key) -> str:
+        return self.owner_of_hash(ring_hash(str(key)))
+
+    def arcs(self):
+        """(start exclusive, end inclusive, owner) covering the whole ring, the first one wraps around"""
+        for i, (point, owner) in enumerate(zip(self._points, self._owners)):
+            yield self._points[i - 1], point, owner
+
+
+def _in_arc(h: int, start: int, end: int) -> bool:
+    return start < h <= end if start < end else h > start or h <= end
+
+
+def moved_ranges(old: HashRing, new: HashRing) -> list[tuple[int, int, str, str]]:
+    """
+    -> [(start, end, from_node, to_node)], the hash arcs whose owner differs between the rings
+    (boundaries of both rings merged, each elementary arc compared once)
+    """
+    points = sorted(set(old._points) | set(new._points))
+    moved = []
+    for i, end in enumerate(points):
+        start = points[i - 1]
+        before, after = old.owner_of_hash(end), new.owner_of_hash(end)
+        if before != after:
+            if moved and moved[-1][1] == start and moved[-1][2:] == (before, after):
+                moved[-1] = (moved[-1][0], end, before, after)  # merge adjacent arcs
+            else:
+                moved.append((start, end, before, after))
+    return moved
+
+
+class ShardRouter:
+    """
+    shards: name -> dao.database.DatabaseManager (each shard keeps its own pools / replicas)
+    timeout: default per-shard budget for scatter queries, seconds
+    """
+
+    def __init__(self, shards: dict, vnodes: int = 128, timeout: float = 2.0):
+        self.shards = dict(shards)
+        self.ring = HashRing(self.shards, vnodes=vnodes)
+        self.timeout = timeout
+        self.next = None  # ring being copied to, writes go to both owners until the flip
+        self.previous = None  # ring before the flip, while its moved rows are being deleted
+        self._copying = asyncio.Lock()  # one copy batch or one double write at a time
+        self.counters = {"routed": 0, "merged_read": 0, "double_write": 0, "scatter": 0, "shard_timeout": 0,
+                         "shard_error": 0, "rows_moved": 0}
+
+    # ---- single key ----
+
+    def shard_for(self, key) -> str:
+        self.counters["routed"] += 1
+        return self.ring.node_for(key)
+
+    def manager_for(self, key):
+        return self.shards[self.shard_for(key)]
+
+    def _moving_to(self, key) -> str | None:
+        """the other owner of key while a move of it is in flight, else None"""
+        other = self.next or self.previous
+        if other is None:
+            return None
+        name = other.node_for(key)
+        return None if name == self.ring.node_for(key) else name
+
+    async def fetch_for_key(self, key, statement, params: dict | None = None) -> list:
+        """
+        read on the owner; while the key is being moved, on both owners, rows of the current owner
+        first, then the other's that are not already among them
+        """
+        owner = self.shard_for(key)
+        other = self._moving_to(key)
+        if other is None:
+            return await self.shards[owner].fetch_all(statement, params)
+        self.counters["merged_read"] += 1
+        rows, extra = await asyncio.gather(self.shards[owner].fetch_all(statement, params),
+                                           self.shards[other].fetch_all(statement, params))
+        seen = {tuple(r) for r in rows}
+        return rows + [r for r in extra if tuple(r) not in seen]
+
+    async def execute_for_key(self, key, statement, params: dict | list | None = None):
+        """write on the owner; while the key is being copied, on the new owner too (-> owner's result)"""
+        owner = self.shard_for(key)
+        other = self._moving_to(key) if self.next is not None else None
+        async with self._copying if other is not None else nullcontext():
+            result = await self.shards[owner].execute(statement, params)
+            if other is not None:
+                self.counters["double_write"] += 1
+                await self.shards[other].execute(statement, params)
+        return result
+
+    # ---- scatter / gather ----
+
+    async def scatter(self, statement, params: dict | None = None, timeout: float | None = None) -> dict:
+        """-> {"rows": {shard: [rows]}, "failed": {shard: reason}}, all shards queried concurrently"""
+        self.counters["scatter"] += 1
+        timeout = self.timeout if timeout is None else timeout
+        names = list(self.shards)
+
+        async def one(name):
+            async with asyncio.timeout(timeout):
+                return await self.shards[name].fetch_all(statement, params)
+
+        results = await asyncio.gather(*(one(n) for n in names), return_exceptions=True)
+        out = {"rows": {}, "failed": {}}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                out["failed"][name] = self._failure(name, result)
+            else:
+                out["rows"][name] = result
+        return out
+
+    async def scatter_sorted(self, statement, params: dict | None = None, sort_key=None, reverse: bool = False,
+                             limit: int | None = None, timeout: float | None = None, failed: dict | None = None):
+        """
+        async generator: every shard streams its ORDER BY result, rows come out in global order
+        (heap of one head row per shard, so memory is O(shards), not O(rows)).
+        sort_key(row) must match the statement's ORDER BY, reverse=True for DESC.
+        A shard that errors or runs past `timeout` is dropped and recorded in `failed`.
+        """
+        self.counters["scatter"] += 1
+        failed = {} if failed is None else failed
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        statement = text(statement) if isinstance(statement, str) else statement
+
+        async with AsyncExitStack() as stack:
+            async def open_stream(name):
+                manager = self.shards[name]
+                conn = await stack.enter_async_context(manager.pick_replica().connect())
+                result = await conn.stream(statement, params or {})
+                return aiter(result)
+
+            async def advance(name, stream):
+                try:
+                    async with asyncio.timeout(max(0.0, deadline - time.monotonic())):
+                        return await anext(stream)
+                except StopAsyncIteration:
+                    return None
+
+            streams = {}
+            opened = await asyncio.gather(*(self._timed(open_stream(n), deadline) for n in self.shards),
+                                          return_exceptions=True)
+            for name, stream in zip(self.shards, opened):
+                if isinstance(stream, BaseException):
+                    failed[name] = self._failure(name, stream)
+                else:
+                    streams[name] = stream
+            firsts = await asyncio.gather(*(advance(n, s) for n, s in streams.items()), return_exceptions=True)
+
+            heap = []
+            sign = -1 if reverse else 1
+            for order, ((name, stream), row) in enumerate(zip(streams.items(), firsts)):
+                if isinstance(row, BaseException):
+                    failed[name] = self._failure(name, row)
+                elif row is not None:
+                    heap.append((_SortKey(sort_key(row), sign), order, name, row))
+            heapq.heapify(heap)
+
+            emitted = 0
+            while heap and (limit is None or emitted < limit):
+                _, order, name, row = heapq.heappop(heap)
+                yield row
+                emitted += 1
+                try:
+                    following = await advance(name, streams[name])
+                except Exception as e:
+                    failed[name] = self._failure(name, e)
+                    continue
+                if following is not None:
+                    heapq.heappush(heap, (_SortKey(sort_key(following), sign), order, name, following))
+
+    @staticmethod
+    async def _timed(coro, deadline):
+        async with asyncio.timeout(max(0.0, deadline - time.monotonic())):
+            return await coro
+
+    def _failure(self, name, error) -> str:
+        if isinstance(error, TimeoutError):
+            self.counters["shard_timeout"] += 1
+            return "timeout"
+        self.counters["shard_error"] += 1
+        print(f"scatter on {name} failed: {error!r}")
+        return repr(error)
+
+    # ---- rebalancing ----
+
+    async def add_shard(self, name: str, manager, tables: list, batch_size: int = 500) -> dict:
+        new = self.ring.copy()
+        new.add(name)
+        self.shards[name] = manager
+        try:
+            return await self.rebalance(new, tables, batch_size)
+        except BaseException:
+            self.shards.pop(name)  # not on the ring, scatter must not query it
+            raise
+
+    async def remove_shard(self, name: str, tables: list, batch_size: int = 500) -> dict:
+        new = self.ring.copy()
+        new.remove(name)
+        report = await self.rebalance(new, tables, batch_size)
+        self.shards.pop(name)
+        return report
+
+    async def rebalance(self, new: HashRing, tables: list, batch_size: int = 500) -> dict:
+        """
+        tables: [(Table, key column name)], eg: [(transactions, "sender_id")]
+        - only shards that lose arcs are scanned, only rows whose key hash is in a moved arc are copied
+        - copy: insert-if-absent on the new owner, so a row double-written during the copy is not
+          overwritten by the older copy of it; the ring flips only after every table is copied
+        - then the moved rows are deleted from the old owners; a failed copy deletes what it copied instead
+        -> {"moved_ranges": n, "moved_fraction": share of the ring, "rows": {table: n}}
+        """
+        ranges = moved_ranges(self.ring, new)
+        sources = {src for _, _, src, _ in ranges if src in self.shards}
+        rows = {}
+        self.next = new  # the current ring stays authoritative, writes also reach the new owners
+        try:
+            for table, key_column in tables:
+                rows[table.name] = 0
+                for source in sources:
+                    rows[table.name] += await self._copy_rows(table, key_column, source, ranges, batch_size)
+        except BaseException:
+            self.next = None
+            await self._undo_copy(tables, ranges, batch_size)
+            raise
+        self.previous, self.ring, self.next = self.ring, new, None  # flip: the copies are complete
+        try:
+            for table, key_column in tables:
+                for source in sources:
+                    arcs = [(start, end) for start, end, src, _ in ranges if src == source]
+                    await self._delete_rows(table, key_column, source, arcs, batch_size)
+        finally:
+            self.previous = None
+        self.counters["rows_moved"] += sum(rows.values())
+        fraction = sum((end - start) % RING_SIZE for start, end, _, _ in ranges) / RING_SIZE
+        return {"moved_ranges": len(ranges), "moved_fraction": round(fraction, 4), "rows": rows}
+
+    async def _scan(self, table, shard, batch_size):
+        """async generator: every row of table on shard, in primary key batches"""
+        pk = list(table.primary_key.columns)[0]
+        last = None
+        while True:
+            query = select(table).order_by(pk).limit(batch_size)
+            if last is not None:
+                query = query.where(pk > last)
+            async with self.shards[shard].writer.connect() as conn:
+                batch = (await conn.execute(query)).mappings().all()
+            if not batch:
+                return
+            last = batch[-1][pk.name]
+            yield batch
+
+    async def _copy_rows(self, table, key_column, source, ranges, batch_size) -> int:
+        pk = list(table.primary_key.columns)[0]
+        mine = [(start, end, dst) for start, end, src, dst in ranges if src == source]
+        copied = 0
+        async for batch in self._scan(table, source, batch_size):
+            by_target = {}
+            for row in batch:
+                h = ring_hash(str(row[key_column]))
+                for start, end, dst in mine:
+                    if _in_arc(h, start, end):
+                        by_target.setdefault(dst, []).append(dict(row))
+                        break
+            async with self._copying:  # no double write lands between reading the target and inserting
+                async with self.shards[source].writer.connect() as conn:  # re-read: the scan may be stale
+                    for dst, rows in by_target.items():
+                        fresh = (await conn.execute(select(table).where(pk.in_([r[pk.name] for r in rows]))))
+                        by_target[dst] = [dict(r) for r in fresh.mappings().all()]
+                for dst, rows in by_target.items():
+                    async with self.shards[dst].writer_session() as session:
+                        present = set((await session.execute(
+                            select(pk).where(pk.in_([r[pk.name] for r in rows])))).scalars())
+                        absent = [r for r in rows if r[pk.name] not in present]
+                        if absent:
+                            await session.execute(insert(table), absent)
+                    copied += len(rows)
+        return copied
+
+    async def _delete_rows(self, table, key_column, shard, arcs, batch_size) -> int:
+        """rows of table on shard whose key hash falls in one of arcs [(start, end)]"""
+        pk = list(table.primary_key.columns)[0]
+        deleted = 0
+        async for batch in self._scan(table, shard, batch_size):
+            keys = [row[pk.name] for row in batch
+                    if any(_in_arc(ring_hash(str(row[key_column])), start, end) for start, end in arcs)]
+            if keys:
+                async with self.shards[shard].writer_session() as session:
+                    await session.execute(delete(table).where(pk.in_(keys)))
+                deleted += len(keys)
+        return deleted
+
+    async def _undo_copy(self, tables, ranges, batch_size):
+        """a failed rebalance: the new owners never owned these rows, their partial copies go"""
+        for dst in {dst for _, _, _, dst in ranges if dst in self.shards}:
+            arcs = [(start, end) for start, end, _, to in ranges if to == dst]
+            for table, key_column in tables:
+                try:
+                    await self._delete_rows(table, key_column, dst, arcs, batch_size)
+                except Exception as e:
+                    print(f"cleanup of partial copy on {dst} failed: {e!r}")
+
+    async def close(self):
+        await asyncio.gather(*(m.close() for m in self.shards.values()))
+
+    def stats(self) -> dict:
+        return {**self.counters, "shards": sorted(self.shards), "vnodes": self.ring.vnodes,
+                "rebalancing": self.next is not None or self.previous is not None}
+
+
+class _SortKey:
+    """heap entry key, sign=-1 flips the order for DESC merges of any comparable type"""
+    __slots__ = ("value", "sign")
+
+    def __init__(self, value, sign):
+        self.value = value
+        self.sign = sign
+
+    def __lt__(self, other):
+        return self.value > other.value if self.sign < 0 else self.value < other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
@@ -0,0 +1,261 @@
+"""
+Transaction history (GET /api/v1/transactions, systemDesign/paypal/docs/design/api.md), keyset paginated.
+
+OFFSET n reads and throws away n rows, so page 10,000 costs 10,000 pages. Here every page is
+`WHERE (created_at, transaction_id) < (last seen) ORDER BY created_at DESC, transaction_id DESC LIMIT n`
+on an index with exactly that order: one index descent + n rows, whatever the depth.
+
+- a user's history = sent UNION ALL received, each side walks its own covering index
+  (user, created_at DESC, transaction_id DESC) INCLUDE (listed columns) -> no heap lookups on Postgres
+- cursors are opaque: base64url(JSON) + HMAC-SHA256, bound to the user and the filters,
+  a tampered / foreign cursor is rejected (InvalidCursor); the key is CURSOR_SECRET, shared by all workers
+- optional first-page cache (default limit, no filters) per user, keyed on a per-user version
+  (`txn:first:{user}:{version}`); record() and the wallet ledger (dao/ledger.py, after each group commit)
+  bump the version through invalidate() -> every worker's L1 / L2 copy is unreachable at once, and a
+  page read from the DB before the commit is written back under the old version, never read again
+- tables: `python -m src.webApp1.dao.migrate` (or create_schema()) before the first request
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from redis.exceptions import RedisError
+from sqlalchemy import (Column, DateTime, Index, MetaData, Numeric, String, Table, Text, Uuid, insert,
+                        select, tuple_, union_all)
+
+from src.webApp1.cache.multilevel import MultiLevelCache
+from src.webApp1.dao.database import get_database
+from src.webApp1.service.init_srv import ConfigError
+
+metadata = MetaData()
+
+transactions = Table(
+    "transactions", metadata,
+    Column("transaction_id", Uuid, primary_key=True, default=uuid.uuid4),
+    Column("sender_id", Uuid, nullable=False),
+    Column("receiver_id", Uuid, nullable=False),
+    Column("amount", Numeric(15, 2), nullable=False),
+    Column("currency", String(3), nullable=False, default="USD"),
+    Column("transaction_type", String(20), nullable=False),
+    Column("status", String(20), nullable=False, default="pending"),
+    Column("description", Text),
+    Column("fees", Numeric(10, 2), nullable=False, default=Decimal("0.00")),
+    Column("created_at", DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)),
+    Column("completed_at", DateTime(timezone=True)),
+)
+
+# columns a history page returns, carried in the index leaf (INCLUDE) so pages are index-only scans
+LISTED = ("sender_id", "receiver_id", "amount", "currency", "transaction_type", "status")
+
+Index("ix_transactions_sender_history",
+      transactions.c.sender_id, transactions.c.created_at.desc(), transactions.c.transaction_id.desc(),
+      postgresql_include=[c for c in LISTED if c != "sender_id"])
+Index("ix_transactions_receiver_history",
+      transactions.c.receiver_id, transactions.c.created_at.desc(), transactions.c.transaction_id.desc(),
+      postgresql_include=[c for c in LISTED if c != "receiver_id"])
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def cursor_secret() -> bytes:
+    """
+    CURSOR_SECRET, required: every worker (pre-fork included) must accept the cursors the others
+    minted, and cached first pages carry cursors across workers. Called in the lifespan hook so a
+    missing secret stops the app at startup, not on the first history request.
+    """
+    secret = os.getenv("CURSOR_SECRET", "").encode()
+    if not secret:
+        raise ConfigError("CURSOR_SECRET is not set, transaction history cursors need a key shared by all workers")
+    return secret
+
+
+class CursorCodec:
+    """(created_at, transaction_id) of the last row <-> opaque signed token"""
+
+    def __init__(self, secret: bytes):
+        self.secret = secret
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()[:16]
+
+    def encode(self, created_at: datetime, transaction_id, scope: str) -> str:
+        payload = json.dumps([created_at.isoformat(), str(transaction_id), scope], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(payload + self._sign(payload)).rstrip(b"=").decode()
+
+    def decode(self, token: str, scope: str) -> tuple[datetime, uuid.UUID]:
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            payload, signature = raw[:-16], raw[-16:]
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                raise InvalidCursor("cursor signature mismatch")
+            created_at, transaction_id, cursor_scope = json.loads(payload)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursor(f"malformed cursor: {e}") from None
+        if cursor_scope != scope:
+            raise InvalidCursor("cursor belongs to another user or filter set")
+        return datetime.fromisoformat(created_at), uuid.UUID(transaction_id)
+
+
+def transaction_row(sender_id: uuid.UUID, receiver_id: uuid.UUID, amount: Decimal, transaction_type: str,
+                    transaction_id: uuid.UUID | None = None, created_at: datetime | None = None, **fields) -> dict:
+    """values of one transactions row, for record() and for writers batching their own inserts"""
+    return {"transaction_id": transaction_id or uuid.uuid4(), "sender_id": sender_id, "receiver_id": receiver_id,
+            "amount": amount, "transaction_type": transaction_type,
+            "created_at": created_at or datetime.now(timezone.utc), **fields}
+
+
+def _row(row) -> dict:
+    return {
+        "transaction_id": str(row.transaction_id),
+        "sender_id": str(row.sender_id),
+        "receiver_id": str(row.receiver_id),
+        "amount": str(row.amount),
+        "currency": row.currency,
+        "transaction_type": row.transaction_type,
+        "status": row.status,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+class TransactionHistory:
+    """
+    db: dao.database.DatabaseManager (pages are read from a replica, record() goes to the writer)
+    first_page_cache: optional cache.multilevel.MultiLevelCache, page versions live in its redis
+                      (in process when it has none)
+    """
+
+    VERSION_TTL = 86400  # idle users' version keys go away; far longer than any cached page lives
+
+    def __init__(self, db, first_page_cache=None, secret: bytes | None = None):
+        self.db = db
+        self.first_page_cache = first_page_cache
+        self.cursors = CursorCodec(secret or cursor_secret())
+        self._versions = {}  # user_id -> version, without redis only
+
+    async def create_schema(self):
+        async with self.db.writer.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+
+    @staticmethod
+    def _scope(user_id, status, start, end) -> str:
+        filters = f"{user_id}|{status or ''}|{start.isoformat() if start else ''}|{end.isoformat() if end else ''}"
+        return hashlib.sha256(filters.encode()).hexdigest()[:16]
+
+    def _side(self, user_column, user_id, after, status, start, end, limit):
+        t = transactions.c
+        query = select(t.transaction_id, *(getattr(t, c) for c in LISTED), t.created_at).where(user_column == user_id)
+        if status:
+            query = query.where(t.status == status)
+        if start:
+            query = query.where(t.created_at >= start)
+        if end:
+            query = query.where(t.created_at < end)
+        if after:
+            query = query.where(tuple_(t.created_at, t.transaction_id) < tuple_(*after))
+        return query.order_by(t.created_at.desc(), t.transaction_id.desc()).limit(limit)
+
+    async def page(self, user_id: uuid.UUID, limit: int = DEFAULT_LIMIT, cursor: str | None = None,
+                   status: str | None = None, start: datetime | None = None, end: datetime | None = None) -> dict:
+        """-> {"transactions": [...], "next_cursor": str | None}, newest first"""
+        limit = max(1, min(limit, MAX_LIMIT))
+        scope = self._scope(user_id, status, start, end)
+        after = self.cursors.decode(cursor, scope) if cursor else None
+        cacheable = self.first_page_cache is not None and after is None and limit == DEFAULT_LIMIT \
+            and not (status or start or end)
+        version = await self._version(user_id) if cacheable else None
+        if version is not None:
+            return await self.first_page_cache.get(
+                f"{user_id}:{version}", lambda: self._page(user_id, limit, after, status, start, end, scope))
+        return await self._page(user_id, limit, after, status, start, end, scope)
+
+    async def _page(self, user_id, limit, after, status, start, end, scope) -> dict:
+        t = transactions.c
+        # each side wrapped in its own subquery: keeps its ORDER BY / LIMIT (sqlite rejects them in a bare UNION)
+        both = union_all(
+            select(self._side(t.sender_id, user_id, after, status, start, end, limit + 1).subquery()),
+            select(self._side(t.receiver_id, user_id, after, status, start, end, limit + 1).subquery()),
+        ).subquery()
+        query = select(both).order_by(both.c.created_at.desc(), both.c.transaction_id.desc()).limit(2 * (limit + 1))
+        async with self.db.reader() as session:
+            rows = (await session.execute(query)).all()
+
+        seen = set()
+        page = []
+        for row in rows:  # a transfer to yourself comes back from both sides
+            if row.transaction_id not in seen:
+                seen.add(row.transaction_id)
+                page.append(row)
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = None
+        if has_more:
+            next_cursor = self.cursors.encode(page[-1].created_at, page[-1].transaction_id, scope)
+        return {"transactions": [_row(r) for r in page], "next_cursor": next_cursor}
+
+    async def record(self, sender_id: uuid.UUID, receiver_id: uuid.UUID, amount: Decimal,
+                     transaction_type: str, **fields) -> dict:
+        """insert one transaction, drop both users' cached first page"""
+        values = transaction_row(sender_id, receiver_id, amount, transaction_type, **fields)
+        async with self.db.writer_session() as session:
+            await session.execute(insert(transactions).values(**values))
+        await self.invalidate([sender_id, receiver_id])
+        return {"transaction_id": str(values["transaction_id"]), "created_at": values["created_at"].isoformat()}
+
+    def _version_key(self, user_id) -> str:
+        return f"{self.first_page_cache.prefix}ver:{user_id}"
+
+    async def _version(self, user_id) -> str | None:
+        """
+        version of the user's cached first page, read before the page itself is loaded
+        None = unknown (redis down) -> the page is read from the DB, not cached
+        """
+        redis = self.first_page_cache.redis
+        if redis is None:
+            return str(self._versions.get(str(user_id), 0))
+        try:
+            version = await redis.get(self._version_key(user_id))
+        except RedisError:
+            self.first_page_cache.counters["redis_error"] += 1
+            return None
+        return version.decode() if isinstance(version, bytes) else str(version or 0)
+
+    async def invalidate(self, user_ids):
+        """bump the first-page version of these users, call once their new transactions are committed"""
+        if self.first_page_cache is None:
+            return
+        redis = self.first_page_cache.redis
+        if redis is None:
+            for user_id in set(user_ids):
+                self._versions[str(user_id)] = self._versions.get(str(user_id), 0) + 1
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for user_id in set(user_ids):
+                    pipe.incr(self._version_key(user_id))
+                    pipe.expire(self._version_key(user_id), self.VERSION_TTL)
+                await pipe.execute()
+        except RedisError:
+            self.first_page_cache.counters["redis_error"] += 1  # cached pages expire within ttl
+
+
+_history: TransactionHistory | None = None
+
+
+def get_history(redis=None) -> TransactionHistory:
+    """shared by the history endpoint and the wallet ledger, so ledger commits drop the cached pages"""
+    global _history
+    if _history is None:
+        # newest page per user, a new version when the user sends / receives a transaction
+        first_page_cache = MultiLevelCache(redis, prefix="txn:first:", ttl=30, stale_ttl=0)
+        _history = TransactionHistory(get_database(), first_page_cache)
+    return _history
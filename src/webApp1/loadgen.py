@@ -0,0 +1,218 @@
+"""
+Async load generator for the webApp1 endpoints (builds on controller/web_client.py).
+
+    # closed loop: 32 virtual users, each sends its next request when the last one returns
+    python -m src.webApp1.loadgen --scenario cache-get --concurrency 32 --duration 10
+    # open loop: 500 req/s constant arrival rate, whatever the latency (no coordinated omission)
+    python -m src.webApp1.loadgen --scenario all --rate 500 --duration 10 --out results.json
+
+Latency percentiles come from a log-bucketed (HDR-style) histogram, ~3% relative error.
+In open-loop mode latency is measured from the scheduled send time, so queueing inside the
+generator (max in flight reached) shows up in the numbers instead of being hidden.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import aiohttp
+
+from src.webApp1.controller.web_client import upload_form
+
+
+class LatencyHistogram:
+    """log buckets, 32 per octave from 10us; O(1) record, percentile by one walk"""
+
+    BASE = 1e-5
+    PER_OCTAVE = 32
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        i = 0 if seconds <= self.BASE else math.ceil(self.PER_OCTAVE * math.log2(seconds / self.BASE))
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.total += 1
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = math.ceil(self.total * p / 100)
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                return min(self.max, self.BASE * 2 ** (i / self.PER_OCTAVE))
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.total,
+            "min_ms": round(self.min * 1000, 3) if self.total else 0.0,
+            **{f"p{p}_ms".replace(".", "_"): round(self.percentile(p) * 1000, 3) for p in (50, 90, 99, 99.9)},
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+# ---- scenarios: name -> fn(session, base_url, args) returning a request context manager ----
+
+def _cache_get(session, base, args):
+    return session.get(f"{base}/data-from-redis-cache/{random.randint(1, args.keyspace)}")
+
+
+def _items_post(session, base, args):
+    headers = {"h1": "load", "Authorization": f"Bearer {args.token}"}
+    return session.post(f"{base}/items/{random.randint(1, args.keyspace)}", params={"q1": "load", "q2": "1"},
+                        headers=headers, json={"name": "load"})
+
+
+def _upload(session, base, args):
+    return session.post(f"{base}/upload", data=upload_form(args.payload))
+
+
+def _upload_stream(session, base, args):
+    return session.put(f"{base}/upload/stream/load.bin", data=args.payload,
+                       headers={"Content-Type": "application/octet-stream"})
+
+
+SCENARIOS = {
+    "cache-get": _cache_get,
+    "items-post": _items_post,
+    "custom-response": lambda s, b, a: s.get(f"{b}/custom-response"),
+    "okta-request-token": lambda s, b, a: s.post(f"{b}/okta/request-token"),
+    "introspection-cache": lambda s, b, a: s.get(f"{b}/okta/introspection-cache"),
+    "rate-limited": lambda s, b, a: s.get(f"{b}/rate-limited-api"),
+    "rate-limited-gcra": lambda s, b, a: s.get(f"{b}/rate-limited-api/gcra"),
+    "download": lambda s, b, a: s.get(f"{b}/download"),
+    "download-range": lambda s, b, a: s.get(f"{b}/download", headers={"Range": "bytes=0-1023"}),
+    "upload": _upload,
+    "upload-stream": _upload_stream,
+    "cache-stats": lambda s, b, a: s.get(f"{b}/cache/stats"),
+    "metrics": lambda s, b, a: s.get(f"{b}/metrics"),
+}
+
+
+class Result:
+    def __init__(self, scenario: str):
+        self.scenario = scenario
+        self.latency = LatencyHistogram()
+        self.statuses = {}
+        self.errors = {}
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "scenario": self.scenario,
+            "elapsed_s": round(self.elapsed, 3),
+            "rps": round(self.latency.total / self.elapsed, 1) if self.elapsed else 0.0,
+            "latency": self.latency.summary(),
+            "statuses": self.statuses,
+            "errors": self.errors,
+            "bytes_received": self.bytes,
+        }
+
+
+async def _one(session, scenario, args, result: Result, scheduled: float):
+    try:
+        async with SCENARIOS[scenario](session, args.base_url, args) as resp:
+            body = await resp.read()
+            result.bytes += len(body)
+            result.statuses[resp.status] = result.statuses.get(resp.status, 0) + 1
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        result.errors[type(e).__name__] = result.errors.get(type(e).__name__, 0) + 1
+    result.latency.record(time.perf_counter() - scheduled)
+
+
+async def closed_loop(session, scenario, args) -> Result:
+    result = Result(scenario)
+    deadline = time.perf_counter() + args.duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await _one(session, scenario, args, result, time.perf_counter())
+
+    await asyncio.gather(*(user() for _ in range(args.concurrency)))
+    result.elapsed = time.perf_counter() - result.started
+    return result
+
+
+async def open_loop(session, scenario, args) -> Result:
+    result = Result(scenario)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+    tasks = set()
+
+    async def fire(scheduled):
+        async with semaphore:  # waiting here counts as latency, scheduled is the reference
+            await _one(session, scenario, args, result, scheduled)
+
+    for i in range(int(args.rate * args.duration)):
+        scheduled = start + i * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(fire(scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    result.elapsed = time.perf_counter() - result.started
+    return result
+
+
+async def run(args) -> list[dict]:
+    names = [n for n in SCENARIOS if n != "okta-request-token"] if args.scenario == ["all"] else args.scenario
+    connector = aiohttp.TCPConnector(limit=args.concurrency)  # shared by every scenario
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    results = []
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        for name in names:
+            result = await (open_loop if args.rate else closed_loop)(session, name, args)
+            summary = result.to_dict()
+            results.append(summary)
+            lat = summary["latency"]
+            print(f"{name:<22} {summary['rps']:>9} req/s  p50 {lat['p50_ms']:>8}ms  p99 {lat['p99_ms']:>8}ms  "
+                  f"statuses {summary['statuses']} errors {summary['errors']}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.webApp1.loadgen", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", nargs="+", default=["all"], choices=["all", *SCENARIOS])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="virtual users (closed loop) / max in flight (open loop) / connection limit")
+    parser.add_argument("--rate", type=float, help="req/s, switches to open-loop mode")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--keyspace", type=int, default=1000, help="distinct item ids")
+    parser.add_argument("--payload-size", type=int, default=64 * 1024, help="upload body bytes")
+    parser.add_argument("--token", default=os.getenv("LOADGEN_TOKEN", ""), help="bearer token for /items")
+    parser.add_argument("--out", help="write JSON results here")
+    args = parser.parse_args(argv)
+    args.base_url = args.base_url.rstrip("/")
+    args.payload = os.urandom(args.payload_size)
+
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"mode": "open" if args.rate else "closed", "rate": args.rate,
+                       "concurrency": args.concurrency, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
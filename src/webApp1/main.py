@@ -1,7 +1,9 @@
 from fastapi import FastAPI, Query, Path, Header, Response, status
 from fastapi.responses import JSONResponse, StreamingResponse
+from src.webApp1.service.fast_json import FastJSONResponse, FastJSONRoute
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
+app.router.route_class = FastJSONRoute
 
 @app.get("/items/{item_id}")
 async def read_item(
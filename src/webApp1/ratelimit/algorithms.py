@@ -0,0 +1,139 @@
+"""
+Redis rate-limiting algorithms, each one Lua script (atomic, 1 round trip) and O(1) memory per key.
+
+| algorithm      | state per key               | boundary burst                     |
+| -------------- | --------------------------- | ---------------------------------- |
+| fixed window   | 1 counter                   | up to 2x limit (fastapi_limiter)   |
+| sliding log    | 1 ZSET entry per request    | none, memory grows with traffic    |
+| sliding window | 2 counters (cur + prev)     | none (weighted estimate)           |
+| token bucket   | tokens + last refill ts     | `burst` tokens                     |
+| GCRA           | 1 timestamp (TAT)           | `burst` requests                   |
+
+Scripts read the clock with redis TIME, so workers with skewed clocks agree.
+Each returns {allowed 0|1, retry_after_ms}.
+"""
+from abc import ABC, abstractmethod
+
+_NOW_MS = """
+local t = redis.call('time')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+"""
+
+# ARGV: emission interval ms (period / limit), burst
+_GCRA = _NOW_MS + """
+local emission = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tat = tonumber(redis.call('get', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + emission
+local allow_at = new_tat - emission * burst
+if now < allow_at then
+    return {0, math.ceil(allow_at - now)}
+end
+redis.call('set', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, 0}
+"""
+
+# ARGV: window ms, limit
+_SLIDING_WINDOW = _NOW_MS + """
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local w = math.floor(now / window)
+local h = redis.call('hmget', KEYS[1], 'w', 'c', 'p')
+local cw, cur, prev = tonumber(h[1]), tonumber(h[2]) or 0, tonumber(h[3]) or 0
+if cw == w - 1 then
+    prev = cur
+    cur = 0
+elseif cw ~= w then
+    prev = 0
+    cur = 0
+end
+local elapsed = (now % window) / window
+if prev * (1 - elapsed) + cur + 1 > limit then
+    local retry = window - (now % window)
+    if prev > 0 and cur + 1 <= limit then
+        -- weight of prev needed for the estimate to fit, reached part way through this window
+        retry = math.ceil(((1 - (limit - cur - 1) / prev) - elapsed) * window)
+    end
+    return {0, math.max(retry, 1)}
+end
+redis.call('hset', KEYS[1], 'w', w, 'c', cur + 1, 'p', prev)
+redis.call('pexpire', KEYS[1], window * 2)
+return {1, 0}
+"""
+
+# ARGV: refill ms per token, capacity
+_TOKEN_BUCKET = _NOW_MS + """
+local refill = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local h = redis.call('hmget', KEYS[1], 't', 'ts')
+local tokens = tonumber(h[1]) or capacity
+local ts = tonumber(h[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) / refill)
+if tokens < 1 then
+    return {0, math.ceil((1 - tokens) * refill)}
+end
+redis.call('hset', KEYS[1], 't', tokens - 1, 'ts', now)
+redis.call('pexpire', KEYS[1], math.ceil(capacity * refill))
+return {1, 0}
+"""
+
+
+class Algorithm(ABC):
+    """subclasses set name / script and build the script's ARGV in args()"""
+    name = ""
+    script = ""
+
+    def __init__(self, times: int, seconds: int):
+        self.times = times
+        self.seconds = seconds
+        self._scripts = {}  # id(redis client) -> registered script (EVALSHA after the first call)
+
+    @abstractmethod
+    def args(self) -> list:
+        """ARGV of the script"""
+
+    async def hit(self, redis, key: str) -> tuple[bool, int]:
+        """-> (allowed, retry_after_ms)"""
+        script = self._scripts.get(id(redis))
+        if script is None:
+            script = self._scripts[id(redis)] = redis.register_script(self.script)
+        allowed, retry_after_ms = await script(keys=[key], args=self.args())
+        return bool(allowed), int(retry_after_ms)
+
+
+class GCRA(Algorithm):
+    """generic cell rate algorithm: evenly spaced requests, `burst` of them back to back"""
+    name = "gcra"
+    script = _GCRA
+
+    def __init__(self, times: int, seconds: int, burst: int | None = None):
+        super().__init__(times, seconds)
+        self.burst = burst or times
+
+    def args(self) -> list:
+        return [self.seconds * 1000 / self.times, self.burst]
+
+
+class SlidingWindowCounter(Algorithm):
+    """previous window's count weighted by overlap + current count"""
+    name = "sliding_window"
+    script = _SLIDING_WINDOW
+
+    def args(self) -> list:
+        return [self.seconds * 1000, self.times]
+
+
+class TokenBucket(Algorithm):
+    name = "token_bucket"
+    script = _TOKEN_BUCKET
+
+    def __init__(self, times: int, seconds: int, burst: int | None = None):
+        super().__init__(times, seconds)
+        self.burst = burst or times
+
+    def args(self) -> list:
+        return [self.seconds * 1000 / self.times, self.burst]
+
+
+ALGORITHMS = {cls.name: cls for cls in (GCRA, SlidingWindowCounter, TokenBucket)}
@@ -0,0 +1,35 @@
+import math
+
+from fastapi import HTTPException, Request
+from redis.exceptions import RedisError
+
+from src.webApp1.ratelimit.algorithms import ALGORITHMS, Algorithm
+from src.webApp1.ratelimit.keys import by_ip
+
+
+class RateLimit:
+    """
+    per-route limiter, algorithm picked per route:
+        @app.get("/x", dependencies=[Depends(RateLimit(GCRA(times=10, seconds=60), key_func=by_user))])
+    redis errors fail open, like HybridRateLimiter
+    """
+
+    def __init__(self, algorithm: Algorithm, key_func=by_ip, prefix: str = "rl:"):
+        self.algorithm = algorithm
+        self.key_func = key_func
+        self.prefix = f"{prefix}{algorithm.name}:"
+
+    async def __call__(self, request: Request):
+        key = self.prefix + self.key_func(request)
+        try:
+            allowed, retry_after_ms = await self.algorithm.hit(request.app.state.redis, key)
+        except RedisError:
+            return
+        if not allowed:
+            raise HTTPException(429, detail="Too Many Requests",
+                                headers={"Retry-After": str(math.ceil(retry_after_ms / 1000))})
+
+
+def rate_limit(algorithm: str, times: int, seconds: int, key_func=by_ip, **kwargs) -> RateLimit:
+    """rate_limit("gcra", 10, 60) -> RateLimit(GCRA(10, 60)), name from config / env friendly"""
+    return RateLimit(ALGORITHMS[algorithm](times, seconds, **kwargs), key_func=key_func)
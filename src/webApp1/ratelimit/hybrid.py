@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from fastapi import HTTPException, Request
+from redis.exceptions import RedisError
+
+from src.webApp1.cache.singleflight import SingleFlight
+from src.webApp1.ratelimit.keys import by_ip
+
+# grant up to ARGV[1] tokens from the window's quota ARGV[2], returns the number granted
+_LEASE_SCRIPT = """
+local used = tonumber(redis.call('get', KEYS[1]) or '0')
+local grant = math.min(tonumber(ARGV[1]), tonumber(ARGV[2]) - used)
+if grant <= 0 then return 0 end
+redis.call('incrby', KEYS[1], grant)
+redis.call('pexpire', KEYS[1], ARGV[3])
+return grant
+"""
+
+
+class HybridRateLimiter:
+    """
+    `times` requests per `seconds` window, decided locally, synced with Redis in leases.
+    - each worker takes a slice (`lease` tokens) of the window's global quota with one Lua call,
+      then admits requests from its in-process bucket with no Redis round trip
+    - tokens a worker has not used for `sync_interval` are returned (DECRBY) so other workers
+      can lease them
+    - Redis down -> fail open (counted), the limiter must not take the API down
+
+    drop-in for fastapi_limiter:
+        @app.get("/x", dependencies=[Depends(HybridRateLimiter(times=100, seconds=60, key_func=by_user))])
+    """
+
+    def __init__(self, times: int, seconds: int, key_func=by_ip, lease: int | None = None,
+                 prefix: str = "rl:hybrid:", sync_interval: float = 1.0):
+        self.times = times
+        self.seconds = seconds
+        self.key_func = key_func
+        self.lease = lease or max(1, times // 10)
+        self.prefix = prefix
+        self.sync_interval = sync_interval
+        self.buckets: dict[str, list] = {}  # key -> [window, tokens_left, last_used]
+        self.window = 0
+        self.flight = SingleFlight()
+        self.redis = None
+        self._sync_task = None
+        self.counters = {"local_allow": 0, "lease": 0, "deny": 0, "returned": 0, "fail_open": 0}
+
+    async def __call__(self, request: Request):
+        if self.redis is None:
+            self.redis = request.app.state.redis
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+        key = self.key_func(request)
+        if not await self.acquire(key):
+            retry_after = self.seconds - int(time.time()) % self.seconds
+            raise HTTPException(429, detail="Too Many Requests", headers={"Retry-After": str(retry_after)})
+
+    async def acquire(self, key: str) -> bool:
+        while True:
+            now = time.time()
+            window = int(now // self.seconds)
+            if window != self.window:
+                # leases belong to a window, the old window's leftovers are worthless
+                self.window = window
+                self.buckets.clear()
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [window, 0, now]
+            bucket[2] = now
+            if bucket[1] > 0:
+                bucket[1] -= 1
+                self.counters["local_allow"] += 1
+                return True
+            try:
+                # concurrent callers share one lease call, then compete for its tokens
+                granted = await self.flight.do(key, lambda: self._lease(key, window))
+            except RedisError:
+                self.counters["fail_open"] += 1
+                return True
+            if granted == 0:
+                self.counters["deny"] += 1
+                return False
+
+    async def _lease(self, key: str, window: int) -> int:
+        self.counters["lease"] += 1
+        granted = int(await self.redis.eval(
+            _LEASE_SCRIPT, 1, f"{self.prefix}{key}:{window}",
+            self.lease, self.times, self.seconds * 1000))
+        bucket = self.buckets.get(key)
+        if bucket is not None and bucket[0] == window:
+            bucket[1] += granted
+        return granted
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.release_idle(time.time() - self.sync_interval)
+            except RedisError as e:
+                print(f"rate limiter sync failed: {e!r}")
+
+    async def release_idle(self, idle_since: float = float("inf")):
+        """return unused leased tokens of keys idle since `idle_since` (inf = all, eg: on shutdown)"""
+        idle = [(k, b) for k, b in self.buckets.items() if b[1] > 0 and b[2] <= idle_since]
+        if not idle:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, bucket in idle:
+                pipe.decrby(f"{self.prefix}{key}:{bucket[0]}", bucket[1])
+                self.counters["returned"] += bucket[1]
+                bucket[1] = 0
+            await pipe.execute()
+
+    def stats(self) -> dict:
+        return {**self.counters, "keys": len(self.buckets), "lease_size": self.lease}
+
+    async def close(self):
+        """on shutdown: stop the sync task and hand every leased token back"""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+        if self.redis is not None:
+            await self.release_idle()
@@ -0,0 +1,36 @@
+import hashlib
+
+from fastapi import Request
+
+
+def by_ip(request: Request) -> str:
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return "ip:" + forwarded.split(",")[0].strip()
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def by_token(request: Request) -> str:
+    """bearer token hash; falls back to ip for anonymous calls"""
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return by_ip(request)
+    token = authorization.removeprefix("Bearer ").strip()
+    return "tok:" + hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+def by_user(request: Request) -> str:
+    """
+    `sub` claim of the bearer JWT, read WITHOUT verification:
+    only picks the bucket, the auth dependency still verifies the token
+    """
+    authorization = request.headers.get("authorization")
+    if authorization:
+        from jose import JWTError, jwt  # deferred, jose + cryptography are slow to import
+        try:
+            sub = jwt.get_unverified_claims(authorization.removeprefix("Bearer ").strip()).get("sub")
+            if sub:
+                return f"user:{sub}"
+        except JWTError:
+            pass
+    return by_token(request)
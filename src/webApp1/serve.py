@@ -0,0 +1,279 @@
+"""
+Pre-fork serving mode for webApp1.
+
+    python -m src.webApp1.serve --workers 4 --port 8000
+        N uvicorn workers, each with its own SO_REUSEPORT listener on the same port
+        (the kernel spreads connections), supervised and respawned when they die
+    kill -HUP <supervisor pid>     rolling restart: a new worker warms up and reports ready
+                                   before the one it replaces gets SIGTERM (graceful drain),
+                                   new code is only picked up with --no-preload
+    kill -TERM <supervisor pid>    graceful stop of every worker
+
+- the app is imported once in the supervisor (--preload) and shared copy-on-write by the workers
+- warm-up: every worker runs its lifespan, then GETs --warmup-path in process (openapi schema,
+  lazy routes, first JSON encode) before it reports ready; a rolling restart retires the old
+  worker only then
+- service/shared_state.py segment (counters + small hot cache) is created here, workers attach
+  to it via WEBAPP1_SHM; GET /workers on web2 shows it
+- without SO_REUSEPORT (eg: Windows) one socket is bound here and inherited instead
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+from src.webApp1.service.shared_state import SharedState, ENV_NAME, ENV_WORKER
+
+DEFAULT_APP = "src.webApp1.controller.web2:app"
+DEFAULT_WARMUP = ["/openapi.json"]
+
+
+def bind_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock  # not listening yet, uvicorn calls listen() once startup is done
+
+
+async def warm_up(app, paths: list[str]):
+    """in-process requests through the ASGI app, nothing reaches the network"""
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+        for path in paths:
+            started = time.perf_counter()
+            try:
+                resp = await client.get(path)
+                print(f"[worker {os.getpid()}] warm-up {path} -> {resp.status_code} "
+                      f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+            except Exception as e:
+                print(f"[worker {os.getpid()}] warm-up {path} failed: {e!r}")
+
+
+class CountingApp:
+    """counts requests per worker into the shared segment"""
+
+    def __init__(self, app, state: SharedState):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            self.state.inc("requests")
+        await self.app(scope, receive, send)
+
+
+def run_worker(app_ref: str, sock: socket.socket, row: int, shm_name: str, warmup_paths: list[str],
+               log_level: str):
+    import uvicorn
+    from uvicorn.importer import import_from_string
+
+    os.environ[ENV_WORKER] = str(row)
+    state = SharedState.attach(shm_name)
+
+    class WarmServer(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)  # lifespan first (redis, http client, ...), then listen
+            if self.should_exit:
+                return
+            await warm_up(self.config.loaded_app, warmup_paths)
+            state.mark(row, os.getpid(), ready=True)
+
+    app = CountingApp(import_from_string(app_ref), state)
+    config = uvicorn.Config(app, lifespan="on", log_level=log_level, timeout_graceful_shutdown=30)
+    try:
+        WarmServer(config).run(sockets=[sock])
+    finally:
+        state.mark(row, 0, ready=False)
+
+
+class Supervisor:
+    def __init__(self, app: str, host: str, port: int, workers: int, preload: bool = True,
+                 warmup_paths: list[str] | None = None, graceful_timeout: float = 30.0,
+                 ready_timeout: float = 60.0, log_level: str = "info",
+                 cache_slots: int = 1024, cache_slot_size: int = 1024):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.preload = preload
+        self.warmup_paths = DEFAULT_WARMUP if warmup_paths is None else warmup_paths
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.log_level = log_level
+        self.reuse_port = hasattr(socket, "SO_REUSEPORT")
+        # 2 rows per worker slot: a replacement comes up next to the worker it replaces
+        self.state = SharedState.create(rows=workers * 2, slots=cache_slots, slot_size=cache_slot_size)
+        os.environ[ENV_NAME] = self.state.shm.name  # before --preload imports the app
+        self.shared_sock = None if self.reuse_port else bind_socket(host, port, reuse_port=False)
+        self.children = {}  # pid -> row
+        self.retiring = set()  # pids stopped on purpose, not respawned
+        self.crashed = []  # pids that exited on their own, respawned by the main loop
+        self.stopping = False
+        self.reload_requested = False
+
+    # ---- children ----
+
+    def spawn(self, row: int) -> int:
+        sock = self.shared_sock or bind_socket(self.host, self.port, reuse_port=True)
+        self.state.mark(row, 0, ready=False)
+        pid = os.fork()
+        if pid == 0:
+            for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(sig, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.app, sock, row, self.state.shm.name, self.warmup_paths, self.log_level)
+            except BaseException as e:
+                print(f"[worker {os.getpid()}] crashed: {e!r}")
+                code = 1
+            finally:
+                os._exit(code)
+        if sock is not self.shared_sock:
+            sock.close()  # the child has its own copy
+        self.children[pid] = row
+        print(f"[supervisor] worker {pid} started (row {row})")
+        return pid
+
+    def free_row(self) -> int:
+        used = set(self.children.values())
+        return next(r for r in range(self.state.rows) if r not in used)
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            row = self.children.pop(pid, None)
+            if row is None:
+                continue
+            self.state.mark(row, 0, ready=False)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            else:
+                self.crashed.append(pid)
+            print(f"[supervisor] worker {pid} exited ({os.waitstatus_to_exitcode(status)})")
+
+    def wait_ready(self, pid: int) -> bool:
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline:
+            self.reap()
+            if pid not in self.children:
+                if pid in self.crashed:
+                    self.crashed.remove(pid)  # the caller decides, no respawn
+                return False  # died during startup
+            if self.state.row(self.children[pid])["ready"]:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def stop_worker(self, pid: int, sig=signal.SIGTERM):
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def wait_exit(self, pids, timeout: float):
+        deadline = time.monotonic() + timeout
+        while any(pid in self.children for pid in pids) and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in pids:
+            if pid in self.children:
+                self.stop_worker(pid, signal.SIGKILL)  # did not drain in time
+        while any(pid in self.children for pid in pids):
+            self.reap()
+            time.sleep(0.05)
+
+    def rolling_restart(self):
+        """one worker at a time: start replacement, wait until it is ready, drain the old one"""
+        print("[supervisor] rolling restart")
+        for old in list(self.children):
+            new = self.spawn(self.free_row())
+            if not self.wait_ready(new):
+                print(f"[supervisor] replacement {new} not ready, keeping {old}")
+                self.stop_worker(new)
+                self.wait_exit([new], self.graceful_timeout)
+                return
+            self.stop_worker(old)
+            self.wait_exit([old], self.graceful_timeout)
+
+    # ---- main loop ----
+
+    def run(self):
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "reload_requested", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "stopping", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "stopping", True))
+        try:
+            if self.preload:
+                from uvicorn.importer import import_from_string
+                started = time.perf_counter()
+                import_from_string(self.app)  # children inherit the imported modules
+                print(f"[supervisor] preloaded {self.app} in {time.perf_counter() - started:.2f}s")
+            print(f"[supervisor] pid {os.getpid()} serving {self.app} on {self.host}:{self.port} "
+                  f"with {self.workers} workers ({'SO_REUSEPORT' if self.reuse_port else 'shared socket'})")
+            for _ in range(self.workers):
+                self.spawn(self.free_row())
+            while not self.stopping:
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.rolling_restart()
+                self.reap()
+                while self.crashed and not self.stopping:
+                    print(f"[supervisor] respawning after {self.crashed.pop()}")
+                    time.sleep(0.5)  # crash loop guard
+                    self.spawn(self.free_row())
+                time.sleep(0.2)
+        finally:
+            print("[supervisor] stopping")
+            pids = list(self.children)
+            for pid in pids:
+                self.stop_worker(pid)
+            self.wait_exit(pids, self.graceful_timeout)
+            if self.shared_sock is not None:
+                self.shared_sock.close()
+            self.state.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.webApp1.serve", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=DEFAULT_APP, help="module:attr of the ASGI app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-preload", action="store_true", help="import the app in each worker instead")
+    parser.add_argument("--warmup-path", action="append", dest="warmup_paths",
+                        help=f"GET before accepting traffic, repeatable (default {DEFAULT_WARMUP})")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0)
+    parser.add_argument("--cache-slots", type=int, default=1024, help="shared hot cache entries")
+    parser.add_argument("--cache-slot-size", type=int, default=1024, help="bytes per shared cache entry")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        raise SystemExit("pre-fork mode needs os.fork, use `uvicorn --workers` on this platform")
+    Supervisor(
+        args.app, args.host, args.port, args.workers,
+        preload=not args.no_preload,
+        warmup_paths=args.warmup_paths,
+        graceful_timeout=args.graceful_timeout,
+        log_level=args.log_level,
+        cache_slots=args.cache_slots,
+        cache_slot_size=args.cache_slot_size,
+    ).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,434 @@
+"""
+Write-behind audit log (replaces buffer_audit_log in systemDesign/paypal/docs/design/cache.md, one Redis
+LPUSH + EXPIRE + LLEN per event, and log_audit_event in database.md, one synchronous DynamoDB put per event).
+
+- request path: log_nowait(event) appends to a bounded in-process buffer, no I/O, no await
+- a background flusher writes batches to the sink when batch_size events are waiting or every flush_interval
+- slow / failing sink: the batch is retried with backoff and the buffer fills up; `await log()` then waits
+  for room (backpressure, up to block_timeout), log_nowait() never blocks: overflow goes to the spill file
+- shutdown: last flush within close_timeout, whatever is left is spilled to spill_dir (written to .tmp,
+  fsync'd, renamed), replayed into the sink by the next start()
+- spill_dir may be shared by every worker (pre-fork): recover() only takes overflow files of dead
+  processes and shutdown files, and claims each one with an atomic rename before replaying it,
+  so a live worker's open file is never touched and no file is replayed twice
+
+Sinks (AUDIT_SINK): "sqlite:./audit.db" | "file:./audit.jsonl" | "dynamodb:http://localhost:8001" (DynamoDB Local)
+"""
+import asyncio
+import contextlib
+import functools
+import glob
+import json
+import os
+import sqlite3
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from src.webApp1.service.metrics import pid_alive, registry
+
+_replaying = set()  # spill files claimed by an AuditLog of this process, not finished yet
+
+
+class SqliteSink:
+    """audit_logs table in a local SQLite file, INSERT OR IGNORE on event_id so a retried batch is harmless"""
+
+    def __init__(self, path: str = "./audit.db"):
+        self.path = path
+        self._conn = None
+
+    def _write(self, events):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS audit_logs (event_id TEXT PRIMARY KEY, service TEXT, "
+                               "event_type TEXT, user_id TEXT, timestamp TEXT, data TEXT)")
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO audit_logs VALUES (?, ?, ?, ?, ?, ?)",
+                [(e["event_id"], e.get("service"), e.get("event_type"), e.get("user_id"), e["timestamp"],
+                  json.dumps(e, separators=(",", ":"), default=str)) for e in events],
+            )
+
+    async def write(self, events: list[dict]):
+        await asyncio.to_thread(self._write, events)
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class FileSink:
+    """JSON lines appended to one file, fsync per batch (not per event)"""
+
+    def __init__(self, path: str = "./audit.jsonl", fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+
+    def _write(self, events):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(e, separators=(",", ":"), default=str) + "\n" for e in events))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    async def write(self, events: list[dict]):
+        await asyncio.to_thread(self._write, events)
+
+    async def close(self):
+        pass
+
+
+class DynamoDBSink:
+    """
+    audit_logs table of database.md: partition_key = service#date, sort_key = timestamp#event_id.
+    endpoint_url -> DynamoDB Local (docker run -p 8001:8000 amazon/dynamodb-local), None -> AWS.
+    batch_writer sends BatchWriteItem calls of 25 and resends UnprocessedItems.
+    """
+
+    def __init__(self, endpoint_url: str | None = None, table: str = "audit_logs", region: str = "us-east-1"):
+        self.endpoint_url = endpoint_url
+        self.table_name = table
+        self.region = region
+        self._table = None
+
+    def _write(self, events):
+        if self._table is None:
+            import boto3  # deferred, only this sink needs it
+            kwargs = {"endpoint_url": self.endpoint_url, "region_name": self.region}
+            if self.endpoint_url:  # DynamoDB Local accepts any credentials
+                kwargs.update(aws_access_key_id="local", aws_secret_access_key="local")
+            self._table = boto3.resource("dynamodb", **kwargs).Table(self.table_name)
+        with self._table.batch_writer(overwrite_by_pkeys=["partition_key", "sort_key"]) as writer:
+            for e in events:
+                item = json.loads(json.dumps(e, default=str), parse_float=Decimal)  # dynamodb rejects floats
+                item["partition_key"] = f"{e.get('service', 'unknown')}#{e['timestamp'][:10]}"
+                item["sort_key"] = f"{e['timestamp']}#{e['event_id']}"
+                writer.put_item(Item=item)
+
+    async def write(self, events: list[dict]):
+        await asyncio.to_thread(self._write, events)
+
+    async def close(self):
+        pass
+
+
+def sink_from_url(url: str):
+    kind, _, target = url.partition(":")
+    if kind == "sqlite":
+        return SqliteSink(target or "./audit.db")
+    if kind == "file":
+        return FileSink(target or "./audit.jsonl")
+    if kind == "dynamodb":
+        return DynamoDBSink(target or None)
+    raise ValueError(f"unknown AUDIT_SINK {url!r}, expected sqlite:<path> | file:<path> | dynamodb:<endpoint>")
+
+
+class AuditLog:
+    """
+    sink: anything with `async write(events)` / `async close()`
+    capacity: events held in memory (buffered + the batch being written)
+    """
+
+    def __init__(self, sink, capacity: int = 10000, batch_size: int = 500, flush_interval: float = 1.0,
+                 block_timeout: float = 0.05, close_timeout: float = 5.0, spill_dir: str = "./audit-spill",
+                 max_backoff: float = 5.0, overflow_fsync: bool = False):
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.close_timeout = close_timeout
+        self.spill_dir = spill_dir
+        self.max_backoff = max_backoff
+        self.overflow_fsync = overflow_fsync  # flush always reaches the OS, fsync also survives a power cut
+        self.buffer = deque()
+        self._inflight = []  # batch handed to the sink, kept until it is written
+        self._writing = None  # sink write of _inflight, a task of its own so cancelling flush_once never abandons it
+        self._wake = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._overflow = None  # spill file opened on the first overflow
+        self._task = None
+        self.counters = {"logged": 0, "flushed": 0, "batches": 0, "sink_error": 0, "waited": 0,
+                         "overflow_spilled": 0, "spilled": 0, "recovered": 0}
+
+    @classmethod
+    def from_env(cls) -> "AuditLog | None":
+        url = os.getenv("AUDIT_SINK", "off")
+        if url == "off":
+            return None
+        return cls(sink_from_url(url),
+                   capacity=int(os.getenv("AUDIT_BUFFER_SIZE", "10000")),
+                   batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+                   flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0")),
+                   spill_dir=os.getenv("AUDIT_SPILL_DIR", "./audit-spill"),
+                   overflow_fsync=os.getenv("AUDIT_OVERFLOW_FSYNC", "false").lower() == "true")
+
+    # ---- request path ----
+
+    def _stamp(self, event: dict) -> dict:
+        event = dict(event)
+        event.setdefault("event_id", uuid.uuid4().hex)
+        event.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
+        return event
+
+    def _full(self) -> bool:
+        return len(self.buffer) + len(self._inflight) >= self.capacity
+
+    def log_nowait(self, event: dict) -> bool:
+        """-> False when the buffer was full and the event went to the spill file instead"""
+        event = self._stamp(event)
+        if self._full():
+            self._room.clear()
+            self._spill_overflow(event)
+            return False
+        self._append(event)
+        return True
+
+    async def log(self, event: dict) -> bool:
+        """like log_nowait, but waits up to block_timeout for the flusher to make room first"""
+        if self._full():
+            self.counters["waited"] += 1
+            self._room.clear()
+            try:
+                async with asyncio.timeout(self.block_timeout):
+                    while self._full():
+                        await self._room.wait()
+                        self._room.clear()
+            except TimeoutError:
+                pass
+        return self.log_nowait(event)
+
+    def _append(self, event):
+        self.buffer.append(event)
+        self.counters["logged"] += 1
+        registry.inc("audit_events_total", (("outcome", "buffered"),))
+        if len(self.buffer) >= self.batch_size:
+            self._wake.set()
+
+    # ---- flusher ----
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        await self.recover()
+        while True:
+            if len(self.buffer) < self.batch_size:
+                self._wake.clear()
+                try:
+                    async with asyncio.timeout(self.flush_interval):
+                        await self._wake.wait()
+                except TimeoutError:
+                    pass
+            await self.flush_once(retry=True)
+
+    async def flush_once(self, retry: bool = False) -> int:
+        """one batch to the sink; retry=True keeps retrying it with backoff until it is written"""
+        if not self._inflight:
+            while self.buffer and len(self._inflight) < self.batch_size:
+                self._inflight.append(self.buffer.popleft())
+        if not self._inflight:
+            return 0
+        backoff = 0.05
+        while True:
+            started = time.perf_counter()
+            try:
+                return await self._write_inflight()
+            except Exception as e:
+                self.counters["sink_error"] += 1
+                print(f"audit sink write of {len(self._inflight)} events failed: {e!r}")
+                if not retry:
+                    raise
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            finally:
+                registry.observe("audit_flush_seconds", (), time.perf_counter() - started)
+
+    async def _write_inflight(self) -> int:
+        """
+        - the write is shielded: a cancelled caller leaves it running, and its done callback settles the batch
+        - a write still running is awaited again, never started twice for the same batch
+        """
+        batch = self._inflight  # a write still running is always for the current _inflight
+        if self._writing is None:
+            self._writing = asyncio.ensure_future(self.sink.write(batch))
+            self._writing.add_done_callback(functools.partial(self._written, batch))
+        await asyncio.shield(self._writing)
+        return len(batch)
+
+    def _written(self, batch: list, writing: asyncio.Future):
+        self._writing = None
+        if writing.cancelled() or writing.exception() is not None:
+            return  # batch stays in _inflight for the retry (exception() also marks it retrieved)
+        if self._inflight is batch:
+            self._inflight = []
+        self.counters["flushed"] += len(batch)
+        self.counters["batches"] += 1
+        registry.inc("audit_events_total", (("outcome", "flushed"),), float(len(batch)))
+        self._room.set()
+
+    # ---- spill / recovery ----
+
+    def _spill_overflow(self, event):
+        if self._overflow is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._overflow = open(os.path.join(self.spill_dir, f"overflow-{os.getpid()}-{time.time_ns()}.jsonl"),
+                                  "a", encoding="utf-8")
+        self._overflow.write(json.dumps(event, separators=(",", ":"), default=str) + "\n")
+        self._overflow.flush()  # a crash loses at most the line being written, not the whole spill
+        if self.overflow_fsync:
+            os.fsync(self._overflow.fileno())
+        self.counters["overflow_spilled"] += 1
+        registry.inc("audit_events_total", (("outcome", "spilled"),))
+
+    def _close_overflow(self):
+        if self._overflow is not None:
+            self._overflow.flush()
+            os.fsync(self._overflow.fileno())
+            self._overflow.close()
+            self._overflow = None
+
+    def spill(self) -> str | None:
+        """everything still in memory -> spill_dir/shutdown-<pid>-<ns>.jsonl, atomically (tmp + fsync + rename)"""
+        events = self._inflight + list(self.buffer)
+        self._inflight = []
+        self.buffer.clear()
+        if not events:
+            return None
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"shutdown-{os.getpid()}-{time.time_ns()}.jsonl")
+        self._write_atomic(path, events)
+        self.counters["spilled"] += len(events)
+        registry.inc("audit_events_total", (("outcome", "spilled"),), float(len(events)))
+        return path
+
+    def _write_atomic(self, path, events):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(e, separators=(",", ":"), default=str) + "\n" for e in events))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        dir_fd = os.open(self.spill_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)  # the rename itself survives a crash
+        finally:
+            os.close(dir_fd)
+
+    def _claimable(self, path: str) -> bool:
+        """<kind>-<pid>-<ns>.jsonl, kind: overflow (appended while its process lives) | shutdown | replaying"""
+        if path in _replaying or (self._overflow is not None and path == self._overflow.name):
+            return False
+        kind, _, rest = os.path.basename(path).partition("-")
+        if kind == "shutdown":
+            return True  # complete, renamed into place by a process on its way out
+        pid = rest.partition("-")[0]
+        if not pid.isdigit():
+            return False
+        # own pid: left by an earlier process that had the same pid (restarted container)
+        return int(pid) == os.getpid() or not pid_alive(int(pid))
+
+    def _claim(self, path: str) -> str | None:
+        """atomic rename to a name owned by this process -> new path, None when another worker won"""
+        claimed = os.path.join(self.spill_dir, f"replaying-{os.getpid()}-{time.time_ns()}.jsonl")
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return None
+        _replaying.add(claimed)
+        return claimed
+
+    async def recover(self) -> int:
+        """
+        spill files of earlier runs -> sink, in batches, live events get the sink first between batches;
+        a failed replay puts what is left back as a shutdown file, so the next start does not resend the rest
+        """
+        recovered = 0
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, "*.jsonl"))):
+            if not self._claimable(path):
+                continue
+            path = self._claim(path)
+            if path is None:
+                continue
+            try:
+                replayed, finished = await self._replay(path)
+            finally:
+                _replaying.discard(path)
+            recovered += replayed
+            if not finished:
+                break  # sink is down, stop here and let run() retry live batches with backoff
+        self.counters["recovered"] += recovered
+        return recovered
+
+    async def _replay(self, path: str) -> tuple[int, bool]:
+        """one claimed file -> (events written, whole file written)"""
+        events = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass  # torn last line of an overflow file
+        done = 0
+        try:
+            while done < len(events):
+                if len(self.buffer) >= self.batch_size:
+                    await self.flush_once()
+                await self.sink.write(events[done:done + self.batch_size])
+                done += len(events[done:done + self.batch_size])
+        except Exception as e:
+            print(f"audit spill {path} replayed {done}/{len(events)}, rest kept for the next start: {e!r}")
+            self._write_atomic(os.path.join(self.spill_dir, f"shutdown-{os.getpid()}-{time.time_ns()}.jsonl"),
+                               events[done:])
+            os.remove(path)
+            return done, False
+        os.remove(path)
+        return len(events), True
+
+    # ---- lifecycle / stats ----
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task  # run() has stopped before close() touches the batch itself
+            self._task = None
+        try:
+            async with asyncio.timeout(self.close_timeout):
+                while self._inflight or self.buffer:
+                    await self.flush_once()
+        except Exception as e:
+            print(f"audit flush on shutdown stopped: {e!r}")
+        self.spill()
+        self._close_overflow()
+        await self.sink.close()
+
+    def stats(self) -> dict:
+        return {**self.counters, "buffered": len(self.buffer), "inflight": len(self._inflight),
+                "capacity": self.capacity}
+
+
+_audit_log: AuditLog | None = None
+_configured = False
+
+
+def get_audit_log() -> AuditLog | None:
+    """from AUDIT_* env on first use, None when AUDIT_SINK=off"""
+    global _audit_log, _configured
+    if not _configured:
+        _audit_log = AuditLog.from_env()
+        _configured = True
+    return _audit_log
+
+
+async def close_audit_log():
+    global _audit_log, _configured
+    if _audit_log is not None:
+        await _audit_log.close()
+    _audit_log = None
+    _configured = False
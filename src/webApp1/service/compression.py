@@ -0,0 +1,235 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.webApp1.cache.lru import TTLCache, MISSING
+
+
+class _Gzip:
+    name = "gzip"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # 31 -> gzip container
+        return c.compress(data) + c.flush()
+
+    def stream(self):
+        c = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return lambda chunk: c.compress(chunk) + c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+class _Brotli:
+    name = "br"
+
+    def __init__(self, brotli, quality: int = 4):
+        self.brotli = brotli
+        self.quality = quality
+
+    def compress(self, data: bytes) -> bytes:
+        return self.brotli.compress(data, quality=self.quality)
+
+    def stream(self):
+        c = self.brotli.Compressor(quality=self.quality)
+        return lambda chunk: c.process(chunk) + c.flush(), c.finish
+
+
+class _Zstd:
+    name = "zstd"
+
+    def __init__(self, zstandard, level: int = 3):
+        self.zstandard = zstandard
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return self.zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self):
+        c = self.zstandard.ZstdCompressor(level=self.level).compressobj()
+        flush_block = self.zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return lambda chunk: c.compress(chunk) + c.flush(flush_block), c.flush
+
+
+def available_codecs() -> dict:
+    """server preference order: zstd > br > gzip, optional packages only when installed"""
+    codecs = {}
+    try:
+        import zstandard
+        codecs["zstd"] = _Zstd(zstandard)
+    except ImportError:
+        pass
+    try:
+        import brotli
+        codecs["br"] = _Brotli(brotli)
+    except ImportError:
+        pass
+    codecs["gzip"] = _Gzip()
+    return codecs
+
+
+def negotiate(accept_encoding: str, codecs: dict) -> str | None:
+    """Accept-Encoding q-values first, server preference on ties; q=0 means refused"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for name in codecs:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+_SKIP_TYPES = ("image/", "video/", "audio/", "font/woff", "application/zip", "application/gzip",
+               "application/x-gzip", "application/zstd", "application/x-7z", "application/pdf")
+
+
+class CompressionMiddleware:
+    """
+    Negotiated gzip / br / zstd (ASGI middleware).
+    - bodies under `minimum_size`, already encoded, non-200 (206 ranges, 304) and
+      already-compressed media types go out untouched
+    - range-capable responses (Accept-Ranges / Content-Range, every FileResponse) too: byte offsets
+      and the strong ETag of a resumed download refer to the identity body, a gzip'd 200 followed
+      by an identity 206 would splice two different byte streams together
+    - streamed bodies (StreamingResponse) are compressed chunk by chunk with a sync flush,
+      nothing is buffered
+    - responses carrying an ETag are compressed once: (path, etag, encoding) -> body is kept in an LRU
+      and replayed, the app's own body is drained without compressing it again
+      (keyed by path too, mtime/size based etags can repeat across files)
+    - `http.response.pathsend` / `http.response.zerocopy` (FileResponse) pass through untouched
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, cache_size: int = 256,
+                 cache_max_entry: int = 1024 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_max_entry = cache_max_entry
+        self.codecs = available_codecs()
+        self.cache = TTLCache(maxsize=cache_size, ttl=24 * 3600)
+        self.counters = {"compressed": 0, "cache_hit": 0, "skipped": 0, "bytes_in": 0, "bytes_out": 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.codecs)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, _CompressingSend(self, encoding, send, scope["path"]))
+
+
+class _CompressingSend:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send, path: str):
+        self.mw = middleware
+        self.path = path
+        self.codec = middleware.codecs[encoding]
+        self.send = send
+        self.start = None
+        self.mode = None  # passthrough | drain | stream
+        self.compress_chunk = None
+        self.finish = None
+        self.cache_key = None
+        self.collected = []
+        self.collected_size = 0
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            if self.mode is None and self.start is not None:
+                # pathsend / zerocopy file bodies: the server writes the file, nothing to compress
+                self.mode = "passthrough"
+                self.mw.counters["skipped"] += 1
+                await self.send(self.start)
+            return await self.send(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.mode is None:
+            await self._decide(body, more_body)
+            return
+        if self.mode == "passthrough":
+            await self.send(message)
+        elif self.mode == "stream":
+            await self._stream(body, more_body)
+        # drain: cached body already sent, ignore the rest
+
+    async def _decide(self, body: bytes, more_body: bool):
+        headers = MutableHeaders(raw=self.start["headers"])
+        content_type = headers.get("content-type", "")
+        if (self.start["status"] != 200 or "content-encoding" in headers
+                or "accept-ranges" in headers or "content-range" in headers
+                or content_type.startswith(_SKIP_TYPES)
+                or (not more_body and len(body) < self.mw.minimum_size)):
+            self.mode = "passthrough"
+            self.mw.counters["skipped"] += 1
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        headers["content-encoding"] = self.codec.name
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag:
+            self.cache_key = (self.path, etag, self.codec.name)
+            cached = self.mw.cache.get(self.cache_key)
+            if cached is not MISSING:
+                self.mode = "drain"
+                self.mw.counters["cache_hit"] += 1
+                headers["content-length"] = str(len(cached))
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": cached, "more_body": False})
+                return
+
+        self.mw.counters["compressed"] += 1
+        if not more_body:
+            self.mode = "passthrough"
+            compressed = self.codec.compress(body)
+            self._count(body, compressed)
+            self._remember(compressed)
+            headers["content-length"] = str(len(compressed))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": False})
+            return
+
+        self.mode = "stream"
+        self.compress_chunk, self.finish = self.codec.stream()
+        if "content-length" in headers:
+            del headers["content-length"]
+        await self.send(self.start)
+        await self._stream(body, more_body)
+
+    async def _stream(self, body: bytes, more_body: bool):
+        out = self.compress_chunk(body) if body else b""
+        if not more_body:
+            out += self.finish()
+        self._count(body, out)
+        if self.cache_key is not None:
+            self.collected.append(out)
+            self.collected_size += len(out)
+            if self.collected_size > self.mw.cache_max_entry:
+                self.cache_key = None  # too big to keep, stop collecting
+                self.collected = []
+            elif not more_body:
+                self._remember(b"".join(self.collected))
+        await self.send({"type": "http.response.body", "body": out, "more_body": more_body})
+
+    def _remember(self, compressed: bytes):
+        if self.cache_key is not None and len(compressed) <= self.mw.cache_max_entry:
+            self.mw.cache.set(self.cache_key, compressed)
+
+    def _count(self, raw: bytes, out: bytes):
+        self.mw.counters["bytes_in"] += len(raw)
+        self.mw.counters["bytes_out"] += len(out)
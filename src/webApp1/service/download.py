@@ -0,0 +1,86 @@
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+from src.webApp1.cache.lru import TTLCache, MISSING
+
+# path -> (st_mtime_ns, st_size, etag); a changed mtime or size invalidates the entry
+_etags = TTLCache(maxsize=1024, ttl=24 * 3600)
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()[:32]
+
+
+async def strong_etag(path: str, stat: os.stat_result) -> str:
+    """content hash (not mtime based) -> identical across workers / hosts; hashed once per version"""
+    cached = _etags.get(path)
+    if cached is not MISSING and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    etag = f'"{await run_in_threadpool(_hash_file, path)}"'
+    _etags.set(path, (stat.st_mtime_ns, stat.st_size, etag))
+    return etag
+
+
+def _not_modified(request: Request, etag: str, stat: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # weak comparison (RFC 9110 13.1.2); If-Modified-Since is ignored when INM is sent
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """
+    FileResponse already answers Range / If-Range with single or multipart 206 bodies.
+    When the ASGI server offers the `http.response.zerocopy` extension, single ranges are
+    handed to it (sendfile) instead of being read into Python chunk by chunk.
+    note: overrides a private starlette hook, re-check on starlette upgrades
+    """
+
+    zerocopy = False
+
+    async def __call__(self, scope, receive, send):
+        self.zerocopy = "http.response.zerocopy" in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _handle_single_range(self, send, start, end, file_size, send_header_only):
+        if not self.zerocopy or send_header_only:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        with open(self.path, "rb") as file:
+            await send({
+                "type": "http.response.zerocopy",
+                "file": file, "offset": start, "count": end - start, "more_body": False,
+            })
+
+
+async def file_response(request: Request, path: str, filename: str, media_type: str) -> Response:
+    """
+    - 304 when If-None-Match / If-Modified-Since say the client copy is current
+    - 206 for Range requests (resumed / partial downloads), 200 otherwise
+    """
+    stat = await run_in_threadpool(os.stat, path)
+    etag = await strong_etag(path, stat)
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "cache-control": "no-cache",  # always revalidate, revalidation is cheap
+    }
+    if _not_modified(request, etag, stat):
+        return Response(status_code=304, headers=headers)
+    return ZeroCopyFileResponse(path=path, filename=filename, media_type=media_type, headers=headers, stat_result=stat)
@@ -0,0 +1,104 @@
+import functools
+import inspect
+import json
+import types
+import typing
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+# orjson (preferred) -> msgspec -> stdlib json
+try:
+    import orjson
+
+    def dumps(content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    try:
+        import msgspec
+
+        dumps = msgspec.json.Encoder().encode
+    except ImportError:
+        def dumps(content) -> bytes:
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by orjson / msgspec.
+    content those can't handle (eg: pydantic models) goes through jsonable_encoder first.
+    """
+
+    def render(self, content) -> bytes:
+        try:
+            return dumps(content)
+        except TypeError:
+            return dumps(jsonable_encoder(content))
+
+
+_JSON_NATIVE = (dict, list, str, int, float, bool, type(None))
+
+
+def _json_native(annotation) -> bool:
+    """
+    bare dict / list / str ... or containers of those only; list[Model], dict[str, Model],
+    Optional[Model] need FastAPI's response_model filtering -> not native
+    """
+    if annotation is typing.Any:
+        return True
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin is None:
+        return annotation in _JSON_NATIVE
+    if origin not in _JSON_NATIVE and origin not in (typing.Union, types.UnionType):
+        return False
+    return all(_json_native(arg) for arg in args)
+
+
+def _returns_json_native(endpoint) -> bool:
+    annotation = inspect.signature(endpoint).return_annotation
+    return annotation is inspect.Signature.empty or _json_native(annotation)
+
+
+def _takes_response(endpoint) -> bool:
+    """`response: Response` params set headers / cookies that only FastAPI's own path merges"""
+    return any(isinstance(p.annotation, type) and issubclass(p.annotation, Response)
+               for p in inspect.signature(endpoint).parameters.values())
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route class that decides at startup (once per route) how results are encoded.
+    JSON-native endpoints (no response_model, dict / list / unannotated return) get their
+    result wrapped in FastJSONResponse right away -> FastAPI skips response-model
+    validation and jsonable_encoder, the dict goes straight to orjson.
+
+        app.router.route_class = FastJSONRoute   # before the routes are declared
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        response_model = kwargs.get("response_model")
+        response_class = kwargs.get("response_class")
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if ((response_model is None or isinstance(response_model, DefaultPlaceholder))
+                and (response_class is None or issubclass(response_class, JSONResponse))
+                and _returns_json_native(endpoint) and not _takes_response(endpoint)):
+            endpoint = self._precompiled(endpoint, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _precompiled(endpoint, status_code: int):
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                result = await endpoint(*args, **kwargs)
+                return result if isinstance(result, Response) else FastJSONResponse(result, status_code)
+        else:
+            @functools.wraps(endpoint)  # stays sync -> FastAPI still runs it in the threadpool
+            def wrapper(*args, **kwargs):
+                result = endpoint(*args, **kwargs)
+                return result if isinstance(result, Response) else FastJSONResponse(result, status_code)
+        return wrapper
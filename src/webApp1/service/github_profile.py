@@ -0,0 +1,67 @@
+import json
+import time
+
+from redis.exceptions import RedisError
+
+
+class GitHubProfileCache:
+    """
+    GET /user results per GitHub user id, in Redis with a TTL.
+    - within `fresh_for` seconds the cached profile is used as is, no GitHub call
+    - after that it is revalidated with If-None-Match: <stored ETag>;
+      304 -> cached body reused (no body transfer, does not count against the GitHub rate limit)
+    - the user id must come from the session the token belongs to; unknown user -> plain GET
+      (a login has no trusted user id yet, it always resolves the identity with a plain GET)
+    - Redis errors degrade to a plain GET
+    """
+
+    def __init__(self, ttl: int = 24 * 3600, fresh_for: float = 300, prefix: str = "github:user:"):
+        self.ttl = ttl
+        self.fresh_for = fresh_for
+        self.prefix = prefix
+        self.counters = {"hit": 0, "not_modified": 0, "fetched": 0, "redis_error": 0}
+
+    async def get(self, redis, user_id) -> dict | None:
+        """-> {"etag", "profile", "checked_at"} or None"""
+        if redis is None or user_id is None:
+            return None
+        try:
+            raw = await redis.get(f"{self.prefix}{user_id}")
+        except RedisError:
+            self.counters["redis_error"] += 1
+            return None
+        return json.loads(raw) if raw else None
+
+    async def put(self, redis, profile: dict, etag: str | None):
+        if redis is None:
+            return
+        entry = {"etag": etag, "profile": profile, "checked_at": time.time()}
+        try:
+            await redis.set(f"{self.prefix}{profile['id']}", json.dumps(entry, separators=(",", ":")), ex=self.ttl)
+        except RedisError:
+            self.counters["redis_error"] += 1
+
+    async def fetch(self, github, token: dict, redis, user_id=None) -> tuple[dict, str]:
+        """
+        github: the authlib client registered for GitHub
+        -> (profile, source), source in cache | not_modified | fresh
+        """
+        entry = await self.get(redis, user_id)
+        if entry is not None and time.time() - entry["checked_at"] < self.fresh_for:
+            self.counters["hit"] += 1
+            return entry["profile"], "cache"
+
+        headers = {"If-None-Match": entry["etag"]} if entry and entry.get("etag") else {}
+        resp = await github.get("user", token=token, headers=headers)
+        if resp.status_code == 304 and entry is not None:
+            self.counters["not_modified"] += 1
+            await self.put(redis, entry["profile"], entry["etag"])  # restarts fresh_for and the TTL
+            return entry["profile"], "not_modified"
+        resp.raise_for_status()
+        profile = resp.json()
+        self.counters["fetched"] += 1
+        await self.put(redis, profile, resp.headers.get("ETag"))
+        return profile, "fresh"
+
+    def stats(self) -> dict:
+        return dict(self.counters)
@@ -0,0 +1,57 @@
+import os
+import time
+
+import httpx
+from fastapi import Request
+
+from src.webApp1.service.metrics import observe_outbound
+
+
+def _target(host: str) -> str:
+    for name in ("okta", "github"):
+        if name in host:
+            return name
+    return host
+
+
+async def _on_request(request: httpx.Request):
+    request.extensions["started"] = time.perf_counter()
+
+
+async def _on_response(response: httpx.Response):
+    started = response.request.extensions.get("started")
+    if started is not None:
+        outcome = "ok" if response.status_code < 500 else "error"
+        observe_outbound(_target(response.request.url.host), outcome, time.perf_counter() - started)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    One pooled AsyncClient per app, created in the lifespan hook.
+    - keep-alive connections are reused, so Okta / GitHub calls skip the TCP+TLS handshake
+    - HTTP/2 is used when the `h2` package is installed (httpx[http2])
+    - every call is timed into outbound_requests_duration_seconds (target=okta | github | host)
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("HTTP_TIMEOUT", "10")),
+        connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+        pool=float(os.getenv("HTTP_POOL_TIMEOUT", "5")),
+    )
+    http2 = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            http2 = False
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout,
+                             event_hooks={"request": [_on_request], "response": [_on_response]})
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Depends(get_http_client) -> the shared client from app.state"""
+    return request.app.state.http_client
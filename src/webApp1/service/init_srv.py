@@ -1,23 +1,162 @@
 import json
 import os
-import sys
+import threading
+from types import MappingProxyType
+
+_MISSING = object()
+
+
+class ConfigError(Exception):
+    pass
+
+
+class ConfigNotFoundError(ConfigError, FileNotFoundError):
+    pass
+
+
+def _freeze(obj):
+    """dict -> read-only MappingProxyType, list -> tuple (snapshots are shared by every thread)"""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+def _flatten(obj, prefix="", out=None):
+    """{"oauth": {"okta": {"ID": 1}}} -> {"oauth": ..., "oauth.okta": ..., "oauth.okta.ID": 1}"""
+    out = {} if out is None else out
+    for k, v in obj.items():
+        key = f"{prefix}{k}"
+        out[key] = v
+        if isinstance(v, MappingProxyType):
+            _flatten(v, key + ".", out)
+    return out
+
+
+class ConfigSnapshot:
+    """one parse of one file, immutable; lookups by dotted key are a single dict get"""
+
+    def __init__(self, path: str, data, version: tuple):
+        self.path = path
+        self.data = _freeze(data)
+        self.version = version  # (st_mtime_ns, st_size)
+        self._flat = _flatten(self.data) if isinstance(self.data, MappingProxyType) else {}
+
+    def get(self, key: str, default=_MISSING):
+        value = self._flat.get(key, default)
+        if value is _MISSING:
+            raise ConfigError(f"{key} not found in {self.path}")
+        return value
+
+
+class ConfigService:
+    """
+    Config files parsed once, served from memory.
+    - snapshot(path) parses on first use, then every lookup is in-memory (no file I/O)
+    - watch() polls mtime/size on a daemon thread and swaps in a new snapshot when a file
+      changes; the swap is one reference assignment, readers see the old or the new snapshot,
+      never a half-parsed one
+    - a file that fails to parse on reload keeps its previous snapshot
+    - on_reload: fn(snapshot) hooks for values derived from a snapshot (caches, clients), called
+      on the watcher thread after the swap
+    """
+
+    def __init__(self, poll_interval: float = 2.0):
+        self.poll_interval = poll_interval
+        self._snapshots: dict[str, ConfigSnapshot] = {}
+        self._lock = threading.Lock()  # serialises loads only, reads never take it
+        self._watcher = None
+        self.on_reload = []  # callbacks fn(snapshot)
+
+    def snapshot(self, path: str) -> ConfigSnapshot:
+        snap = self._snapshots.get(path)
+        if snap is None:
+            with self._lock:
+                snap = self._snapshots.get(path)
+                if snap is None:
+                    snap = self._snapshots[path] = self._load(path)
+        return snap
+
+    def get(self, path: str, key: str, type_: type = None, default=_MISSING):
+        """typed accessor: config.get(path, "oauth.okta.OKTA_CLIENT_ID", str)"""
+        value = self.snapshot(path).get(key, default)
+        if type_ is None or value is default or isinstance(value, type_):
+            return value
+        if type_ is bool and isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        try:
+            return type_(value)
+        except (TypeError, ValueError):
+            raise ConfigError(f"{key} in {path} is not {type_.__name__}: {value!r}")
+
+    def reload_changed(self) -> list[str]:
+        changed = []
+        for path, snap in list(self._snapshots.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue  # keep serving the last good snapshot
+            if (stat.st_mtime_ns, stat.st_size) == snap.version:
+                continue
+            try:
+                new = self._load(path)
+            except (ConfigError, ValueError) as e:
+                print(f"config reload failed for {path}, keeping previous: {e!r}")
+                continue
+            self._snapshots[path] = new
+            changed.append(path)
+            for callback in self.on_reload:
+                try:
+                    callback(new)
+                except Exception as e:  # one broken hook must not stop the others
+                    print(f"config reload hook {callback!r} failed for {path}: {e!r}")
+        return changed
+
+    def watch(self):
+        """start the mtime poller once per process (daemon thread)"""
+        if self._watcher is not None:
+            return
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(self.poll_interval):
+                try:
+                    self.reload_changed()
+                except Exception as e:  # the watcher outlives any one bad poll
+                    print(f"config watcher poll failed: {e!r}")
+
+        self._watcher = threading.Thread(target=run, name="config-watcher", daemon=True)
+        self._watcher.stop = stop
+        self._watcher.start()
+
+    def stop(self):
+        if self._watcher is not None:
+            self._watcher.stop.set()
+            self._watcher = None
+
+    @staticmethod
+    def _load(path: str) -> ConfigSnapshot:
+        try:
+            with open(path, 'r') as file:
+                stat = os.fstat(file.fileno())
+                return ConfigSnapshot(path, json.load(file), (stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            raise ConfigNotFoundError(f"config file {path} not found")
+
+
+config_service = ConfigService(poll_interval=float(os.getenv("CONFIG_POLL_INTERVAL", "2")))
+
+
+def env_config_path() -> str:
+    return f"env/{os.getenv('ETL_APP_ENV', 'dev1')}.json"
 
 
 def load_env_config():
-    app_env = os.getenv('ETL_APP_ENV', 'dev1')
-    try:
-        with open(f'env/{app_env}.json', 'r') as file:
-            return json.load(file) # to json to py object / dict
-    except FileNotFoundError:
-        print(f"Error: app env file for {app_env} not found.")
-        sys.exit(1)
+    """app env config (read-only mapping), parsed once per process"""
+    return config_service.snapshot(env_config_path()).data
 
 
 def load_etl_config(etl_name: str):
     # Load configuration for the given etl_name
-    try:
-        with open(f'config/{etl_name}-config.json', 'r') as file:
-            return json.load(file) # to json to py object / dict
-    except FileNotFoundError:
-        print(f"Error: Configuration file for {etl_name} not found.")
-        sys.exit(1)
\ No newline at end of file
+    return config_service.snapshot(f'config/{etl_name}-config.json').data
@@ -0,0 +1,80 @@
+import asyncio
+import math
+import time
+
+import httpx
+
+
+class JwksCache:
+    """
+    Signing keys of an issuer (GET {issuer}/v1/keys), held in memory by `kid`.
+    - fetched once on first use, then refreshed every `refresh_interval` by run_refresher()
+    - an unknown kid (key rotation) triggers one refresh, coalesced behind a lock
+      and rate limited by `min_refresh_gap` so garbage kids cannot hammer the IdP
+    - the periodic refresher task starts with the first fetch, not before, close() stops it
+    - jose is imported on first decode
+    """
+
+    def __init__(self, jwks_url: str, refresh_interval: float = 3600, min_refresh_gap: float = 30):
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_gap = min_refresh_gap
+        self.keys: dict[str, dict] = {}
+        self._last_fetch = -math.inf  # monotonic() can be < min_refresh_gap on a freshly booted host
+        self._lock = asyncio.Lock()
+        self._refresher = None
+
+    async def refresh(self, client: httpx.AsyncClient):
+        resp = await client.get(self.jwks_url, headers={"Accept": "application/json"})
+        resp.raise_for_status()
+        self.keys = {k["kid"]: k for k in resp.json().get("keys", []) if "kid" in k}
+        self._last_fetch = time.monotonic()
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self.run_refresher(client))
+
+    async def get_key(self, kid: str, client: httpx.AsyncClient) -> dict | None:
+        key = self.keys.get(kid)
+        if key is not None:
+            return key
+        async with self._lock:
+            key = self.keys.get(kid)  # another waiter may have refreshed already
+            if key is None and time.monotonic() - self._last_fetch >= self.min_refresh_gap:
+                await self.refresh(client)
+                key = self.keys.get(kid)
+        return key
+
+    async def run_refresher(self, client: httpx.AsyncClient):
+        """background task, started by the first refresh()"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with self._lock:
+                    await self.refresh(client)
+            except httpx.HTTPError as e:
+                print(f"jwks refresh failed for {self.jwks_url}: {e!r}")
+
+    async def close(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def decode(self, token: str, client: httpx.AsyncClient, issuer: str, audience: str) -> dict:
+        """
+        verify signature + exp/iss/aud locally, raises jose.JWTError
+        audience is required: without it a token the issuer minted for any other API would pass
+        """
+        from jose import JWTError, jwt
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = await self.get_key(kid, client) if kid else None
+        if key is None:
+            raise JWTError(f"unknown signing key: {kid}")
+        return jwt.decode(
+            token, key,
+            algorithms=[key.get("alg", "RS256")],
+            issuer=issuer,
+            audience=audience,
+        )
@@ -0,0 +1,67 @@
+import importlib
+
+from starlette.routing import Route
+
+
+class _LazyLoader:
+    """
+    ASGI placeholder standing in for a controller module's routes.
+    First request: import the module (its routes / router get registered on the app),
+    drop every placeholder of that module, re-dispatch the request to the real route.
+    """
+
+    def __init__(self, app, target: str):
+        self.app = app
+        self.target = target
+        self.loaded = False
+
+    def load(self):
+        if self.loaded:
+            return
+        module_name, _, attr = self.target.partition(":")
+        module = importlib.import_module(module_name)
+        if attr:
+            self.app.include_router(getattr(module, attr))
+        self.app.router.routes[:] = [
+            r for r in self.app.router.routes if getattr(r, "endpoint", None) is not self
+        ]
+        self.app.openapi_schema = None  # rebuilt with the new routes on next /openapi.json
+        self.loaded = True
+
+    async def __call__(self, scope, receive, send):
+        self.load()
+        await self.app.router(scope, receive, send)
+
+
+def _schema_includes_lazy_routes(app):
+    """
+    app.openapi wrapped once per app: generating the schema (/openapi.json, /docs) loads every
+    controller still behind a placeholder first, so their routes are documented like eager ones
+    """
+    generate = app.openapi
+
+    def openapi():
+        for loader in app.state.lazy_loaders:
+            loader.load()
+        return generate()
+
+    app.state.lazy_loaders = []
+    app.openapi = openapi
+
+
+def lazy_include(app, target: str, paths: list[str]):
+    """
+    register a controller without importing it
+    - target: "pkg.module" (module adds routes to `app` itself) or "pkg.module:router" (APIRouter)
+    - paths : the paths it serves, placeholders are matched until the first hit
+    - the OpenAPI schema imports it too, the placeholders themselves stay out of the schema
+
+    lazy_include(app, "src.webApp1.controller.github_oauth_cc:router", ["/github-token"])
+    """
+    if not hasattr(app.state, "lazy_loaders"):
+        _schema_includes_lazy_routes(app)
+    loader = _LazyLoader(app, target)
+    app.state.lazy_loaders.append(loader)
+    for path in paths:
+        app.router.routes.append(Route(path, endpoint=loader, include_in_schema=False))
+    return loader
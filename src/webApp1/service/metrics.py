@@ -0,0 +1,286 @@
+"""
+Hot-path metrics in Prometheus text format (GET /metrics).
+
+Every worker process owns one mmap'd file of float64 slots in METRICS_DIR (tmpfs /dev/shm when
+available) plus a small JSON index of which series lives at which slot. Recording is an index
+add into that array, no lock and no IPC; /metrics reads every worker's file and sums them
+(gauges only for live workers, MAX_GAUGES take the largest value instead), so any uvicorn worker
+can answer the scrape.
+
+Latency histograms are HDR-style log buckets: upper bounds BASE * 2^(i/2), 100us .. ~105s,
+so relative error stays below ~41% at every scale with 42 slots per series.
+Metric names follow TechnicalMetrics in systemDesign/paypal/docs/observability/metrics.md.
+"""
+import json
+import math
+import mmap
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+BASE = 0.0001  # 100us, first bucket upper bound
+BUCKETS_PER_OCTAVE = 2
+N_BUCKETS = 41  # + one +Inf bucket
+BOUNDS = [BASE * 2 ** (i / BUCKETS_PER_OCTAVE) for i in range(N_BUCKETS)]
+HISTOGRAM_SLOTS = N_BUCKETS + 3  # buckets, +Inf, sum, count
+
+METRICS = {
+    "api_requests_duration_seconds": ("histogram", "Request latency by route, method and status"),
+    "api_requests_in_flight": ("gauge", "Requests being served"),
+    "api_requests_size_bytes_total": ("counter", "Request body bytes received"),
+    "api_responses_size_bytes_total": ("counter", "Response body bytes sent"),
+    "outbound_requests_duration_seconds": ("histogram", "Outbound call latency (okta, github, redis)"),
+    "db_pool_connections_in_use": ("gauge", "Connections checked out of the pool, by engine"),
+    "db_pool_checkout_wait_seconds": ("histogram", "Time spent waiting for a pooled connection"),
+    "db_pool_timeouts_total": ("counter", "Checkouts that hit pool_timeout"),
+    "db_replica_lag_seconds": ("gauge", "Replication lag per read replica, -1 = unreachable"),
+    "ledger_transfers_total": ("counter", "Wallet transfers by outcome (ok, rejected, error)"),
+    "ledger_batches_total": ("counter", "Group commits, transfers_total / batches_total = average batch"),
+    "ledger_commit_seconds": ("histogram", "Time to lock, apply and commit one batch"),
+    "ledger_transfer_seconds": ("histogram", "Transfer latency, queued to committed"),
+    "audit_events_total": ("counter", "Audit events by outcome (buffered, flushed, spilled)"),
+    "audit_flush_seconds": ("histogram", "Audit sink write latency per batch"),
+}
+
+# gauges every worker measures on its own (same replica, same lag): the workers' max, not their sum
+MAX_GAUGES = {"db_replica_lag_seconds"}
+
+
+def _default_dir() -> str:
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(root, "webapp1-metrics")
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsRegistry:
+    def __init__(self, directory: str | None = None, capacity: int = 32768):
+        self.directory = directory or os.getenv("METRICS_DIR") or _default_dir()
+        self.capacity = capacity
+        self.pid = None
+        self.values = None
+        self.index: dict[tuple, int] = {}  # (name, labels) -> first slot
+        self.next_slot = 0
+        self.dropped = 0
+
+    # ---- per worker storage ----
+
+    def _open(self):
+        """lazily per process, so a forked worker never writes into its parent's file"""
+        self.pid = os.getpid()
+        os.makedirs(self.directory, exist_ok=True)
+        self._remove_dead()
+        path = os.path.join(self.directory, f"{self.pid}.db")
+        with open(path, "wb") as f:
+            f.truncate(self.capacity * 8)
+        with open(path, "r+b") as f:
+            self._mmap = mmap.mmap(f.fileno(), self.capacity * 8)
+        self.values = memoryview(self._mmap).cast("d")
+        self.index = {}
+        self.next_slot = 0
+
+    def _remove_dead(self):
+        """files of workers from previous runs (restart resets counters, Prometheus rate() copes)"""
+        for name in os.listdir(self.directory):
+            pid = name.split(".")[0]
+            if pid.isdigit() and not pid_alive(int(pid)):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def slot(self, name: str, labels: tuple, size: int = 1) -> int:
+        """first slot of a series, allocated on first use; -1 when out of capacity"""
+        if self.pid != os.getpid():
+            self._open()
+        key = (name, labels)
+        offset = self.index.get(key)
+        if offset is not None:
+            return offset
+        if self.next_slot + size > self.capacity:
+            self.dropped += 1
+            return -1
+        offset = self.index[key] = self.next_slot
+        self.next_slot += size
+        self._write_index()
+        return offset
+
+    def _write_index(self):
+        path = os.path.join(self.directory, f"{self.pid}.json")
+        rows = [[name, list(map(list, labels)), offset] for (name, labels), offset in self.index.items()]
+        with open(path + ".tmp", "w") as f:
+            json.dump(rows, f)
+        os.replace(path + ".tmp", path)
+
+    # ---- recording (hot path) ----
+
+    def inc(self, name: str, labels: tuple, amount: float = 1.0):
+        offset = self.slot(name, labels)
+        if offset >= 0:
+            self.values[offset] += amount
+
+    def set(self, name: str, labels: tuple, value: float):
+        """gauge set to a value (last write wins in this worker)"""
+        offset = self.slot(name, labels)
+        if offset >= 0:
+            self.values[offset] = value
+
+    def observe(self, name: str, labels: tuple, seconds: float):
+        offset = self.slot(name, labels, HISTOGRAM_SLOTS)
+        if offset < 0:
+            return
+        if seconds <= BASE:
+            bucket = 0
+        else:
+            bucket = min(N_BUCKETS, math.ceil(BUCKETS_PER_OCTAVE * math.log2(seconds / BASE)))
+        values = self.values
+        values[offset + bucket] += 1
+        values[offset + N_BUCKETS + 1] += seconds
+        values[offset + N_BUCKETS + 2] += 1
+
+    # ---- scrape ----
+
+    def collect(self) -> str:
+        merged = defaultdict(lambda: None)
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            if not name.endswith(".json"):
+                continue
+            pid = int(name.removesuffix(".json"))
+            alive = pid_alive(pid)
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    rows = json.load(f)
+                with open(os.path.join(self.directory, f"{pid}.db"), "rb") as f:
+                    data = memoryview(f.read()).cast("d")
+            except (FileNotFoundError, ValueError):
+                continue  # worker exiting / writing its index right now
+            for metric, labels, offset in rows:
+                kind = METRICS.get(metric, ("counter",))[0]
+                if kind == "gauge" and not alive:
+                    continue
+                size = HISTOGRAM_SLOTS if kind == "histogram" else 1
+                key = (metric, tuple(map(tuple, labels)))
+                chunk = data[offset:offset + size].tolist()
+                current = merged[key]
+                if current is None:
+                    merged[key] = chunk
+                elif metric in MAX_GAUGES:
+                    merged[key] = [max(a, b) for a, b in zip(current, chunk)]
+                else:
+                    merged[key] = [a + b for a, b in zip(current, chunk)]
+        return self._render(merged)
+
+    @staticmethod
+    def _render(merged: dict) -> str:
+        def fmt_labels(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in items)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+        lines = []
+        by_metric = defaultdict(list)
+        for (metric, labels), values in merged.items():
+            by_metric[metric].append((labels, values))
+        for metric in sorted(by_metric):
+            kind, help_text = METRICS.get(metric, ("counter", ""))
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for labels, values in sorted(by_metric[metric]):
+                if kind != "histogram":
+                    lines.append(f"{metric}{fmt_labels(labels)} {values[0]}")
+                    continue
+                cumulative = 0.0
+                for i, bound in enumerate(BOUNDS):
+                    cumulative += values[i]
+                    lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', f'{bound:.6g}')])} {cumulative}")
+                cumulative += values[N_BUCKETS]
+                lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', '+Inf')])} {cumulative}")
+                lines.append(f"{metric}_sum{fmt_labels(labels)} {values[N_BUCKETS + 1]}")
+                lines.append(f"{metric}_count{fmt_labels(labels)} {values[N_BUCKETS + 2]}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def observe_outbound(target: str, outcome: str, seconds: float):
+    registry.observe("outbound_requests_duration_seconds", (("target", target), ("outcome", outcome)), seconds)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: latency histogram per (route template, method, status), in-flight gauge,
+    request / response body byte counters. Route is the matched template (/items/{item_id}),
+    unmatched paths share one label so random URLs cannot blow up the series count.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+        received = 0
+        sent = 0
+
+        async def receive_wrapper():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        registry.inc("api_requests_in_flight", ())
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            registry.inc("api_requests_in_flight", (), -1.0)
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            registry.observe("api_requests_duration_seconds",
+                             (("route", route), ("method", scope["method"]), ("status", str(status))),
+                             time.perf_counter() - started)
+            if received:
+                registry.inc("api_requests_size_bytes_total", (("route", route),), received)
+            if sent:
+                registry.inc("api_responses_size_bytes_total", (("route", route),), sent)
+
+
+def instrument_redis(client):
+    """time every command of a redis.asyncio client as outbound target=redis"""
+    execute_command = client.execute_command
+
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await execute_command(*args, **kwargs)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            observe_outbound("redis", outcome, time.perf_counter() - started)
+
+    client.execute_command = timed
+    return client
@@ -0,0 +1,130 @@
+import json
+import secrets
+
+from redis.exceptions import RedisError
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+
+class Session(dict):
+    """request.session, remembers whether the handler changed it"""
+    modified = False
+    regenerated = False
+
+    def _touch(self):
+        self.modified = True
+
+    def regenerate(self):
+        """
+        issue a new session id with this response, the old one is deleted (call on login:
+        an id planted before authentication never carries the authenticated session)
+        """
+        self.regenerated = True
+        self._touch()
+
+    def __setitem__(self, key, value):
+        self._touch()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._touch()
+        super().__delitem__(key)
+
+    def clear(self):
+        self._touch()
+        super().clear()
+
+    def pop(self, *args):
+        self._touch()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._touch()
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._touch()
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._touch()
+        super().update(*args, **kwargs)
+
+
+class RedisSessionMiddleware:
+    """
+    Server-side sessions in the app's Redis (app.state.redis), drop-in for starlette's
+    SessionMiddleware (authlib keeps its OAuth state in request.session).
+    - the cookie only carries a random id, the data is compact JSON under `prefix` + id with a TTL
+    - Redis is only read when the request has a session cookie, only written when the session changed
+    - an emptied session is deleted and its cookie expired
+    - request.session.regenerate() moves the data to a fresh id (session fixation)
+    - Redis errors degrade to an empty, unsaved session
+
+    app.add_middleware(RedisSessionMiddleware, ttl=86400)
+    """
+
+    def __init__(self, app, cookie_name: str = "sid", ttl: int = 86400, prefix: str = "session:",
+                 same_site: str = "lax", https_only: bool = False):
+        self.app = app
+        self.cookie_name = cookie_name
+        self.ttl = ttl
+        self.prefix = prefix
+        self.flags = f"path=/; httponly; samesite={same_site}" + ("; secure" if https_only else "")
+        self.counters = {"loaded": 0, "saved": 0, "deleted": 0, "redis_error": 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        redis = getattr(scope["app"].state, "redis", None)
+        session_id = HTTPConnection(scope).cookies.get(self.cookie_name)
+        scope["session"] = session = Session(await self._load(redis, session_id))
+
+        async def send_wrapper(message):
+            nonlocal session_id
+            if message["type"] == "http.response.start" and session.modified and redis is not None:
+                headers = MutableHeaders(scope=message)
+                if session:
+                    if session.regenerated and session_id:
+                        await self._delete(redis, session_id)
+                        session_id = None
+                    session_id = session_id or secrets.token_urlsafe(24)
+                    if await self._save(redis, session_id, session):
+                        headers.append("Set-Cookie", f"{self.cookie_name}={session_id}; max-age={self.ttl}; {self.flags}")
+                elif session_id:
+                    await self._delete(redis, session_id)
+                    headers.append("Set-Cookie", f"{self.cookie_name}=null; max-age=0; {self.flags}")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _load(self, redis, session_id) -> dict:
+        if redis is None or not session_id:
+            return {}
+        try:
+            raw = await redis.get(self.prefix + session_id)
+        except RedisError:
+            self.counters["redis_error"] += 1
+            return {}
+        if raw is None:
+            return {}
+        self.counters["loaded"] += 1
+        return json.loads(raw)
+
+    async def _save(self, redis, session_id, session) -> bool:
+        try:
+            await redis.set(self.prefix + session_id, json.dumps(session, separators=(",", ":")), ex=self.ttl)
+        except RedisError:
+            self.counters["redis_error"] += 1
+            return False
+        self.counters["saved"] += 1
+        return True
+
+    async def _delete(self, redis, session_id):
+        try:
+            await redis.delete(self.prefix + session_id)
+        except RedisError:
+            self.counters["redis_error"] += 1
+            return
+        self.counters["deleted"] += 1
@@ -0,0 +1,182 @@
+"""
+State shared by every worker of `python -m src.webApp1.serve`, in one multiprocessing.shared_memory
+segment. Reads are plain memory reads (no IPC, no lock).
+
+    header  | magic, then JSON meta: counter names, worker rows, cache slots
+    rows    | one int64 row per worker: pid, ready, started_at, counters...
+              a worker only writes its own row, totals are summed at read time (no lost updates)
+    cache   | direct-mapped slots (stable key hash % slots), each a seqlock:
+              seq | key hash | expires_at | key len | value len | key + value bytes
+              readers retry/miss on an odd or changed seq; writers take a non-blocking byte-range
+              lock (fcntl) on the slot and simply skip the write when another worker holds it
+
+The segment is created by the supervisor, workers attach by name from WEBAPP1_SHM.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+from multiprocessing import shared_memory
+
+ENV_NAME = "WEBAPP1_SHM"
+ENV_WORKER = "WEB_WORKER_ID"
+MAGIC = b"WAPP1SHM"
+HEADER_SIZE = 4096
+ROW_RESERVED = ("pid", "ready", "started_at")
+SLOT_HEADER = struct.Struct("<QQdII")  # seq, key hash, expires_at, key len, value len
+COUNTERS = ("requests",)
+
+
+def key_hash(key: str) -> int:
+    """stable across processes, unlike hash()"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+class SharedState:
+    def __init__(self, shm: shared_memory.SharedMemory, meta: dict, owner: bool = False):
+        self.shm = shm
+        self.owner = owner
+        self.counters = tuple(meta["counters"])
+        self.rows = meta["rows"]
+        self.slots = meta["slots"]
+        self.slot_size = meta["slot_size"]
+        self.row_width = len(ROW_RESERVED) + len(self.counters)
+        self._counter_index = {name: len(ROW_RESERVED) + i for i, name in enumerate(self.counters)}
+        rows_bytes = self.rows * self.row_width * 8
+        self._ints = shm.buf[HEADER_SIZE:HEADER_SIZE + rows_bytes].cast("q")
+        self._cache_offset = HEADER_SIZE + rows_bytes
+        self._lock_fd = os.open(os.path.join(tempfile.gettempdir(), f"{shm.name}.lock"),
+                                os.O_RDWR | os.O_CREAT, 0o600)
+        self._worker = self._worker_pid = None
+        self.write_skipped = 0
+
+    @classmethod
+    def create(cls, rows: int, slots: int = 1024, slot_size: int = 1024,
+               counters: tuple = COUNTERS, name: str | None = None) -> "SharedState":
+        meta = {"counters": list(counters), "rows": rows, "slots": slots, "slot_size": slot_size}
+        size = HEADER_SIZE + rows * (len(ROW_RESERVED) + len(counters)) * 8 + slots * slot_size
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        encoded = json.dumps(meta).encode()
+        shm.buf[:len(MAGIC)] = MAGIC
+        shm.buf[len(MAGIC):len(MAGIC) + 4] = struct.pack("<I", len(encoded))
+        shm.buf[len(MAGIC) + 4:len(MAGIC) + 4 + len(encoded)] = encoded
+        return cls(shm, meta, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedState":
+        shm = shared_memory.SharedMemory(name=name, track=False)  # the supervisor owns cleanup
+        if bytes(shm.buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{name} is not a webApp1 shared state segment")
+        (length,) = struct.unpack("<I", shm.buf[len(MAGIC):len(MAGIC) + 4])
+        meta = json.loads(bytes(shm.buf[len(MAGIC) + 4:len(MAGIC) + 4 + length]))
+        return cls(shm, meta)
+
+    @classmethod
+    def from_env(cls) -> "SharedState | None":
+        """None when not running under the pre-fork supervisor"""
+        name = os.getenv(ENV_NAME)
+        return cls.attach(name) if name else None
+
+    @property
+    def worker(self) -> int:
+        """row of this process, re-read after fork (the supervisor may import the app first)"""
+        if self._worker_pid != os.getpid():
+            self._worker_pid = os.getpid()
+            self._worker = int(os.getenv(ENV_WORKER, "0"))
+        return self._worker
+
+    # ---- counters (own row, lock free) ----
+
+    def inc(self, name: str, amount: int = 1):
+        self._ints[self.worker * self.row_width + self._counter_index[name]] += amount
+
+    def total(self, name: str) -> int:
+        column = self._counter_index[name]
+        return sum(self._ints[row * self.row_width + column] for row in range(self.rows))
+
+    def mark(self, row: int, pid: int, ready: bool):
+        base = row * self.row_width
+        self._ints[base] = pid
+        self._ints[base + 1] = int(ready)
+        self._ints[base + 2] = int(time.time())
+
+    def row(self, row: int) -> dict:
+        base = row * self.row_width
+        values = self._ints[base:base + self.row_width].tolist()
+        return dict(zip(ROW_RESERVED + self.counters, values))
+
+    # ---- hot cache (seqlock slots) ----
+
+    def get(self, key: str) -> bytes | None:
+        h = key_hash(key)
+        offset = self._slot_offset(h)
+        buf = self.shm.buf
+        for _ in range(3):
+            seq, slot_hash, expires_at, klen, vlen = SLOT_HEADER.unpack_from(buf, offset)
+            if seq & 1:
+                continue  # a writer is in the middle of it
+            if slot_hash != h or expires_at <= time.time():
+                return None
+            start = offset + SLOT_HEADER.size
+            stored_key = bytes(buf[start:start + klen])
+            value = bytes(buf[start + klen:start + klen + vlen])
+            if SLOT_HEADER.unpack_from(buf, offset)[0] != seq:
+                continue  # overwritten while copying
+            return value if stored_key == key.encode() else None
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float, block: bool = False) -> bool:
+        """False when the entry does not fit a slot or (block=False) another worker is writing the slot"""
+        encoded = key.encode()
+        if SLOT_HEADER.size + len(encoded) + len(value) > self.slot_size:
+            return False
+        h = key_hash(key)
+        offset = self._slot_offset(h)
+        index = (offset - self._cache_offset) // self.slot_size
+        try:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX if block else fcntl.LOCK_EX | fcntl.LOCK_NB, 1, index)
+        except OSError:
+            self.write_skipped += 1
+            return False
+        try:
+            buf = self.shm.buf
+            seq = SLOT_HEADER.unpack_from(buf, offset)[0]
+            struct.pack_into("<Q", buf, offset, seq + 1)  # odd: readers back off
+            start = offset + SLOT_HEADER.size
+            buf[start:start + len(encoded)] = encoded
+            buf[start + len(encoded):start + len(encoded) + len(value)] = value
+            SLOT_HEADER.pack_into(buf, offset, seq + 2, h, time.time() + ttl, len(encoded), len(value))
+        finally:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, index)
+        return True
+
+    def delete(self, key: str):
+        if self.get(key) is not None:
+            self.set(key, b"", 0, block=True)  # must not be skipped, a write is short
+
+    def _slot_offset(self, h: int) -> int:
+        return self._cache_offset + (h % self.slots) * self.slot_size
+
+    # ---- lifecycle ----
+
+    def stats(self) -> dict:
+        workers = [self.row(r) for r in range(self.rows)]
+        return {
+            "segment": self.shm.name,
+            "workers": [{"row": i, **w} for i, w in enumerate(workers) if w["pid"]],
+            "totals": {name: self.total(name) for name in self.counters},
+        }
+
+    def close(self):
+        self._ints.release()
+        os.close(self._lock_fd)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            try:
+                os.remove(os.path.join(tempfile.gettempdir(), f"{self.shm.name}.lock"))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import heapq
+import json
+import time
+
+from redis.exceptions import RedisError
+
+from src.webApp1.cache.lru import TTLCache, MISSING
+
+
+class TokenIntrospectionCache:
+    """
+    Caches Okta introspection results so the IdP is not called on every request.
+    - key   : sha256 of the raw token (the token itself is never stored)
+    - L1    : in-process LRU (TTLCache)
+    - L2    : optional Redis (app.state.redis), shared by all workers
+    - TTL   : bounded by the token's `exp` claim and by max_ttl
+    - inactive tokens are cached too (negative_ttl), so a replayed bad token is cheap to reject
+    """
+
+    def __init__(self, maxsize: int = 10_000, max_ttl: int = 300, negative_ttl: int = 30,
+                 redis_prefix: str = "okta:introspect:"):
+        self.local = TTLCache(maxsize=maxsize, ttl=max_ttl)
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.redis_prefix = redis_prefix
+        self.counters = {"local_hit": 0, "redis_hit": 0, "miss": 0, "negative_stored": 0, "redis_error": 0}
+
+    @staticmethod
+    def token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def ttl_for(self, result: dict) -> int:
+        if not result.get("active"):
+            return self.negative_ttl
+        exp = result.get("exp")
+        if exp is None:
+            return self.max_ttl
+        return max(0, min(self.max_ttl, int(exp - time.time())))
+
+    async def get(self, token: str, redis=None):
+        key = self.token_key(token)
+        result = self.local.get(key)
+        if result is not MISSING:
+            self.counters["local_hit"] += 1
+            return result
+
+        if redis is not None:
+            try:
+                cached = await redis.get(self.redis_prefix + key)
+            except RedisError:
+                self.counters["redis_error"] += 1
+                cached = None
+            if cached:
+                result = json.loads(cached)
+                ttl = self.ttl_for(result)
+                if ttl > 0:
+                    self.counters["redis_hit"] += 1
+                    self.local.set(key, result, ttl)
+                    return result
+
+        self.counters["miss"] += 1
+        return None
+
+    async def set(self, token: str, result: dict, redis=None):
+        ttl = self.ttl_for(result)
+        if ttl <= 0:
+            return
+        if not result.get("active"):
+            self.counters["negative_stored"] += 1
+        key = self.token_key(token)
+        self.local.set(key, result, ttl)
+        if redis is not None:
+            try:
+                await redis.set(self.redis_prefix + key, json.dumps(result), ex=ttl)
+            except RedisError:
+                self.counters["redis_error"] += 1
+
+    def stats(self) -> dict:
+        hits = self.counters["local_hit"] + self.counters["redis_hit"]
+        total = hits + self.counters["miss"]
+        return {
+            **self.counters,
+            "size": len(self.local),
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
+
+
+class ExpiringSet:
+    """
+    Members with a per-member expiry and no size bound: nothing is evicted before it expires
+    (a deny-list entry dropped early would make a revoked token valid again).
+    Expired members are purged in expiry order (heap) as new ones are added, so memory is
+    bounded by add rate x ttl.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._expires: dict = {}  # member -> time.monotonic() deadline
+        self._heap = []  # (deadline, member), may hold superseded deadlines
+
+    def add(self, member, ttl: float | None = None):
+        now = time.monotonic()
+        self._purge(now)
+        deadline = now + (self.ttl if ttl is None else ttl)
+        if deadline > self._expires.get(member, 0.0):
+            self._expires[member] = deadline
+            heapq.heappush(self._heap, (deadline, member))
+
+    def _purge(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            deadline, member = heapq.heappop(self._heap)
+            if self._expires.get(member) == deadline:
+                del self._expires[member]
+
+    def __contains__(self, member) -> bool:
+        deadline = self._expires.get(member)
+        return deadline is not None and deadline > time.monotonic()
+
+    def __len__(self):
+        return len(self._expires)
+
+
+class DecodedTokenCache:
+    """
+    Memo of verified JWT -> payload, so a reused bearer token skips jwt.decode + HMAC.
+    - entries expire at min(exp, max_ttl); a token is never served past its exp
+    - deny-list by `jti`: revoke() locally, or publish_revocation() through Redis,
+      which every worker picks up in listen_revocations()
+    - deny-list entries only need to outlive the longest token lifetime (deny_ttl); they are
+      never size-evicted (ExpiringSet), however many tokens get revoked
+    """
+
+    def __init__(self, maxsize: int = 10_000, max_ttl: int = 300, deny_ttl: int = 3600,
+                 channel: str = "jwt:revoked"):
+        self.local = TTLCache(maxsize=maxsize, ttl=max_ttl)
+        self.denied = ExpiringSet(ttl=deny_ttl)
+        self.max_ttl = max_ttl
+        self.deny_ttl = deny_ttl
+        self.channel = channel
+        self.counters = {"hit": 0, "decode": 0, "revoked": 0, "reconnect": 0}
+
+    def get(self, token: str):
+        payload = self.local.get(token)
+        if payload is MISSING:
+            return None
+        if self.is_revoked(payload):
+            self.local.pop(token)
+            return None
+        self.counters["hit"] += 1
+        return payload
+
+    def set(self, token: str, payload: dict):
+        self.counters["decode"] += 1
+        exp = payload.get("exp")
+        ttl = self.max_ttl if exp is None else min(self.max_ttl, exp - time.time())
+        self.local.set(token, payload, ttl)
+
+    def is_revoked(self, payload: dict) -> bool:
+        jti = payload.get("jti")
+        if jti is not None and jti in self.denied:
+            self.counters["revoked"] += 1
+            return True
+        return False
+
+    def revoke(self, jti: str):
+        self.denied.add(jti)
+
+    async def publish_revocation(self, redis, jti: str):
+        await redis.set(f"{self.channel}:{jti}", 1, ex=self.deny_ttl)
+        await redis.publish(self.channel, jti)
+        self.revoke(jti)
+
+    async def listen_revocations(self, redis, backoff: float = 0.5, max_backoff: float = 30.0):
+        """
+        background task, reconnects forever with exponential backoff.
+        each connection subscribes first, then loads the current deny-list from the keys
+        (a revocation published in between is waiting on the channel, none is lost),
+        then follows the channel; revocations published while disconnected are picked up
+        by the re-scan of the next connection
+        """
+        delay = backoff
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for key in redis.scan_iter(match=f"{self.channel}:*"):
+                    self.revoke(key.removeprefix(f"{self.channel}:"))
+                delay = backoff  # connected and in sync
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.revoke(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, OSError) as e:
+                print(f"jwt revocation listener lost: {e!r}, retrying in {delay:.1f}s")
+            finally:
+                try:
+                    await pubsub.aclose()
+                except (RedisError, OSError):
+                    pass
+            self.counters["reconnect"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_backoff)
+
+    def stats(self) -> dict:
+        total = self.counters["hit"] + self.counters["decode"]
+        return {
+            **self.counters,
+            "size": len(self.local),
+            "denied": len(self.denied),
+            "hit_ratio": round(self.counters["hit"] / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,55 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploads"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 1 MiB
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(5 * 1024 ** 3)))  # 5 GiB
+
+
+async def iter_upload_file(file: UploadFile, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """multipart part -> fixed size chunks, instead of `await file.read()` of the whole thing"""
+    while chunk := await file.read(chunk_size):
+        yield chunk
+
+
+async def save_stream(chunks: AsyncIterator[bytes], filename: str, max_bytes: int = UPLOAD_MAX_BYTES) -> dict:
+    """
+    Write chunks to UPLOAD_DIR while computing size + sha256 on the fly.
+    - memory stays at one chunk, whatever the file size
+    - max_bytes is enforced on the running count -> 413 without reading the rest
+    - written to a .part file and renamed at the end, so readers never see half a file
+    - peak_buffer_bytes = largest chunk held at once (exposed for testing)
+    """
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    dest = UPLOAD_DIR / f"{uuid.uuid4().hex}_{Path(filename or 'upload.bin').name}"
+    part = dest.with_name(dest.name + ".part")
+    sha256 = hashlib.sha256()
+    size = 0
+    peak = 0
+    try:
+        async with aiofiles.open(part, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(413, detail=f"Upload exceeds {max_bytes} bytes")
+                peak = max(peak, len(chunk))
+                sha256.update(chunk)
+                await out.write(chunk)
+        await aiofiles.os.replace(part, dest)
+    except BaseException:
+        if part.exists():
+            await aiofiles.os.remove(part)
+        raise
+    return {
+        "stored_as": dest.name,
+        "size": size,
+        "sha256": sha256.hexdigest(),
+        "peak_buffer_bytes": peak,
+    }
@@ -0,0 +1,108 @@
+"""
+Worker boot diagnostics for webApp1.
+
+    python -m src.webApp1.startup --profile-startup
+        per package import cost of the app module, like `python -X importtime` but summed up
+    python -m src.webApp1.startup --cold-start-budget 2.5
+        boots uvicorn, times process start -> first HTTP response, exit code 1 over budget
+        (pytest runs the same check against COLD_START_BUDGET, tests/test_startup.py)
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+DEFAULT_APP = "src.webApp1.controller.web2:app"
+# seconds, process start -> first response; tests/test_startup.py fails the build above it
+COLD_START_BUDGET = float(os.getenv("COLD_START_BUDGET", "3.0"))
+
+
+def profile_imports(module: str, depth: int = 1) -> tuple[dict, float]:
+    """
+    import `module` in a fresh interpreter with -X importtime
+    -> ({package: self_seconds}, total_seconds), packages cut at `depth` dotted parts
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    per_package = defaultdict(float)
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        # import time:   self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        name = name.strip()
+        seconds = int(self_us) / 1e6
+        per_package[".".join(name.split(".")[:depth])] += seconds
+        total += seconds
+    return dict(per_package), total
+
+
+def cold_start(app: str, path: str = "/docs", timeout: float = 30.0) -> float:
+    """seconds from spawning uvicorn to the first HTTP response on `path` (any status)"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise SystemExit(f"uvicorn exited early:\n{proc.stderr.read().decode()[-2000:]}")
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1)
+                return time.perf_counter() - started
+            except urllib.error.HTTPError:
+                return time.perf_counter() - started  # a 4xx/5xx is still a served request
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                time.sleep(0.02)
+        raise SystemExit(f"no response from {app} within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.webApp1.startup", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=DEFAULT_APP, help="module:attr of the ASGI app")
+    parser.add_argument("--profile-startup", action="store_true", help="per package import cost")
+    parser.add_argument("--depth", type=int, default=1, help="package name depth to group by")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--cold-start-budget", type=float, help="seconds, fail when exceeded")
+    parser.add_argument("--path", default="/docs", help="path requested for the cold start check")
+    args = parser.parse_args(argv)
+
+    if not args.profile_startup and args.cold_start_budget is None:
+        parser.print_help()
+        return 0
+
+    if args.profile_startup:
+        per_package, total = profile_imports(args.app.partition(":")[0], args.depth)
+        print(f"{'package':<40} {'ms':>9} {'share':>7}")
+        for name, seconds in sorted(per_package.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+            print(f"{name:<40} {seconds * 1000:>9.1f} {seconds / total:>7.1%}")
+        print(f"{'total':<40} {total * 1000:>9.1f}")
+
+    if args.cold_start_budget is not None:
+        seconds = cold_start(args.app, args.path)
+        verdict = "OK" if seconds <= args.cold_start_budget else "OVER BUDGET"
+        print(f"cold start to first request: {seconds:.3f}s (budget {args.cold_start_budget:.3f}s) {verdict}")
+        return 0 if seconds <= args.cold_start_budget else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from src.webApp1.service.init_srv import config_service
+
+OKTA = {
+    "OKTA_TOKEN_URL": "http://okta.test/oauth2/default/v1/token",
+    "OKTA_INTROSPECT_URL": "http://okta.test/oauth2/default/v1/introspect",
+    "OKTA_CLIENT_ID": "client",
+    "OKTA_SCOPE": "fastapiweb2",
+    "OKTA_AUDIENCE": "api://webapp1",
+}
+
+
+@pytest.fixture
+def env_config(tmp_path, monkeypatch):
+    """env/dev1.json in a temp working dir, fresh config snapshots; -> fn(config dict) rewriting the file"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ETL_APP_ENV", "dev1")
+    monkeypatch.setattr(config_service, "_snapshots", {})
+    (tmp_path / "env").mkdir()
+
+    def write(config):
+        (tmp_path / "env" / "dev1.json").write_text(json.dumps(config))
+
+    write({"oauth": {"okta": OKTA, "gh": {"GITHUB_CLIENT_ID": "gh-id", "GITHUB_CLIENT_SECRET": "gh-secret"}}})
+    return write
+
+
+@pytest.fixture
+def okta(env_config):
+    """okta_oauth with config read from env_config, its caches empty before and after"""
+    from src.webApp1.controller import okta_oauth
+    okta_oauth.okta_config.cache_clear()
+    okta_oauth.okta_jwks.cache_clear()
+    okta_oauth.introspection_cache.local.clear()
+    yield okta_oauth
+    okta_oauth.okta_config.cache_clear()
+    okta_oauth.okta_jwks.cache_clear()
+    okta_oauth.introspection_cache.local.clear()
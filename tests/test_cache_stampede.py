@@ -0,0 +1,150 @@
+"""user-008: hot keys expire without a stampede, N readers / M workers -> one recompute (fakeredis harness)"""
+import asyncio
+import math
+
+import fakeredis
+import pytest
+
+from src.webApp1.cache import stampede
+from src.webApp1.cache.multilevel import MultiLevelCache
+
+
+class CountingLoader:
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("source down")
+        return f"value-{self.calls}"
+
+
+def redis():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+def test_concurrent_cold_misses_in_one_worker_load_once():
+    cache = MultiLevelCache(redis(), prefix="t:", ttl=30, stale_ttl=30)
+    loader = CountingLoader()
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("hot", loader) for _ in range(200)))
+
+    assert set(asyncio.run(scenario())) == {"value-1"}
+    assert loader.calls == 1
+    assert cache.stats()["coalesced"] == 199
+
+
+def test_concurrent_cold_misses_across_workers_load_once():
+    shared = redis()
+    workers = [MultiLevelCache(shared, prefix="t:", ttl=30, stale_ttl=30) for _ in range(4)]
+    loader = CountingLoader(delay=0.2)
+
+    async def scenario():
+        return await asyncio.gather(*(w.get("hot", loader) for w in workers for _ in range(25)))
+
+    assert set(asyncio.run(scenario())) == {"value-1"}
+    assert loader.calls == 1
+    assert sum(w.counters["lock_wait_hit"] for w in workers) == 3  # the others waited for the holder
+
+
+def test_expired_key_served_stale_while_one_refresh_runs():
+    cache = MultiLevelCache(redis(), prefix="t:", ttl=0.05, stale_ttl=30, beta=0)  # no early refresh here
+    loader = CountingLoader()
+
+    async def scenario():
+        await cache.get("hot", loader)
+        await asyncio.sleep(0.1)  # fresh period over, stale period running
+        served = await asyncio.gather(*(cache.fetch("hot", loader) for _ in range(50)))
+        await asyncio.gather(*cache._refreshing.values())
+        return served, await cache.get("hot", loader)
+
+    served, after = asyncio.run(scenario())
+    assert served == [("value-1", "stale")] * 50
+    assert loader.calls == 2  # first load + exactly one background refresh
+    assert after == "value-2"
+
+
+def test_refresh_skipped_while_another_worker_holds_the_lock():
+    shared = redis()
+    cache = MultiLevelCache(shared, prefix="t:", ttl=0.05, stale_ttl=30, beta=0)
+    loader = CountingLoader()
+
+    async def scenario():
+        await cache.get("hot", loader)
+        await asyncio.sleep(0.1)
+        await shared.set("t:lock:hot", "other-worker", px=5000)
+        value, source = await cache.fetch("hot", loader)
+        await asyncio.gather(*cache._refreshing.values())
+        return value, source
+
+    assert asyncio.run(scenario()) == ("value-1", "stale")
+    assert loader.calls == 1
+    assert cache.counters["lock_busy"] == 1
+
+
+def test_refresh_after_another_worker_refreshed_skips_the_load():
+    shared = redis()
+    a, b = (MultiLevelCache(shared, prefix="t:", ttl=30, stale_ttl=30, beta=0) for _ in range(2))
+    loader = CountingLoader()
+
+    async def scenario():
+        await a.get("hot", loader)
+        await b.get("hot", loader)  # L2 hit, b's L1 holds value-1
+        _, fresh_until, _ = b.l1.get("hot")
+        await a.set("hot", "value-from-a")  # a refreshed first and released the lock
+        b._refresh_later("hot", loader, None, "value-1", fresh_until)  # b noticed the same expiry
+        await asyncio.gather(*b._refreshing.values())
+        return await b.get("hot", loader)
+
+    assert asyncio.run(scenario()) == "value-from-a"
+    assert loader.calls == 1
+    assert b.counters["load_skipped"] == 1
+
+
+def test_failed_recompute_releases_the_lock():
+    shared = redis()
+    cache = MultiLevelCache(shared, prefix="t:", ttl=30, stale_ttl=30)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await cache.get("hot", CountingLoader(fail=True))
+        assert await shared.get("t:lock:hot") is None
+        return await cache.get("hot", CountingLoader())
+
+    assert asyncio.run(scenario()) == "value-1"
+
+
+def test_release_only_deletes_our_own_lock():
+    shared = redis()
+
+    async def scenario():
+        token = await stampede.acquire_lock(shared, "lock", 5000)
+        assert await stampede.acquire_lock(shared, "lock", 5000) is None
+        await shared.set("lock", "taken-over-after-expiry")
+        await stampede.release_lock(shared, "lock", token)
+        return await shared.get("lock")
+
+    assert asyncio.run(scenario()) == "taken-over-after-expiry"
+
+
+def test_xfetch_threshold(monkeypatch):
+    monkeypatch.setattr(stampede.random, "random", lambda: 1 - math.exp(-1))  # -log(1 - r) == 1
+    # refresh once now + delta * beta >= fresh_until
+    assert stampede.xfetch_refresh(fresh_until=100.0, delta=2.0, now=98.0)
+    assert not stampede.xfetch_refresh(fresh_until=100.0, delta=2.0, now=97.9)
+    assert stampede.xfetch_refresh(fresh_until=100.0, delta=2.0, now=96.0, beta=2.0)
+    assert not stampede.xfetch_refresh(fresh_until=100.0, delta=0.0, now=99.99)  # unknown cost: never early
+
+
+def test_xfetch_probability_rises_towards_expiry():
+    def share(now, trials=4000):
+        return sum(stampede.xfetch_refresh(100.0, 1.0, now) for _ in range(trials)) / trials
+
+    far, near, closer = share(90.0), share(98.0), share(99.5)
+    assert far < 0.01 < near < closer
+    assert near == pytest.approx(math.exp(-2), abs=0.04)  # P = exp(-(fresh_until - now) / (delta * beta))
@@ -0,0 +1,191 @@
+"""user-013: config parsed once and served from memory, hot reload swaps whole snapshots"""
+import builtins
+import json
+import os
+import threading
+
+import pytest
+
+from src.webApp1.service.init_srv import ConfigError, ConfigService
+
+
+def write(path, config, bump: int = 0):
+    """rewrite `path`, mtime moved `bump` seconds ahead so same-tick rewrites are still seen as changes"""
+    path.write_text(json.dumps(config))
+    if bump:
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+
+@pytest.fixture
+def file_io(monkeypatch):
+    """counts open() and os.stat() calls from here on"""
+    calls = {"open": 0, "stat": 0}
+    real_open, real_stat = builtins.open, os.stat
+
+    def counting_open(*args, **kwargs):
+        calls["open"] += 1
+        return real_open(*args, **kwargs)
+
+    def counting_stat(*args, **kwargs):
+        calls["stat"] += 1
+        return real_stat(*args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", counting_open)
+    monkeypatch.setattr(os, "stat", counting_stat)
+    return calls
+
+
+def test_lookups_after_first_parse_do_no_file_io(tmp_path, file_io):
+    path = tmp_path / "app.json"
+    write(path, {"oauth": {"okta": {"OKTA_CLIENT_ID": "client", "PORT": "8443"}}, "debug": "true"})
+    service = ConfigService()
+    service.snapshot(str(path))
+    file_io.update(open=0, stat=0)
+
+    for _ in range(10_000):
+        assert service.get(str(path), "oauth.okta.OKTA_CLIENT_ID", str) == "client"
+        assert service.get(str(path), "oauth.okta.PORT", int) == 8443
+        assert service.get(str(path), "debug", bool) is True
+    assert file_io == {"open": 0, "stat": 0}
+
+
+def test_snapshots_are_read_only(tmp_path):
+    path = tmp_path / "app.json"
+    write(path, {"oauth": {"scopes": ["a", "b"]}})
+    data = ConfigService().snapshot(str(path)).data
+    with pytest.raises(TypeError):
+        data["oauth"]["scopes"] = []
+    assert data["oauth"]["scopes"] == ("a", "b")
+
+
+def test_missing_key_and_bad_type_raise_config_error(tmp_path):
+    path = tmp_path / "app.json"
+    write(path, {"port": "not-a-number"})
+    service = ConfigService()
+    with pytest.raises(ConfigError):
+        service.get(str(path), "nope")
+    with pytest.raises(ConfigError):
+        service.get(str(path), "port", int)
+    assert service.get(str(path), "nope", default=None) is None
+
+
+def test_concurrent_first_use_parses_once(tmp_path, file_io):
+    path = tmp_path / "app.json"
+    write(path, {"k": 1})
+    service = ConfigService()
+    barrier = threading.Barrier(16)
+
+    def first_use():
+        barrier.wait()
+        service.snapshot(str(path))
+
+    threads = [threading.Thread(target=first_use) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert file_io["open"] == 1
+
+
+def test_readers_never_see_a_half_reloaded_config(tmp_path):
+    """the writer keeps a == b in every version; readers racing the reloads must never see them differ"""
+    path = tmp_path / "app.json"
+    write(path, {"a": 0, "b": 0})
+    service = ConfigService()
+    service.snapshot(str(path))
+    stop = threading.Event()
+    seen, torn = set(), []
+
+    def reader():
+        while not stop.is_set():
+            snap = service.snapshot(str(path))
+            a, b = snap.get("a"), snap.get("b")
+            seen.add(a)
+            if a != b:
+                torn.append((a, b))
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for version in range(1, 50):
+        write(path, {"a": version, "b": version}, bump=version)
+        assert service.reload_changed() == [str(path)]
+    stop.set()
+    for t in readers:
+        t.join()
+
+    assert torn == []
+    assert len(seen) > 1
+    assert service.get(str(path), "a") == 49
+
+
+def test_broken_file_keeps_the_previous_snapshot(tmp_path):
+    path = tmp_path / "app.json"
+    write(path, {"k": "good"})
+    service = ConfigService()
+    service.snapshot(str(path))
+    path.write_text('{"k": ')  # editor mid-save
+    assert service.reload_changed() == []
+    assert service.get(str(path), "k") == "good"
+    write(path, {"k": "fixed"}, bump=1)
+    assert service.reload_changed() == [str(path)]
+    assert service.get(str(path), "k") == "fixed"
+
+
+def test_one_failing_hook_does_not_block_the_others(tmp_path):
+    path = tmp_path / "app.json"
+    write(path, {"k": 1})
+    service = ConfigService()
+    service.snapshot(str(path))
+    reloaded = []
+
+    def broken(snapshot):
+        raise RuntimeError("hook bug")
+
+    service.on_reload += [broken, lambda snapshot: reloaded.append(snapshot.get("k"))]
+    write(path, {"k": 2}, bump=1)
+    assert service.reload_changed() == [str(path)]
+    assert reloaded == [2]
+
+
+def test_watcher_survives_a_failing_poll(tmp_path, monkeypatch):
+    path = tmp_path / "app.json"
+    write(path, {"k": 1})
+    service = ConfigService(poll_interval=0.01)
+    service.snapshot(str(path))
+    polls, reloaded = [], threading.Event()
+    real_reload = service.reload_changed
+
+    def flaky_reload():
+        polls.append(1)
+        if len(polls) == 1:
+            raise OSError("transient")
+        return real_reload()
+
+    monkeypatch.setattr(service, "reload_changed", flaky_reload)
+    service.on_reload.append(lambda snapshot: reloaded.set())
+    service.watch()
+    try:
+        write(path, {"k": 2}, bump=1)
+        assert reloaded.wait(5)
+    finally:
+        service.stop()
+    assert len(polls) > 1 and service.get(str(path), "k") == 2
+
+
+def test_reload_reaches_okta_and_github_settings(okta, env_config):
+    from src.webApp1.controller.github_oauth_cc import github_config
+    from src.webApp1.service.init_srv import config_service
+    from tests.conftest import OKTA
+
+    assert okta.okta_config().CLIENT_ID == "client"
+    assert github_config()["GITHUB_CLIENT_ID"] == "gh-id"
+    env_config({"oauth": {"okta": {**OKTA, "OKTA_CLIENT_ID": "rotated"}, "gh": {"GITHUB_CLIENT_ID": "gh-rotated"}}})
+    path = os.path.join("env", "dev1.json")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert config_service.reload_changed() == ["env/dev1.json"]
+    assert okta.okta_config().CLIENT_ID == "rotated"
+    assert github_config()["GITHUB_CLIENT_ID"] == "gh-rotated"
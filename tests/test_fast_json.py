@@ -0,0 +1,55 @@
+"""user-011: FastJSONRoute only skips response-model handling for JSON-native returns"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from src.webApp1.service.fast_json import FastJSONRoute, _returns_json_native
+
+
+class Out(BaseModel):
+    name: str
+
+
+LEAKY = {"name": "a", "password": "secret"}
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = FastJSONRoute
+
+    @app.get("/one")
+    def one() -> Out:
+        return LEAKY
+
+    @app.get("/many")
+    def many() -> list[Out]:
+        return [LEAKY]
+
+    @app.get("/by-name")
+    def by_name() -> dict[str, Out]:
+        return {"a": LEAKY}
+
+    @app.get("/native")
+    def native() -> dict[str, list[int]]:
+        return {"a": [1, 2]}
+
+    return app
+
+
+def test_containers_of_models_are_filtered():
+    client = TestClient(make_app())
+    assert client.get("/one").json() == {"name": "a"}
+    assert client.get("/many").json() == [{"name": "a"}]
+    assert client.get("/by-name").json() == {"a": {"name": "a"}}
+    assert client.get("/native").json() == {"a": [1, 2]}
+
+
+def test_json_native_annotations():
+    def returns(annotation):
+        def endpoint():
+            pass
+        endpoint.__annotations__["return"] = annotation
+        return _returns_json_native(endpoint)
+
+    assert returns(dict) and returns(list[dict]) and returns(dict[str, int | None])
+    assert not returns(list[Out]) and not returns(dict[str, Out]) and not returns(Out | None)
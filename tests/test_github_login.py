@@ -0,0 +1,226 @@
+"""user-020: GitHub login against a stub GitHub server, profiles revalidated with ETags, sessions in (fake) redis"""
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+import fakeredis
+import httpx
+import pytest
+from authlib.integrations.starlette_client import OAuth
+from fastapi import FastAPI
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from src.webApp1.service.github_profile import GitHubProfileCache
+from src.webApp1.service.session import RedisSessionMiddleware
+
+
+class StubGitHub:
+    """
+    POST /login/oauth/access_token: any code -> a token for the user the code names ("code-<login>")
+    GET /user: the profile of the token's user, ETag'd; If-None-Match on an unchanged profile -> 304
+    """
+
+    def __init__(self):
+        self.users = {"octocat": {"id": 1, "login": "octocat", "name": "Mona"},
+                      "hubot": {"id": 2, "login": "hubot", "name": "Hubot"}}
+        self.requests = []  # (path, If-None-Match)
+        self.app = Starlette(routes=[
+            Route("/login/oauth/access_token", self.access_token, methods=["POST"]),
+            Route("/user", self.user),
+        ])
+
+    async def access_token(self, request):
+        form = await request.form()
+        self.requests.append(("/login/oauth/access_token", None))
+        return JSONResponse({"access_token": f"gho_{form['code'].removeprefix('code-')}", "token_type": "bearer",
+                             "scope": "read:user,user:email"})
+
+    async def user(self, request):
+        conditional = request.headers.get("if-none-match")
+        self.requests.append(("/user", conditional))
+        login = request.headers["authorization"].removeprefix("Bearer gho_")
+        profile = self.users[login]
+        etag = f'W/"{profile["id"]}-{profile["name"]}"'
+        if conditional == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return JSONResponse(profile, headers={"ETag": etag})
+
+    def profile_fetches(self) -> list:
+        return [inm for path, inm in self.requests if path == "/user"]
+
+    def oauth_client(self):
+        """authlib client registered like github_oauth_implicit's, every request served by this stub"""
+        return OAuth().register(
+            name="github", client_id="gh-id", client_secret="gh-secret",
+            access_token_url="https://github.com/login/oauth/access_token",
+            authorize_url="https://github.com/login/oauth/authorize",
+            api_base_url="https://api.github.com/",
+            client_kwargs={"scope": "read:user user:email", "transport": httpx.ASGITransport(app=self.app)},
+        )
+
+
+def token(login: str) -> dict:
+    return {"access_token": f"gho_{login}", "token_type": "bearer"}
+
+
+def test_fresh_profile_served_without_calling_github():
+    stub, cache, redis = StubGitHub(), GitHubProfileCache(fresh_for=300), fakeredis.FakeAsyncRedis()
+
+    async def scenario():
+        github = stub.oauth_client()
+        first = await cache.fetch(github, token("octocat"), redis)
+        again = [await cache.fetch(github, token("octocat"), redis, user_id=1) for _ in range(10)]
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert first == (stub.users["octocat"], "fresh")
+    assert again == [(stub.users["octocat"], "cache")] * 10
+    assert stub.profile_fetches() == [None]
+
+
+def test_stale_profile_revalidated_with_if_none_match():
+    stub, cache, redis = StubGitHub(), GitHubProfileCache(fresh_for=300), fakeredis.FakeAsyncRedis()
+
+    async def scenario():
+        github = stub.oauth_client()
+        await cache.fetch(github, token("octocat"), redis)
+        cache.fresh_for = 0  # everything cached is now past fresh_for
+        unchanged = await cache.fetch(github, token("octocat"), redis, user_id=1)
+        stub.users["octocat"]["name"] = "Mona Lisa"
+        changed = await cache.fetch(github, token("octocat"), redis, user_id=1)
+        return unchanged, changed
+
+    unchanged, changed = asyncio.run(scenario())
+    assert unchanged == ({"id": 1, "login": "octocat", "name": "Mona"}, "not_modified")
+    assert changed == ({"id": 1, "login": "octocat", "name": "Mona Lisa"}, "fresh")
+    assert stub.profile_fetches() == [None, 'W/"1-Mona"', 'W/"1-Mona"']
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_redis_down_degrades_to_a_plain_get():
+    stub, cache = StubGitHub(), GitHubProfileCache()
+    redis = fakeredis.FakeAsyncRedis(connected=False)
+
+    async def scenario():
+        return await cache.fetch(stub.oauth_client(), token("octocat"), redis, user_id=1)
+
+    assert asyncio.run(scenario()) == (stub.users["octocat"], "fresh")
+    assert stub.profile_fetches() == [None]
+    assert cache.stats()["redis_error"] == 2  # the lookup and the store
+
+
+@pytest.fixture
+def login_app(monkeypatch):
+    """github_oauth_implicit's routes on a bare app: RedisSessionMiddleware, fakeredis, the stub as GitHub"""
+    from src.webApp1.controller import github_oauth_implicit as implicit
+    stub = StubGitHub()
+    monkeypatch.setattr(implicit, "github", stub.oauth_client())
+    monkeypatch.setattr(implicit, "profile_cache", GitHubProfileCache(fresh_for=300))
+    app = FastAPI()
+    app.state.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    for path, endpoint, method in [("/login/github", implicit.login_via_github, "GET"),
+                                   ("/auth/callback", implicit.auth_callback, "GET"),
+                                   ("/auth/me", implicit.auth_me, "GET"),
+                                   ("/auth/logout", implicit.auth_logout, "POST")]:
+        app.add_api_route(path, endpoint, methods=[method])
+    app.add_middleware(RedisSessionMiddleware, ttl=600)
+    return app, stub
+
+
+async def login(browser: httpx.AsyncClient, who: str) -> httpx.Response:
+    """GET /login/github, follow GitHub's redirect back to /auth/callback as if `who` approved it"""
+    redirect = await browser.get("/login/github")
+    assert redirect.status_code in (302, 307)
+    state = parse_qs(urlsplit(redirect.headers["location"]).query)["state"][0]
+    return await browser.get("/auth/callback", params={"code": f"code-{who}", "state": state})
+
+
+def browser_for(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+
+
+def test_login_then_me_served_from_the_session(login_app):
+    app, stub = login_app
+
+    async def scenario():
+        async with browser_for(app) as browser:
+            callback = await login(browser, "octocat")
+            me = [await browser.get("/auth/me") for _ in range(5)]
+            sid = browser.cookies["sid"]
+        return callback, me, sid
+
+    callback, me, sid = asyncio.run(scenario())
+    assert callback.json() == {"user": stub.users["octocat"], "source": "fresh"}
+    assert [r.json()["source"] for r in me] == ["cache"] * 5
+    assert stub.profile_fetches() == [None]  # only the login resolved the identity
+    assert "gho_octocat" not in sid
+
+
+def test_login_rotates_the_session_id_and_ignores_the_previous_user(login_app):
+    app, stub = login_app
+
+    async def scenario():
+        async with browser_for(app) as browser:
+            await login(browser, "octocat")
+            first_sid = browser.cookies["sid"]
+            callback = await login(browser, "hubot")  # same browser, someone else logs in
+            second_sid = browser.cookies["sid"]
+            me = await browser.get("/auth/me")
+            old_session = await app.state.redis.get(f"session:{first_sid}")
+        return first_sid, second_sid, callback, me, old_session
+
+    first_sid, second_sid, callback, me, old_session = asyncio.run(scenario())
+    assert first_sid != second_sid and old_session is None
+    assert callback.json()["user"]["login"] == "hubot"
+    assert me.json()["user"]["login"] == "hubot"
+
+
+def test_planted_session_id_never_authenticated(login_app):
+    app, _ = login_app
+
+    async def scenario():
+        async with browser_for(app) as browser:
+            await browser.get("/login/github")  # attacker gets an id with OAuth state in it
+            planted = browser.cookies["sid"]
+        async with browser_for(app) as victim:
+            victim.cookies.set("sid", planted, domain="testserver.local")
+            await login(victim, "octocat")
+            victim_sid = victim.cookies["sid"]
+        async with browser_for(app) as attacker:
+            attacker.cookies.set("sid", planted, domain="testserver.local")
+            return victim_sid != planted, (await attacker.get("/auth/me")).status_code
+
+    assert asyncio.run(scenario()) == (True, 401)
+
+
+def test_logout_deletes_the_session(login_app):
+    app, _ = login_app
+
+    async def scenario():
+        async with browser_for(app) as browser:
+            await login(browser, "octocat")
+            sid = browser.cookies["sid"]
+            logout = await browser.post("/auth/logout")
+            me = await browser.get("/auth/me")
+        return logout, me, await app.state.redis.get(f"session:{sid}")
+
+    logout, me, stored = asyncio.run(scenario())
+    assert "max-age=0" in logout.headers["set-cookie"]
+    assert me.status_code == 401 and stored is None
+
+
+def test_session_untouched_requests_do_not_hit_redis():
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    app = Starlette(routes=[Route("/ping", lambda request: JSONResponse({"session": dict(request.session)}))])
+    app.state.redis = redis
+    app.add_middleware(RedisSessionMiddleware)
+
+    async def scenario():
+        async with browser_for(app) as browser:
+            response = await browser.get("/ping")
+        return response, await redis.dbsize()
+
+    response, keys = asyncio.run(scenario())
+    assert response.json() == {"session": {}} and "set-cookie" not in response.headers
+    assert keys == 0
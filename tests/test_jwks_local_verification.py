@@ -0,0 +1,152 @@
+"""user-003: access tokens verified locally against a JWKS cached from a stub issuer"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from tests.conftest import OKTA
+
+ISSUER = "http://okta.test/oauth2/default"
+
+
+def rsa_key(kid: str) -> dict:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    return {"kid": kid, "pem": pem, "jwk": {**public, "kid": kid, "alg": "RS256", "use": "sig"}}
+
+
+class StubIssuer:
+    """GET /oauth2/default/v1/keys serving the public half of `keys`"""
+
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.fetches = 0
+        self.app = Starlette(routes=[Route("/oauth2/default/v1/keys", self.jwks)])
+
+    async def jwks(self, request):
+        self.fetches += 1
+        return JSONResponse({"keys": [k["jwk"] for k in self.keys]})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://okta.test")
+
+
+def token(key: dict, **claims) -> str:
+    now = int(time.time())
+    body = {"iss": ISSUER, "aud": OKTA["OKTA_AUDIENCE"], "sub": "user-1", "iat": now, "exp": now + 300, **claims}
+    return jwt.encode(body, key["pem"], algorithm="RS256", headers={"kid": key["kid"]})
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return rsa_key("k1"), rsa_key("k2")
+
+
+def verify_all(okta, issuer, tokens) -> list:
+    """each token through verify_okta_token_local -> claims or the HTTP status it was rejected with"""
+    async def scenario():
+        out = []
+        async with issuer.client() as client:
+            for t in tokens:
+                try:
+                    out.append(await okta.verify_okta_token_local(t, client))
+                except HTTPException as e:
+                    out.append(e.status_code)
+        await okta.close_okta_jwks()
+        return out
+
+    return asyncio.run(scenario())
+
+
+def test_valid_tokens_verified_with_one_jwks_fetch(okta, keys):
+    issuer = StubIssuer(keys[0])
+    results = verify_all(okta, issuer, [token(keys[0]) for _ in range(20)])
+    assert all(r["active"] and r["sub"] == "user-1" for r in results)
+    assert issuer.fetches == 1
+
+
+@pytest.mark.parametrize("claims", [{"aud": "api://someone-else"}, {"iss": "http://evil.test"},
+                                    {"exp": int(time.time()) - 60}])
+def test_wrong_audience_issuer_or_expired_rejected(okta, keys, claims):
+    assert verify_all(okta, StubIssuer(keys[0]), [token(keys[0], **claims)]) == [401]
+
+
+def test_token_signed_by_unknown_key_rejected(okta, keys):
+    issuer = StubIssuer(keys[0])
+    forged = jwt.encode({"iss": ISSUER, "aud": OKTA["OKTA_AUDIENCE"], "exp": int(time.time()) + 60},
+                        keys[1]["pem"], algorithm="RS256", headers={"kid": "k1"})  # claims k1, signed by k2
+    assert verify_all(okta, issuer, [forged]) == [401]
+
+
+def test_key_rotation_refreshes_once(okta, keys):
+    issuer = StubIssuer(keys[0])
+
+    async def scenario():
+        async with issuer.client() as client:
+            await okta.verify_okta_token_local(token(keys[0]), client)
+            issuer.keys.append(keys[1])  # the IdP starts signing with k2
+            okta.okta_jwks()._last_fetch = -float("inf")  # past min_refresh_gap
+            rotated = [token(keys[1]) for _ in range(10)]
+            results = await asyncio.gather(*(okta.verify_okta_token_local(t, client) for t in rotated))
+        await okta.close_okta_jwks()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(r["active"] for r in results)
+    assert issuer.fetches == 2  # concurrent misses on the new kid coalesced into one refresh
+
+
+def test_unknown_kids_do_not_hammer_the_issuer(okta, keys):
+    issuer = StubIssuer(keys[0])
+    garbage = [jwt.encode({"iss": ISSUER}, keys[0]["pem"], algorithm="RS256", headers={"kid": f"nope-{i}"})
+               for i in range(25)]
+    assert verify_all(okta, issuer, [token(keys[0])] + garbage)[1:] == [401] * 25
+    assert issuer.fetches == 1  # within min_refresh_gap of the first fetch
+
+
+def test_first_fetch_allowed_right_after_boot(monkeypatch, keys):
+    from src.webApp1.service import jwks
+    monkeypatch.setattr(jwks.time, "monotonic", lambda: 3.0)  # host up for 3s < min_refresh_gap
+    issuer = StubIssuer(keys[0])
+    cache = jwks.JwksCache(f"{ISSUER}/v1/keys", min_refresh_gap=30)
+
+    async def scenario():
+        async with issuer.client() as client:
+            claims = await cache.decode(token(keys[0]), client, issuer=ISSUER, audience=OKTA["OKTA_AUDIENCE"])
+        await cache.close()
+        return claims
+
+    assert asyncio.run(scenario())["sub"] == "user-1"
+
+
+def test_refresher_stopped_on_close(okta, keys):
+    issuer = StubIssuer(keys[0])
+
+    async def scenario():
+        async with issuer.client() as client:
+            await okta.verify_okta_token_local(token(keys[0]), client)
+            refresher = okta.okta_jwks()._refresher
+            await okta.close_okta_jwks()
+            return refresher
+
+    assert asyncio.run(scenario()).cancelled()
+
+
+def test_local_mode_requires_an_audience(okta, env_config, monkeypatch):
+    monkeypatch.setattr(okta, "local_verification", True)
+    okta.check_okta_config()
+    env_config({"oauth": {"okta": {k: v for k, v in OKTA.items() if k != "OKTA_AUDIENCE"}}})
+    okta.okta_config.cache_clear()
+    okta.config_service._snapshots.clear()
+    with pytest.raises(okta.ConfigError):
+        okta.check_okta_config()
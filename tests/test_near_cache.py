@@ -0,0 +1,176 @@
+"""user-018: near cache stays coherent with redis under concurrent writers in several processes (fakeredis harness)"""
+import asyncio
+import random
+
+import fakeredis
+from redis.exceptions import ConnectionError
+
+from src.webApp1.cache.near_cache import NearCache
+
+
+async def started(server, backoff: float = 0.01, **kwargs) -> tuple[NearCache, asyncio.Task]:
+    """one process: own client on the shared server, listener running and subscribed"""
+    near = NearCache(fakeredis.FakeAsyncRedis(server=server, decode_responses=True), **kwargs)
+    task = asyncio.create_task(near.run(backoff=backoff))
+    for _ in range(200):
+        if near.connected:
+            return near, task
+        await asyncio.sleep(0.005)
+    raise AssertionError("near cache listener never connected")
+
+
+async def stopped(*procs):
+    for _, task in procs:
+        task.cancel()
+    await asyncio.gather(*(task for _, task in procs), return_exceptions=True)
+    for near, _ in procs:
+        await near.close()
+        await near.redis.aclose()
+
+
+def test_tracking_unavailable_falls_back_to_pubsub():
+    async def scenario():
+        near, task = await started(fakeredis.FakeServer(), mode="tracking")  # fakeredis has no CLIENT TRACKING
+        reader = near._reader
+        await stopped((near, task))
+        return near.mode, reader
+
+    mode, reader = asyncio.run(scenario())
+    assert mode == "pubsub"
+    assert reader is None  # reads go through the pool, not the untracked dedicated connection
+
+
+def test_hot_key_served_from_memory_until_written():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        near, task = await started(server, mode="pubsub")
+        await near.redis.set("k", "v1")
+        first = [await near.get("k") for _ in range(100)]
+        await near.redis.set("k", "v2")
+        await near.written(["k"])
+        await asyncio.sleep(0.05)
+        after = await near.get("k")
+        await stopped((near, task))
+        return first, after, near.stats()
+
+    first, after, stats = asyncio.run(scenario())
+    assert first == ["v1"] * 100 and after == "v2"
+    assert stats["hit"] == 99 and stats["invalidated"] >= 1
+
+
+def test_concurrent_writers_in_several_processes_converge():
+    """writers in 3 processes hammer 20 keys while readers fill the near caches; nothing stale survives"""
+    keys = [f"k{i}" for i in range(20)]
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        procs = [await started(server, mode="pubsub") for _ in range(3)]
+        caches = [near for near, _ in procs]
+        done = asyncio.Event()
+
+        async def writer(near, n):
+            for i in range(100):
+                key = random.choice(keys)
+                await near.redis.set(key, f"{n}-{i}")
+                await near.written([key])
+                await asyncio.sleep(0)
+
+        async def reader(near):
+            while not done.is_set():
+                await near.get(random.choice(keys))
+                await asyncio.sleep(0)
+
+        readers = [asyncio.create_task(reader(near)) for near in caches for _ in range(4)]
+        await asyncio.gather(*(writer(near, n) for n, near in enumerate(caches * 3)))
+        done.set()
+        await asyncio.gather(*readers)
+        await asyncio.sleep(0.1)  # last invalidations delivered
+
+        truth = {key: await caches[0].redis.get(key) for key in keys}
+        views = [{key: await near.get(key) for key in keys} for near in caches]
+        stale = [(key, value, entry[0]) for near in caches for key, entry in near._data.items()
+                 if entry[0] != (value := truth[key])]
+        await stopped(*procs)
+        return truth, views, stale, caches
+
+    truth, views, stale, caches = asyncio.run(scenario())
+    assert stale == []
+    assert views == [truth] * 3
+    assert all(near.stats()["hit"] > 0 for near in caches)
+
+
+def test_reply_racing_an_invalidation_is_not_cached():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        near, task = await started(server, mode="pubsub")
+        await near.redis.set("k", "old")
+        real_get = near.redis.get
+
+        async def slow_get(key):
+            value = await real_get(key)
+            await asyncio.sleep(0.05)  # reply still on the wire while someone writes
+            return value
+
+        near.redis.get = slow_get
+        reading = asyncio.create_task(near.get("k"))
+        await asyncio.sleep(0.01)
+        await near.redis.set("k", "new")
+        await near.written(["k"])
+        served = await reading
+        near.redis.get = real_get
+        cached = "k" in near._data
+        fresh = await near.get("k")
+        await stopped((near, task))
+        return served, cached, fresh, near.counters["race_skipped"]
+
+    assert asyncio.run(scenario()) == ("old", False, "new", 1)
+
+
+def test_lost_listener_drops_everything_and_reads_go_to_redis():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        near, task = await started(server, backoff=0.2, mode="pubsub")  # stays down while we look
+        await near.redis.set("k", "v1")
+        await near.get("k")
+        assert "k" in near._data
+
+        def broken(data):
+            raise ConnectionError("listener connection reset")
+
+        near._on_invalidate = broken
+        await near.written(["other"])
+        await asyncio.sleep(0.02)
+        disconnected = (near.connected, dict(near._data))
+        await near.redis.set("k", "v2")  # nobody hears about this write
+        during = await near.get("k")
+        del near._on_invalidate
+        for _ in range(200):
+            if near.connected:
+                break
+            await asyncio.sleep(0.005)
+        reconnected = near.connected
+        await stopped((near, task))
+        return disconnected, during, near.counters["reconnect"], reconnected
+
+    (connected, data), during, reconnects, reconnected = asyncio.run(scenario())
+    assert (connected, data) == (False, {})
+    assert during == "v2"
+    assert reconnects == 1 and reconnected
+
+
+def test_bounded_by_entries_and_bytes():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        near, task = await started(server, mode="pubsub", maxsize=10, max_bytes=2000)
+        for i in range(50):
+            await near.redis.set(f"k{i}", "x" * 100)
+            await near.get(f"k{i}")
+        by_count = near.stats()
+        await near.redis.set("big", "x" * 5000)
+        await near.get("big")
+        await stopped((near, task))
+        return by_count, "big" in near._data
+
+    stats, big_cached = asyncio.run(scenario())
+    assert stats["size"] <= 10 and stats["bytes"] <= 2000 and stats["evicted"] >= 40
+    assert not big_cached
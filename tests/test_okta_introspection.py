@@ -0,0 +1,100 @@
+"""user-001: introspection results cached in-process and in redis, keyed by token hash, ttl bounded by exp"""
+import asyncio
+import time
+
+import fakeredis
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+class FakeIntrospection:
+    """POST /oauth2/default/v1/introspect, "good-*" tokens are active for `lifetime` seconds"""
+
+    def __init__(self, lifetime: int = 600):
+        self.lifetime = lifetime
+        self.calls = []
+        self.app = Starlette(routes=[Route("/oauth2/default/v1/introspect", self.introspect, methods=["POST"])])
+
+    async def introspect(self, request):
+        form = await request.form()
+        self.calls.append(form["token"])
+        assert request.headers["authorization"].startswith("Basic ")
+        if not form["token"].startswith("good-"):
+            return JSONResponse({"active": False})
+        return JSONResponse({"active": True, "sub": "user-1", "exp": int(time.time()) + self.lifetime})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://okta.test")
+
+
+def test_active_token_introspected_once(okta):
+    idp = FakeIntrospection()
+
+    async def scenario():
+        async with idp.client() as client:
+            first = await okta.verify_okta_token("good-token", client)
+            second = await okta.verify_okta_token("good-token", client)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second and first["sub"] == "user-1"
+    assert idp.calls == ["good-token"]
+    assert okta.introspection_cache.counters["local_hit"] >= 1
+
+
+def test_inactive_token_is_cached_negatively(okta):
+    idp = FakeIntrospection()
+
+    async def scenario():
+        async with idp.client() as client:
+            for _ in range(3):
+                with pytest.raises(HTTPException) as raised:
+                    await okta.verify_okta_token("revoked-token", client)
+                assert raised.value.status_code == 401
+
+    asyncio.run(scenario())
+    assert idp.calls == ["revoked-token"]
+
+
+def test_redis_tier_shared_between_workers(okta):
+    from src.webApp1.service.token_cache import TokenIntrospectionCache
+    idp = FakeIntrospection()
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    async def scenario():
+        async with idp.client() as client:
+            await okta.verify_okta_token("good-shared", client, redis=redis)
+            okta.introspection_cache.local.clear()  # another worker: empty L1, same redis
+            await okta.verify_okta_token("good-shared", client, redis=redis)
+        return await redis.keys("*")
+
+    keys = asyncio.run(scenario())
+    assert idp.calls == ["good-shared"]
+    assert okta.introspection_cache.counters["redis_hit"] >= 1
+    assert keys == ["okta:introspect:" + TokenIntrospectionCache.token_key("good-shared")]  # never the raw token
+
+
+def test_ttl_bounded_by_exp_and_max_ttl():
+    from src.webApp1.service.token_cache import TokenIntrospectionCache
+    cache = TokenIntrospectionCache(max_ttl=300, negative_ttl=30)
+    now = time.time()
+    assert 9 <= cache.ttl_for({"active": True, "exp": now + 10}) <= 10
+    assert cache.ttl_for({"active": True, "exp": now + 3600}) == 300
+    assert cache.ttl_for({"active": True, "exp": now - 5}) == 0
+    assert cache.ttl_for({"active": False}) == 30
+
+
+def test_expired_token_is_not_cached(okta):
+    idp = FakeIntrospection(lifetime=-1)  # exp already passed, but the IdP still says active
+
+    async def scenario():
+        async with idp.client() as client:
+            await okta.verify_okta_token("good-expiring", client)
+            await okta.verify_okta_token("good-expiring", client)
+
+    asyncio.run(scenario())
+    assert idp.calls == ["good-expiring", "good-expiring"]
@@ -0,0 +1,126 @@
+"""user-010: GCRA / token bucket / sliding window Lua scripts, property-based against fakeredis with a fake clock"""
+import asyncio
+from unittest import mock
+
+import fakeredis
+import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
+
+from src.webApp1.ratelimit.algorithms import ALGORITHMS, GCRA, Algorithm, SlidingWindowCounter, TokenBucket
+
+SETTINGS = settings(max_examples=60, deadline=None, suppress_health_check=[HealthCheck.too_slow])
+
+limits = st.integers(min_value=1, max_value=20)
+periods = st.integers(min_value=1, max_value=60)
+gaps_ms = st.lists(st.integers(min_value=0, max_value=5000), min_size=1, max_size=80)
+
+
+class Clock:
+    """time.time() for fakeredis (TIME and key expiry), advanced by the test only"""
+
+    def __init__(self, start: float = 1_700_000_000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def replay(algorithm: Algorithm, gaps: list[int]) -> list[tuple[int, bool, int]]:
+    """one key hit after each gap (ms) -> [(ms since start, allowed, retry_after_ms)]"""
+    clock = Clock()
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        out = []
+        elapsed = 0
+        for gap in gaps:
+            elapsed += gap
+            clock.now = 1_700_000_000.0 + elapsed / 1000
+            allowed, retry = await algorithm.hit(redis, "rl:k")
+            out.append((elapsed, allowed, retry))
+        return out, await redis.keys("*")
+
+    with mock.patch("time.time", clock):
+        out, keys = asyncio.run(scenario())
+    assert keys in ([], [b"rl:k"])  # O(1) state: one key per client, whatever the traffic
+    return out
+
+
+def conforms(allowed_at: list[int], burst: int, interval_ms: float) -> bool:
+    """no run of allowed requests beats `burst` + one per interval (GCRA / token bucket bound)"""
+    for i, start in enumerate(allowed_at):
+        for j in range(i, len(allowed_at)):
+            if j - i + 1 > burst + (allowed_at[j] - start) / interval_ms + 1e-9:
+                return False
+    return True
+
+
+@SETTINGS
+@given(times=limits, seconds=periods, burst=st.integers(min_value=1, max_value=10), gaps=gaps_ms)
+def test_gcra_never_exceeds_rate_plus_burst(times, seconds, burst, gaps):
+    algorithm = GCRA(times, seconds, burst=burst)
+    allowed_at = [t for t, allowed, _ in replay(algorithm, gaps) if allowed]
+    assert allowed_at, "the first request always passes"
+    assert conforms(allowed_at, burst, seconds * 1000 / times)
+
+
+@SETTINGS
+@given(times=limits, seconds=periods, burst=st.integers(min_value=1, max_value=10), gaps=gaps_ms)
+def test_token_bucket_never_exceeds_rate_plus_capacity(times, seconds, burst, gaps):
+    algorithm = TokenBucket(times, seconds, burst=burst)
+    allowed_at = [t for t, allowed, _ in replay(algorithm, gaps) if allowed]
+    assert conforms(allowed_at, burst, seconds * 1000 / times)
+
+
+@SETTINGS
+@given(times=limits, seconds=periods, gaps=gaps_ms)
+def test_sliding_window_caps_every_window(times, seconds, gaps):
+    window = seconds * 1000
+    start = 1_700_000_000_000  # the scripts align windows on absolute ms
+    counts = {}
+    for t, allowed, _ in replay(SlidingWindowCounter(times, seconds), gaps):
+        if allowed:
+            counts[(start + t) // window] = counts.get((start + t) // window, 0) + 1
+    assert max(counts.values()) <= times
+
+
+@SETTINGS
+@given(name=st.sampled_from(sorted(ALGORITHMS)), times=limits, seconds=periods, gaps=gaps_ms)
+def test_denials_come_with_a_retry_after(name, times, seconds, gaps):
+    for _, allowed, retry in replay(ALGORITHMS[name](times, seconds), gaps):
+        assert (retry == 0) if allowed else (0 < retry <= seconds * 2000)
+
+
+@SETTINGS
+@given(name=st.sampled_from(["gcra", "token_bucket"]), times=limits, seconds=periods,
+       extra=st.integers(min_value=1, max_value=10))
+def test_retry_after_is_exact(name, times, seconds, extra):
+    """burst exhausted at t0: denied just before t0 + retry_after, allowed at it"""
+    algorithm = ALGORITHMS[name](times, seconds)
+    results = replay(algorithm, [0] * (times + extra))
+    _, allowed, retry = results[-1]
+    assert not allowed and retry > 0
+    later = replay(algorithm, [0] * (times + extra) + [retry])
+    assert later[-1][1]
+    if retry > 1:
+        assert not replay(algorithm, [0] * (times + extra) + [retry - 1])[-1][1]
+
+
+@SETTINGS
+@given(name=st.sampled_from(["gcra", "token_bucket"]), times=limits, seconds=periods,
+       count=st.integers(min_value=1, max_value=60))
+def test_requests_at_the_configured_rate_always_pass(name, times, seconds, count):
+    interval = -(-seconds * 1000 // times)  # ceil, ms
+    assert all(allowed for _, allowed, _ in replay(ALGORITHMS[name](times, seconds), [interval] * count))
+
+
+@SETTINGS
+@given(times=st.integers(min_value=2, max_value=20), seconds=periods, count=st.integers(min_value=1, max_value=60))
+def test_sliding_window_passes_half_rate_traffic(times, seconds, count):
+    interval = -(-seconds * 2000 // times)  # half the limit: the weighted estimate stays under it
+    assert all(allowed for _, allowed, _ in replay(SlidingWindowCounter(times, seconds), [interval] * count))
+
+
+def test_algorithm_is_abstract():
+    with pytest.raises(TypeError):
+        Algorithm(1, 1)
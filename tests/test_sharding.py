@@ -0,0 +1,203 @@
+"""user-023: consistent-hash shard router over SQLite shards: minimal moves, online rebalance, scatter/gather"""
+import asyncio
+from collections import Counter
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, insert, select
+
+from src.webApp1.dao.database import DatabaseManager
+from src.webApp1.dao.sharding import HashRing, ShardRouter, moved_ranges, ring_hash
+
+metadata = MetaData()
+events = Table("events", metadata,
+               Column("id", Integer, primary_key=True),
+               Column("user_id", String, nullable=False),
+               Column("amount", Integer, nullable=False))
+TABLES = [(events, "user_id")]
+
+
+async def sqlite_shard(tmp_path, name) -> DatabaseManager:
+    manager = DatabaseManager(f"sqlite+aiosqlite:///{tmp_path / name}.db", pool_size=5, max_overflow=5)
+    async with manager.writer.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+    return manager
+
+
+async def router_with(tmp_path, count: int, rows: int = 0) -> ShardRouter:
+    router = ShardRouter({f"shard_{i}": await sqlite_shard(tmp_path, f"shard_{i}") for i in range(count)})
+    for i in range(rows):
+        await router.execute_for_key(f"u{i}", insert(events), {"id": i, "user_id": f"u{i}", "amount": i})
+    return router
+
+
+async def placement(router) -> dict:
+    """shard -> [(id, user_id)] as stored"""
+    out = await router.scatter(select(events.c.id, events.c.user_id))
+    assert out["failed"] == {}
+    return {name: [tuple(r) for r in rows] for name, rows in out["rows"].items()}
+
+
+def assert_every_row_once_on_its_owner(router, stored: dict, expected_ids):
+    ids = Counter(row_id for rows in stored.values() for row_id, _ in rows)
+    assert sorted(ids) == sorted(expected_ids) and set(ids.values()) == {1}
+    for name, rows in stored.items():
+        assert all(router.ring.node_for(user_id) == name for _, user_id in rows), name
+
+
+def test_adding_a_node_moves_about_one_in_n_plus_one_keys_all_to_it():
+    keys = [f"user-{i}" for i in range(10_000)]
+    old = HashRing([f"shard_{i}" for i in range(4)])
+    new = old.copy()
+    new.add("shard_4")
+    moved = [k for k in keys if old.node_for(k) != new.node_for(k)]
+    assert 0.16 < len(moved) / len(keys) < 0.24  # ~1/5, hash-mod-N would move ~4/5
+    assert {new.node_for(k) for k in moved} == {"shard_4"}
+    ranges = moved_ranges(old, new)
+    in_ranges = [k for k in keys if any(_covers(start, end, ring_hash(k)) for start, end, _, _ in ranges)]
+    assert in_ranges == moved
+
+
+def _covers(start, end, h):
+    return start < h <= end if start < end else h > start or h <= end
+
+
+def test_add_shard_copies_only_moved_rows(tmp_path):
+    async def scenario():
+        router = await router_with(tmp_path, 4, rows=1000)
+        before = await placement(router)
+        report = await router.add_shard("shard_4", await sqlite_shard(tmp_path, "shard_4"), TABLES, batch_size=64)
+        after = await placement(router)
+        await router.close()
+        return router, before, report, after
+
+    router, before, report, after = asyncio.run(scenario())
+    assert_every_row_once_on_its_owner(router, after, range(1000))
+    assert report["rows"]["events"] == len(after["shard_4"])
+    assert 0.12 < len(after["shard_4"]) / 1000 < 0.28
+    for name in before:  # the old shards only lost rows, to the new one
+        assert set(after[name]) <= set(before[name])
+    assert not router.stats()["rebalancing"]
+
+
+def test_remove_shard_hands_its_rows_to_the_others(tmp_path):
+    async def scenario():
+        router = await router_with(tmp_path, 4, rows=600)
+        leaving = router.shards["shard_2"]
+        report = await router.remove_shard("shard_2", TABLES)
+        left_behind = await leaving.fetch_all(select(func.count()).select_from(events))
+        after = await placement(router)
+        await router.close()
+        await leaving.close()
+        return router, report, left_behind, after
+
+    router, report, left_behind, after = asyncio.run(scenario())
+    assert "shard_2" not in after and left_behind[0][0] == 0
+    assert_every_row_once_on_its_owner(router, after, range(600))
+    assert report["rows"]["events"] > 0
+
+
+def test_writes_and_reads_during_rebalance_lose_nothing(tmp_path):
+    """a writer and a reader run against the router while shard_4 is added; every row lands once, reads find it"""
+    async def scenario():
+        router = await router_with(tmp_path, 4, rows=800)
+        written, missed = [], []
+        done = asyncio.Event()
+
+        async def writer():
+            i = 800
+            while not done.is_set():
+                await router.execute_for_key(f"u{i}", insert(events), {"id": i, "user_id": f"u{i}", "amount": i})
+                written.append(i)
+                i += 1
+                await asyncio.sleep(0)
+
+        async def reader():
+            while not done.is_set():
+                for i in list(written[-20:]):
+                    rows = await router.fetch_for_key(f"u{i}", select(events.c.id).where(events.c.id == i))
+                    if [tuple(r) for r in rows] != [(i,)]:
+                        missed.append((i, rows))
+                await asyncio.sleep(0)
+
+        tasks = [asyncio.create_task(writer()), asyncio.create_task(reader())]
+        await asyncio.sleep(0.05)
+        await router.add_shard("shard_4", await sqlite_shard(tmp_path, "shard_4"), TABLES, batch_size=32)
+        done.set()
+        await asyncio.gather(*tasks)
+        after = await placement(router)
+        await router.close()
+        return router, written, missed, after
+
+    router, written, missed, after = asyncio.run(scenario())
+    assert written and missed == []
+    assert_every_row_once_on_its_owner(router, after, [*range(800), *written])
+    assert router.counters["double_write"] > 0 and router.counters["merged_read"] > 0
+
+
+def test_failed_copy_leaves_the_ring_and_the_rows_as_they_were(tmp_path):
+    async def scenario():
+        router = await router_with(tmp_path, 3, rows=300)
+        before = await placement(router)
+        ring = router.ring
+        copies = 0
+        real_copy = router._copy_rows
+
+        async def failing_copy(*args):
+            nonlocal copies
+            copies += 1
+            if copies == 2:
+                raise OSError("shard_3 went away")
+            return await real_copy(*args)
+
+        router._copy_rows = failing_copy
+        new_shard = await sqlite_shard(tmp_path, "shard_3")
+        with pytest.raises(OSError):
+            await router.add_shard("shard_3", new_shard, TABLES)
+        partial = await new_shard.fetch_all(select(func.count()).select_from(events))
+        await new_shard.close()
+        after = await placement(router)
+        await router.close()
+        return ring, router, before, partial, after
+
+    ring, router, before, partial, after = asyncio.run(scenario())
+    assert router.ring is ring and router.next is None
+    assert partial[0][0] == 0  # its partial copy was deleted
+    assert "shard_3" not in router.shards and after == before
+
+
+def test_scatter_reports_slow_and_failing_shards(tmp_path):
+    async def scenario():
+        router = await router_with(tmp_path, 3, rows=90)
+
+        async def slow(*args, **kwargs):
+            await asyncio.sleep(1)
+
+        async def broken(*args, **kwargs):
+            raise OSError("connection refused")
+
+        router.shards["shard_1"].fetch_all = slow
+        router.shards["shard_2"].fetch_all = broken
+        out = await router.scatter(select(events.c.id), timeout=0.1)
+        await router.close()
+        return router, out
+
+    router, out = asyncio.run(scenario())
+    assert list(out["rows"]) == ["shard_0"] and out["rows"]["shard_0"]
+    assert out["failed"]["shard_1"] == "timeout" and "connection refused" in out["failed"]["shard_2"]
+    assert router.counters["shard_timeout"] == 1 and router.counters["shard_error"] == 1
+
+
+def test_scatter_sorted_streams_a_global_order(tmp_path):
+    async def scenario():
+        router = await router_with(tmp_path, 4, rows=400)
+        statement = select(events.c.id, events.c.amount).order_by(events.c.amount.desc())
+        top = [tuple(r) async for r in router.scatter_sorted(statement, sort_key=lambda r: r.amount,
+                                                             reverse=True, limit=25)]
+        everything = [r.amount async for r in router.scatter_sorted(statement, sort_key=lambda r: r.amount,
+                                                                    reverse=True)]
+        await router.close()
+        return top, everything
+
+    top, everything = asyncio.run(scenario())
+    assert top == [(i, i) for i in range(399, 374, -1)]
+    assert everything == list(range(399, -1, -1))
@@ -0,0 +1,40 @@
+"""user-014: lazy controllers stay out of worker boot, but not out of the schema; cold start budget"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.webApp1.startup import COLD_START_BUDGET, DEFAULT_APP, cold_start
+
+LAZY_MODULES = ["src.webApp1.controller.github_oauth_cc", "src.webApp1.controller.github_oauth_implicit",
+                "src.webApp1.controller.transactions", "src.webApp1.controller.wallets"]
+LAZY_PATHS = ["/github-token", "/login/github", "/auth/callback", "/api/v1/transactions",
+              "/api/v1/wallets/transfer", "/api/v1/wallets/{wallet_id}/verify", "/ledger/stats"]
+
+
+def run_python(code: str) -> str:
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                          env={**os.environ, "CURSOR_SECRET": "test"})
+    return proc.stdout
+
+
+def test_lazy_controllers_not_imported_with_the_app():
+    out = run_python("import sys, src.webApp1.controller.web2\n"
+                     "print(' '.join(m for m in sys.modules if m.startswith('src.webApp1.controller')))")
+    assert not set(LAZY_MODULES) & set(out.split())
+
+
+def test_openapi_documents_lazy_routes():
+    out = run_python("import json, src.webApp1.controller.web2 as web2\n"
+                     "print(json.dumps(sorted(web2.app.openapi()['paths'])))")
+    assert set(LAZY_PATHS) <= set(json.loads(out))
+
+
+@pytest.mark.skipif(os.getenv("SKIP_COLD_START") == "1", reason="SKIP_COLD_START=1")
+def test_cold_start_within_budget(monkeypatch):
+    monkeypatch.setenv("CURSOR_SECRET", "test")
+    monkeypatch.setenv("REDIS_CLOUD_URL", "127.0.0.1:6399")  # never connected to during boot
+    seconds = cold_start(DEFAULT_APP, "/docs")
+    assert seconds <= COLD_START_BUDGET, f"cold start {seconds:.3f}s over budget {COLD_START_BUDGET}s"
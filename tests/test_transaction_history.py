@@ -0,0 +1,73 @@
+"""user-022: the cached first page is versioned, an invalidation in one worker reaches every worker"""
+import asyncio
+import uuid
+from decimal import Decimal
+
+import fakeredis
+
+from src.webApp1.cache.multilevel import MultiLevelCache
+from src.webApp1.dao.database import DatabaseManager
+from src.webApp1.dao.transactions import TransactionHistory
+
+ALICE, BOB = uuid.UUID(int=1), uuid.UUID(int=2)
+
+
+def worker(db, redis) -> TransactionHistory:
+    """one worker's history: own L1, shared redis and database"""
+    return TransactionHistory(db, MultiLevelCache(redis, prefix="txn:first:", ttl=30, stale_ttl=0), secret=b"test")
+
+
+def amounts(page) -> list[str]:
+    return [row["amount"] for row in page["transactions"]]
+
+
+def test_invalidation_in_one_worker_reaches_the_others(tmp_path):
+    async def scenario():
+        db = DatabaseManager(f"sqlite+aiosqlite:///{tmp_path / 'history.db'}")
+        redis = fakeredis.FakeAsyncRedis()
+        a, b = worker(db, redis), worker(db, redis)
+        await a.create_schema()
+        await a.record(ALICE, BOB, Decimal("1.00"), "transfer")
+        assert amounts(await a.page(ALICE)) == ["1.00"]
+        assert a.first_page_cache.counters["l1_hit"] == 0
+        assert amounts(await a.page(ALICE)) == ["1.00"]
+        assert a.first_page_cache.counters["l1_hit"] == 1
+
+        await b.record(BOB, ALICE, Decimal("2.00"), "transfer")  # commits in B, bumps the version
+        assert amounts(await a.page(ALICE)) == ["2.00", "1.00"]
+        assert a.first_page_cache.counters["miss"] == 2
+        await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_page_read_before_a_commit_is_not_served_after_it(tmp_path):
+    async def scenario():
+        db = DatabaseManager(f"sqlite+aiosqlite:///{tmp_path / 'history.db'}")
+        redis = fakeredis.FakeAsyncRedis()
+        a, b = worker(db, redis), worker(db, redis)
+        await a.create_schema()
+        await a.record(ALICE, BOB, Decimal("1.00"), "transfer")
+
+        read, release = asyncio.Event(), asyncio.Event()
+        load = a._page
+
+        async def slow_page(*args):
+            page = await load(*args)  # the DB read happens before B's commit
+            read.set()
+            await release.wait()
+            return page
+
+        a._page = slow_page
+        loading = asyncio.create_task(a.page(ALICE))
+        await read.wait()
+        await b.record(BOB, ALICE, Decimal("2.00"), "transfer")
+        release.set()
+        assert amounts(await loading) == ["1.00"]  # written back under the old version
+        a._page = load
+
+        assert amounts(await a.page(ALICE)) == ["2.00", "1.00"]
+        assert amounts(await b.page(ALICE)) == ["2.00", "1.00"]
+        await db.close()
+
+    asyncio.run(scenario())